@@ -0,0 +1,158 @@
+from fastapi import WebSocket
+from typing import Callable, Optional, Union
+import logging
+import asyncio
+import base64
+from core import codec
+from core.backplane import Backplane
+from core.config import settings
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Frame = Union[str, bytes]
+
+class Connection:
+    """WebSocket con cola de salida acotada drenada por su propia tarea escritora"""
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        max_queue: int = settings.SEND_QUEUE_MAX,
+        on_sent: Optional[Callable[[str], None]] = None,
+        on_failure: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.on_sent = on_sent
+        self.on_failure = on_failure
+        self.failed = False
+        self._writer_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Arranca la tarea escritora"""
+        if self._writer_task is None:
+            self._writer_task = asyncio.create_task(self._writer())
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def send(self, data: Frame) -> bool:
+        """Encola un frame (str -> texto, bytes -> binario) sin bloquear"""
+        if self.failed:
+            return False
+        try:
+            self.queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            self._fail("cola de salida llena")
+            return False
+
+    def send_json(self, message: dict) -> bool:
+        """Serializa y encola un mensaje JSON"""
+        return self.send(codec.dumps(message))
+
+    def _fail(self, reason: str):
+        if self.failed:
+            return
+        self.failed = True
+        logger.warning(f"Cliente {self.client_id} expulsado: {reason}")
+        if self.on_failure:
+            self.on_failure(self.client_id, reason)
+
+    async def _writer(self):
+        """Envía los frames encolados en orden; un error marca la conexión como fallida"""
+        while True:
+            data = await self.queue.get()
+            try:
+                if isinstance(data, bytes):
+                    await self.websocket.send_bytes(data)
+                else:
+                    await self.websocket.send_text(data)
+            except Exception as e:
+                self._fail(f"error de envío: {e}")
+                return
+            if self.on_sent:
+                self.on_sent(self.client_id)
+
+    def stop(self):
+        """Detiene la tarea escritora descartando los frames pendientes"""
+        task = self._writer_task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def close(self):
+        """Detiene la tarea escritora y cierra el WebSocket"""
+        self.stop()
+        await self.websocket.close()
+
+def frame_to_wire(message: dict, data: Frame) -> dict:
+    """Añade un frame a un mensaje del backplane (los binarios van en base64)"""
+    if isinstance(data, bytes):
+        message["bytes"] = base64.b64encode(data).decode()
+    else:
+        message["text"] = data
+    return message
+
+def frame_from_wire(message: dict) -> Frame:
+    """Recupera el frame de un mensaje del backplane"""
+    if "bytes" in message:
+        return base64.b64decode(message["bytes"])
+    return message.get("text", "")
+
+class RemoteConnection:
+    """Cliente conectado a otro worker: los frames se publican en el canal de ese worker"""
+    def __init__(
+        self,
+        backplane: Backplane,
+        channel: str,
+        client_id: str,
+        client_type: str,
+        on_sent: Optional[Callable[[str], None]] = None,
+    ):
+        self.backplane = backplane
+        self.channel = channel
+        self.client_id = client_id
+        self.client_type = client_type
+        self.on_sent = on_sent
+        self.failed = False
+
+    def start(self):
+        """El worker de entrada ya tiene su propia tarea escritora"""
+
+    @property
+    def queue_depth(self) -> int:
+        return 0
+
+    def send(self, data: Frame) -> bool:
+        """Publica el frame en el worker que tiene el WebSocket"""
+        if self.failed:
+            return False
+        try:
+            self.backplane.publish(
+                self.channel,
+                frame_to_wire({"kind": "data", "client_id": self.client_id}, data)
+            )
+        except Exception as e:
+            logger.warning(f"Cliente remoto {self.client_id} inalcanzable: {e}")
+            self.failed = True
+            return False
+        if self.on_sent:
+            self.on_sent(self.client_id)
+        return True
+
+    def send_json(self, message: dict) -> bool:
+        """Serializa y publica un mensaje JSON"""
+        return self.send(codec.dumps(message))
+
+    def stop(self):
+        self.failed = True
+
+    async def close(self):
+        """Pide al worker de entrada que cierre el WebSocket"""
+        if not self.failed:
+            self.backplane.publish(self.channel, {"kind": "close", "client_id": self.client_id})
+        self.stop()
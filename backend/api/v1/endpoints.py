@@ -1,8 +1,43 @@
-from fastapi import APIRouter
-from services.game_service import game_state
+from fastapi import APIRouter, HTTPException, Query
+from api.v1.rooms import DEFAULT_ROOM, registry
+from api.v1.websocket import manager
+from services.score_store import score_store
+from services.word_bank import word_bank
 
-router = APIRouter(prefix="/api/v1")
+# main.py monta el router bajo /api/v1
+router = APIRouter()
 
 @router.get("/state")
-async def get_game_state():
-    return game_state.dict()
+async def get_game_state(room: str = DEFAULT_ROOM):
+    game_room = registry.get(registry.normalize_room_id(room))
+    if game_room is None:
+        raise HTTPException(status_code=404, detail="Sala no encontrada")
+    return game_room.game_state.get_state()
+
+@router.get("/rooms")
+async def list_rooms():
+    return {
+        room_id: {"clients": len(game_room.clients)}
+        for room_id, game_room in registry.rooms.items()
+    }
+
+@router.get("/leaderboard")
+async def get_leaderboard(limit: int = Query(10, ge=1, le=100)):
+    return {"players": await score_store.top(limit)}
+
+@router.get("/words")
+async def list_word_lists():
+    return {
+        language: {category: len(word_bank.words(language, category)) for category in categories}
+        for language, categories in word_bank.languages().items()
+    }
+
+@router.get("/connections")
+async def list_connections():
+    depths = manager.queue_depths()
+    return {
+        "connections": len(depths),
+        "max_queue_depth": max(depths.values(), default=0),
+        "queue_depths": depths,
+        "rate_limited": manager.rate_limited()
+    }
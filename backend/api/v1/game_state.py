@@ -1,12 +1,15 @@
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 import random
 import logging
-import asyncio
 from datetime import datetime, timedelta
+from .guess import CLOSE, GuessMatcher
+from core import codec
+from core.logs import get_logger
+from services.word_bank import ShuffleBag, word_bank
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 class Player:
     def __init__(self, name: str, client_type: str):
@@ -17,23 +20,40 @@ class Player:
         self.is_connected = True
         self.last_seen = datetime.now()
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "score": self.score,
+            "is_drawer": self.is_drawer,
+            "is_connected": self.is_connected,
+            "client_type": self.client_type
+        }
+
 class GameState:
-    def __init__(self):
+    def __init__(self, word_bag: Optional[ShuffleBag] = None):
         self.players: Dict[str, Player] = {}
+        self._matcher: Optional[GuessMatcher] = None
         self.current_word: Optional[str] = None
         self.game_started = True  # Iniciar el juego automáticamente
         self.game_paused = False
         self.current_drawer: Optional[str] = None
         self.disconnect_timeout = timedelta(seconds=30)
-        self._lock = asyncio.Lock()
-        self.words = [
-            "casa", "árbol", "sol", "luna", "estrella", "mar", "montaña",
-            "río", "nube", "flor", "perro", "gato", "pájaro", "pez",
-            "coche", "tren", "avión", "barco", "bicicleta", "moto"
-        ]
+        # Palabras sin repetir de la lista compartida del banco (services/word_bank.py)
+        self.word_bag = word_bag or word_bank.bag()
         self.frontend_connected = False
         self.desktop_connected = False
         
+        # Versionado del estado público y cambios pendientes (JSON merge patch)
+        self.version = 0
+        self._changes: Dict[str, Any] = {}
+        # Cambió el drawer o la palabra: hay que reenviar los mensajes privados
+        self._private_changed = False
+        # Rondas terminadas pendientes de persistir: (palabra, drawer, adivinador)
+        self._finished_rounds: List[Tuple[str, Optional[str], str]] = []
+        # Snapshot público ya serializado para la versión actual
+        self._snapshot_version: Optional[int] = None
+        self._snapshot_payload: Optional[str] = None
+        
         # Crear jugadores por defecto
         self.default_players = {
             "desktop": Player("Jugador Desktop", "desktop"),
@@ -51,81 +71,138 @@ class GameState:
         # Seleccionar el primer drawer (jugador desktop)
         self.current_drawer = "Jugador Desktop"
         self.players["Jugador Desktop"].is_drawer = True
-        self.current_word = random.choice(self.words)
+        self.current_word = self.word_bag.draw()
         logger.info("Juego iniciado automáticamente con jugadores por defecto")
 
-    async def add_player(self, name: str, client_type: str) -> bool:
+    @property
+    def current_word(self) -> Optional[str]:
+        return self._current_word
+
+    @current_word.setter
+    def current_word(self, word: Optional[str]):
+        # La clave normalizada se calcula una vez por ronda, no en cada intento
+        self._current_word = word
+        self._matcher = GuessMatcher(word) if word else None
+
+    def _set(self, field: str, value):
+        """Asigna un campo del estado registrando el cambio"""
+        if getattr(self, field) != value:
+            setattr(self, field, value)
+            if field in ("current_drawer", "current_word"):
+                self._private_changed = True
+            # La palabra nunca forma parte del estado público
+            if field != "current_word":
+                self._changes[field] = value
+
+    def _set_player(self, player: Player, field: str, value):
+        """Asigna un campo de un jugador registrando el cambio"""
+        if getattr(player, field) != value:
+            setattr(player, field, value)
+            players = self._changes.setdefault("players", {})
+            entry = players.get(player.name)
+            if entry is None:
+                entry = players[player.name] = {}
+            entry[field] = value
+
+    def _put_player(self, player: Player):
+        """Añade un jugador registrando el cambio"""
+        self.players[player.name] = player
+        self._changes.setdefault("players", {})[player.name] = player.to_dict()
+
+    def _remove_player(self, name: str):
+        """Elimina un jugador registrando el cambio"""
+        del self.players[name]
+        self._changes.setdefault("players", {})[name] = None
+
+    def commit_patch(self) -> Optional[Dict[str, Any]]:
+        """Cierra los cambios pendientes en una nueva versión y devuelve el parche"""
+        if not self._changes:
+            return None
+        changes, self._changes = self._changes, {}
+        base_version = self.version
+        self.version += 1
+        return {
+            "type": "patch",
+            "version": self.version,
+            "base_version": base_version,
+            "changes": changes
+        }
+
+    def add_player(self, name: str, client_type: str) -> bool:
         """Añade o reconecta un jugador al juego"""
-        async with self._lock:
-            try:
-                logger.info(f"Intentando añadir jugador: {name} ({client_type})")
-                logger.info(f"Jugadores actuales: {[p.name for p in self.players.values()]}")
-                
-                # Verificar si ya existe un jugador del mismo tipo
-                if client_type == "frontend" and self.frontend_connected:
-                    # Si es un jugador frontend, reemplazar el jugador por defecto
-                    default_player = self.default_players["frontend"]
-                    if default_player.name in self.players:
-                        # Si el jugador por defecto era el drawer, transferir el rol
-                        if self.players[default_player.name].is_drawer:
-                            self.current_drawer = name
-                        del self.players[default_player.name]
-                    self.frontend_connected = False
-                elif client_type == "desktop" and self.desktop_connected:
-                    # Si es un jugador desktop, reemplazar el jugador por defecto
-                    default_player = self.default_players["desktop"]
-                    if default_player.name in self.players:
-                        # Si el jugador por defecto era el drawer, transferir el rol
-                        if self.players[default_player.name].is_drawer:
-                            self.current_drawer = name
-                        del self.players[default_player.name]
-                    self.desktop_connected = False
-                
-                if name in self.players:
-                    # Reconexión de jugador existente
-                    player = self.players[name]
-                    if player.is_connected:
-                        logger.warning(f"Jugador {name} ya está conectado")
-                        return False
-                    player.is_connected = True
-                    player.last_seen = datetime.now()
-                    logger.info(f"Jugador {name} reconectado")
-                else:
-                    # Nuevo jugador
-                    self.players[name] = Player(name, client_type)
-                    logger.info(f"Nuevo jugador {name} añadido")
-                    
-                    # Actualizar estado de conexión por tipo
-                    if client_type == "frontend":
-                        self.frontend_connected = True
-                    elif client_type == "desktop":
-                        self.desktop_connected = True
-                
-                # Asegurar que siempre haya un drawer cuando hay dos jugadores
-                if self.frontend_connected and self.desktop_connected:
-                    connected_players = [p for p in self.players.values() if p.is_connected]
-                    if len(connected_players) == 2:
-                        # Verificar si hay un drawer
-                        has_drawer = any(p.is_drawer for p in connected_players)
-                        if not has_drawer:
-                            # Si no hay drawer, seleccionar uno
-                            new_drawer = random.choice(connected_players)
-                            new_drawer.is_drawer = True
-                            self.current_drawer = new_drawer.name
-                            self.current_word = random.choice(self.words)
-                            logger.info(f"Nuevo drawer seleccionado: {new_drawer.name}")
+        try:
+            logger.debug(
+                "Intentando añadir jugador",
+                name=name,
+                client_type=client_type,
+                players=lambda: list(self.players)
+            )
+            
+            # Verificar si ya existe un jugador del mismo tipo
+            if client_type == "frontend" and self.frontend_connected:
+                # Si es un jugador frontend, reemplazar el jugador por defecto
+                default_player = self.default_players["frontend"]
+                if default_player.name in self.players:
+                    # Si el jugador por defecto era el drawer, transferir el rol
+                    if self.players[default_player.name].is_drawer:
+                        self._set("current_drawer", name)
+                    self._remove_player(default_player.name)
+                self.frontend_connected = False
+            elif client_type == "desktop" and self.desktop_connected:
+                # Si es un jugador desktop, reemplazar el jugador por defecto
+                default_player = self.default_players["desktop"]
+                if default_player.name in self.players:
+                    # Si el jugador por defecto era el drawer, transferir el rol
+                    if self.players[default_player.name].is_drawer:
+                        self._set("current_drawer", name)
+                    self._remove_player(default_player.name)
+                self.desktop_connected = False
+            
+            if name in self.players:
+                # Reconexión de jugador existente
+                player = self.players[name]
+                if player.is_connected:
+                    logger.warning(f"Jugador {name} ya está conectado")
+                    return False
+                self._set_player(player, "is_connected", True)
+                player.last_seen = datetime.now()
+                logger.info(f"Jugador {name} reconectado")
+            else:
+                # Nuevo jugador
+                self._put_player(Player(name, client_type))
+                logger.info(f"Nuevo jugador {name} añadido")
                 
-                logger.info(f"Estado final después de añadir jugador: {self.get_state()}")
-                return True
-            except Exception as e:
-                logger.error(f"Error al añadir jugador {name}: {e}")
-                return False
+                # Actualizar estado de conexión por tipo
+                if client_type == "frontend":
+                    self.frontend_connected = True
+                elif client_type == "desktop":
+                    self.desktop_connected = True
+            
+            # Asegurar que siempre haya un drawer cuando hay dos jugadores
+            if self.frontend_connected and self.desktop_connected:
+                connected_players = [p for p in self.players.values() if p.is_connected]
+                if len(connected_players) == 2:
+                    # Verificar si hay un drawer
+                    has_drawer = any(p.is_drawer for p in connected_players)
+                    if not has_drawer:
+                        # Si no hay drawer, seleccionar uno
+                        new_drawer = random.choice(connected_players)
+                        self._set_player(new_drawer, "is_drawer", True)
+                        self._set("current_drawer", new_drawer.name)
+                        self._set("current_word", self.word_bag.draw())
+                        logger.info(f"Nuevo drawer seleccionado: {new_drawer.name}")
+            
+            logger.debug("Estado después de añadir jugador", name=name, state=self.get_state)
+            return True
+        except Exception as e:
+            logger.error(f"Error al añadir jugador {name}: {e}")
+            return False
 
     def mark_player_disconnected(self, player_name: str):
         """Marca un jugador como desconectado"""
         if player_name in self.players:
             player = self.players[player_name]
-            player.is_connected = False
+            self._set_player(player, "is_connected", False)
             player.last_seen = datetime.now()
             logger.info(f"Jugador {player_name} marcado como desconectado")
             
@@ -137,122 +214,153 @@ class GameState:
             
             # Si el drawer se desconecta, seleccionar nuevo drawer
             if player_name == self.current_drawer:
-                player.is_drawer = False
-                self.current_drawer = None
-                self.current_word = None
+                self._set_player(player, "is_drawer", False)
+                self._set("current_drawer", None)
+                self._set("current_word", None)
                 
                 # Si hay otro jugador conectado, hacerlo drawer
                 connected_players = [p for p in self.players.values() if p.is_connected]
                 if connected_players:
                     new_drawer = connected_players[0]
-                    new_drawer.is_drawer = True
-                    self.current_drawer = new_drawer.name
-                    self.current_word = random.choice(self.words)
+                    self._set_player(new_drawer, "is_drawer", True)
+                    self._set("current_drawer", new_drawer.name)
+                    self._set("current_word", self.word_bag.draw())
                     logger.info(f"Nuevo drawer seleccionado después de desconexión: {new_drawer.name}")
                 else:
                     logger.info("No hay jugadores conectados para seleccionar nuevo drawer")
             
             # Pausar el juego si falta algún jugador
             if not (self.frontend_connected and self.desktop_connected):
-                self.game_paused = True
+                self._set("game_paused", True)
                 logger.info("Juego pausado por falta de jugadores")
 
     def get_connected_players_count(self) -> int:
         """Obtiene el número de jugadores conectados"""
         return sum(1 for player in self.players.values() if player.is_connected)
 
-    async def cleanup_disconnected_players(self):
-        """Limpia jugadores desconectados después del timeout"""
-        async with self._lock:
-            now = datetime.now()
-            to_remove = []
-            
-            for name, player in list(self.players.items()):
-                if not player.is_connected and (now - player.last_seen) > self.disconnect_timeout:
-                    to_remove.append(name)
-            
-            for name in to_remove:
-                del self.players[name]
-                logger.info(f"Jugador {name} removido por timeout de desconexión")
-            
-            # Si quedan menos de 2 jugadores, pausar el juego
-            if self.get_connected_players_count() < 2 and self.game_started:
-                self.game_paused = True
-                logger.info("Juego pausado por falta de jugadores")
+    def expire_player(self, name: str) -> bool:
+        """Elimina un jugador que sigue desconectado al vencer su timeout"""
+        player = self.players.get(name)
+        if player is None or player.is_connected:
+            return False
+        if datetime.now() - player.last_seen < self.disconnect_timeout:
+            return False
+        
+        self._remove_player(name)
+        logger.info(f"Jugador {name} removido por timeout de desconexión")
+        
+        # Si quedan menos de 2 jugadores, pausar el juego
+        if self.get_connected_players_count() < 2 and self.game_started:
+            self._set("game_paused", True)
+            logger.info("Juego pausado por falta de jugadores")
+        return True
 
-    async def select_new_drawer(self):
+    def select_new_drawer(self):
         """Selecciona un nuevo drawer entre los jugadores conectados"""
-        async with self._lock:
-            connected_players = [name for name, player in self.players.items() 
-                              if player.is_connected]
+        connected_players = [name for name, player in self.players.items() 
+                          if player.is_connected]
+        
+        if not connected_players:
+            logger.warning("No hay jugadores conectados para seleccionar drawer")
+            return
+        
+        # Resetear el estado de drawer para todos
+        for player in self.players.values():
+            self._set_player(player, "is_drawer", False)
+        
+        # Seleccionar nuevo drawer
+        new_drawer = random.choice(connected_players)
+        self._set_player(self.players[new_drawer], "is_drawer", True)
+        self._set("current_drawer", new_drawer)
+        logger.info(f"Nuevo drawer seleccionado: {new_drawer}")
+        
+        # Asignar nueva palabra
+        self._set("current_word", self.word_bag.draw())
+        # La palabra es secreta: sólo en DEBUG
+        logger.debug("Nueva palabra asignada", word=self.current_word)
+
+    def handle_guess(self, player_name: str, guess: str) -> bool:
+        """Maneja un intento de adivinanza"""
+        if not self.game_started or self.game_paused:
+            logger.warning("Intento de adivinar con juego no activo", player=player_name, every=5.0)
+            return False
             
-            if not connected_players:
-                logger.warning("No hay jugadores conectados para seleccionar drawer")
-                return
+        if player_name not in self.players:
+            logger.error("Jugador no encontrado para adivinar", player=player_name, every=5.0)
+            return False
             
-            # Resetear el estado de drawer para todos
-            for player in self.players.values():
-                player.is_drawer = False
+        player = self.players[player_name]
+        if not player.is_connected:
+            logger.warning("Jugador desconectado intentando adivinar", player=player_name, every=5.0)
+            return False
             
-            # Seleccionar nuevo drawer
-            new_drawer = random.choice(connected_players)
-            self.players[new_drawer].is_drawer = True
-            self.current_drawer = new_drawer
-            logger.info(f"Nuevo drawer seleccionado: {new_drawer}")
+        if player.is_drawer:
+            logger.warning("Drawer intentando adivinar", player=player_name, every=5.0)
+            return False
             
-            # Asignar nueva palabra
-            self.current_word = random.choice(self.words)
-            logger.info(f"Nueva palabra asignada: {self.current_word}")
+        if self._matcher is not None and self._matcher.matches(guess):
+            self._finished_rounds.append((self.current_word, self.current_drawer, player_name))
+            self._set_player(player, "score", player.score + 1)
+            # Dar punto al drawer
+            if self.current_drawer in self.players:
+                drawer = self.players[self.current_drawer]
+                self._set_player(drawer, "score", drawer.score + 1)
+            
+            self.select_new_drawer()
+            logger.info(f"Palabra adivinada por {player_name}")
+            return True
+            
+        return False
 
-    async def handle_guess(self, player_name: str, guess: str) -> bool:
-        """Maneja un intento de adivinanza"""
-        async with self._lock:
-            if not self.game_started or self.game_paused:
-                logger.warning(f"Intento de adivinar con juego no activo: {player_name}")
-                return False
-                
-            if player_name not in self.players:
-                logger.error(f"Jugador no encontrado: {player_name}")
-                return False
-                
-            player = self.players[player_name]
-            if not player.is_connected:
-                logger.warning(f"Jugador desconectado intentando adivinar: {player_name}")
-                return False
-                
-            if player.is_drawer:
-                logger.warning(f"Drawer intentando adivinar: {player_name}")
-                return False
-                
-            if guess.lower() == self.current_word.lower():
-                player.score += 1
-                # Dar punto al drawer
-                if self.current_drawer in self.players:
-                    self.players[self.current_drawer].score += 1
-                
-                await self.select_new_drawer()
-                logger.info(f"Palabra adivinada por {player_name}")
-                return True
-                
-            return False
+    def is_close_guess(self, guess: str) -> bool:
+        """Indica si un intento fallido está a pocos errores de la palabra"""
+        return self._matcher is not None and self._matcher.check(guess) == CLOSE
+
+    def take_finished_rounds(self) -> List[Tuple[str, Optional[str], str]]:
+        """Devuelve (y olvida) las rondas terminadas desde la última llamada"""
+        rounds, self._finished_rounds = self._finished_rounds, []
+        return rounds
+
+    def take_private_changed(self) -> bool:
+        """Indica (una sola vez) si cambió el drawer o la palabra"""
+        changed, self._private_changed = self._private_changed, False
+        return changed
+
+    def public_snapshot(self) -> str:
+        """Mensaje de estado público serializado una sola vez por versión"""
+        if self._changes:
+            # El estado ya no corresponde a self.version: hay que hacer commit_patch antes
+            raise RuntimeError("Snapshot pedido con cambios sin versionar")
+        if self._snapshot_version != self.version:
+            self._snapshot_payload = codec.dumps({"type": "state", "version": self.version, "state": self.get_state()})
+            self._snapshot_version = self.version
+        return self._snapshot_payload
+
+    def get_private_state(self, player_name: str) -> Optional[Dict[str, Any]]:
+        """Mensaje privado del jugador: sólo el drawer recibe la palabra"""
+        player = self.players.get(player_name)
+        if player is None:
+            return None
+        if player.is_drawer and self.current_word:
+            return {
+                "type": "private",
+                "current_word": self.current_word,
+                "status_message": f"Es tu turno para dibujar: {self.current_word}"
+            }
+        return {
+            "type": "private",
+            "current_word": None,
+            "status_message": "Es tu turno para adivinar"
+        }
 
     def get_state(self):
-        """Obtiene el estado actual del juego"""
+        """Obtiene el estado público actual del juego (sin la palabra)"""
         return {
             "players": {
-                name: {
-                    "name": player.name,
-                    "score": player.score,
-                    "is_drawer": player.is_drawer,
-                    "is_connected": player.is_connected,
-                    "client_type": player.client_type
-                }
+                name: player.to_dict()
                 for name, player in self.players.items()
             },
-            "current_word": self.current_word if self.current_drawer else None,
             "game_started": self.game_started,
             "game_paused": self.game_paused,
             "current_drawer": self.current_drawer
         }
-
-game_state = GameState() 
\ No newline at end of file
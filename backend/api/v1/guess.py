@@ -0,0 +1,86 @@
+import unicodedata
+from functools import lru_cache
+from typing import Optional
+
+# Intentos más largos se descartan sin normalizar
+MAX_GUESS_LENGTH = 64
+
+HIT = "hit"
+CLOSE = "close"
+MISS = "miss"
+
+@lru_cache(maxsize=4096)
+def normalize(text: str) -> str:
+    """Clave de comparación: minúsculas, sin acentos y con los espacios colapsados"""
+    if text.isascii():
+        return " ".join(text.lower().split())
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.split())
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """Distancia de edición entre a y b, o limit + 1 en cuanto se sabe que la supera"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    over = limit + 1
+    # Sólo se calcula la banda diagonal de ancho 2 * limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value if value < over else over
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous = current
+    return previous[len(b)]
+
+def close_limit(key: str) -> int:
+    """Errores tolerados para la pista de "casi": ninguno en palabras muy cortas"""
+    if len(key) < 4:
+        return 0
+    if len(key) < 8:
+        return 1
+    return 2
+
+class GuessMatcher:
+    """Comparador de intentos para la palabra de una ronda.
+
+    La clave normalizada de la palabra se calcula una sola vez al empezar la
+    ronda; cada intento cuesta normalizarlo (con caché, porque en una sala
+    concurrida muchos repiten lo mismo) y una comparación de cadenas.
+    """
+    __slots__ = ("word", "key", "limit")
+
+    def __init__(self, word: str):
+        self.word = word
+        self.key = normalize(word)
+        self.limit = close_limit(self.key)
+
+    def _key_for(self, guess) -> Optional[str]:
+        if not isinstance(guess, str) or len(guess) > MAX_GUESS_LENGTH:
+            return None
+        return normalize(guess)
+
+    def matches(self, guess) -> bool:
+        """Acierto exacto ignorando mayúsculas, acentos y espacios"""
+        return self._key_for(guess) == self.key
+
+    def check(self, guess) -> str:
+        """Clasifica un intento como HIT, CLOSE (a pocos errores) o MISS"""
+        key = self._key_for(guess)
+        if key is None:
+            return MISS
+        if key == self.key:
+            return HIT
+        if self.limit and bounded_distance(key, self.key, self.limit) <= self.limit:
+            return CLOSE
+        return MISS
@@ -0,0 +1,255 @@
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+import logging
+import asyncio
+import secrets
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timedelta
+from .game_state import GameState
+from .strokes import StrokeBatch, StrokeLog
+from core.config import settings
+from core.metrics import MAILBOX_WAIT_SECONDS
+from core.scheduler import scheduler
+from services.word_bank import word_bank
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOM = "default"
+MAX_ROOM_ID_LENGTH = 64
+
+class Room:
+    """Partida independiente con su propio estado y miembros.
+
+    Cada sala es un actor: todo lo que modifica su estado llega como mensaje a
+    su buzón y lo ejecuta, en orden y de uno en uno, la tarea de la sala. No
+    hay locks; un handler que vuelve a llamar a su propia sala se ejecuta en
+    línea en lugar de encolarse (y bloquearse a sí mismo), y si el actor está
+    ocioso un handler síncrono se ejecuta directamente sin pasar por la cola.
+    """
+    def __init__(self, room_id: str, language: Optional[str] = None, category: Optional[str] = None):
+        self.room_id = room_id
+        self.game_state = GameState(word_bank.bag(language, category))
+        self.clients: Set[str] = set()  # client_ids conectados a esta sala
+        self.player_connections: Dict[str, str] = {}  # player_name -> client_id
+        self.client_players: Dict[str, str] = {}  # client_id -> player_name
+        self.frontend_client: Optional[str] = None
+        self.desktop_client: Optional[str] = None
+        self.last_activity = datetime.now()
+        self.stroke_batch = StrokeBatch()  # trazos pendientes del próximo tick
+        self.stroke_log = StrokeLog(  # dibujo de la ronda para quien llega tarde
+            max_points=settings.STROKE_LOG_MAX_POINTS,
+            compact_every=settings.STROKE_LOG_COMPACT_EVERY
+        )
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.web_stroke_id = 0  # el cliente web no numera sus trazos: cada isStart abre uno
+        # Reanudación de sesiones: token opaco por jugador y últimos parches difundidos
+        self.resume_tokens: Dict[str, str] = {}  # token -> player_name
+        self.player_tokens: Dict[str, str] = {}  # player_name -> token
+        self.recent_patches: Deque[Tuple[int, int, str]] = deque(maxlen=settings.RESUME_BUFFER_SIZE)  # (base, versión, frame)
+        self.mailbox: asyncio.Queue = asyncio.Queue()
+        self._actor_task: Optional[asyncio.Task] = None
+        self._busy = False  # el actor está ejecutando un mensaje
+
+    def _ensure_actor(self):
+        if self._actor_task is None:
+            self._actor_task = asyncio.create_task(self._run(), name=f"room-{self.room_id}")
+
+    def in_actor(self) -> bool:
+        """Indica si el código actual ya corre dentro del actor de la sala"""
+        return self._actor_task is not None and asyncio.current_task() is self._actor_task
+
+    def _can_run_inline(self, handler: Callable[..., Any]) -> bool:
+        # Con el buzón vacío y el actor ocioso, un handler síncrono no puede
+        # intercalarse con nada: ejecutarlo directamente equivale a encolarlo
+        return not self._busy and self.mailbox.empty() and not asyncio.iscoroutinefunction(handler)
+
+    def post(self, handler: Callable[..., Any], *args):
+        """Encola un mensaje sin esperar a su resultado"""
+        if self._can_run_inline(handler):
+            self._busy = True
+            try:
+                handler(*args)
+            except Exception as e:
+                logger.error(f"Error en el actor de la sala {self.room_id}: {e}")
+            finally:
+                self._busy = False
+            return
+        self._ensure_actor()
+        self.mailbox.put_nowait((handler, args, None, time.perf_counter()))
+
+    async def call(self, handler: Callable[..., Any], *args) -> Any:
+        """Encola un mensaje y espera su resultado (en línea si ya se está en el actor o está ocioso)"""
+        if self.in_actor():
+            result = handler(*args)
+            if asyncio.iscoroutine(result):
+                result = await result
+            return result
+        if self._can_run_inline(handler):
+            self._busy = True
+            try:
+                return handler(*args)
+            finally:
+                self._busy = False
+        self._ensure_actor()
+        future = asyncio.get_running_loop().create_future()
+        self.mailbox.put_nowait((handler, args, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        """Bucle del actor: procesa el buzón en orden"""
+        while True:
+            handler, args, future, queued_at = await self.mailbox.get()
+            MAILBOX_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+            if future is not None and future.cancelled():
+                continue
+            self._busy = True
+            try:
+                result = handler(*args)
+                if asyncio.iscoroutine(result):
+                    result = await result
+            except Exception as e:
+                if future is not None and not future.cancelled():
+                    future.set_exception(e)
+                else:
+                    logger.error(f"Error en el actor de la sala {self.room_id}: {e}")
+                continue
+            finally:
+                self._busy = False
+            if future is not None and not future.cancelled():
+                future.set_result(result)
+
+    def stop(self):
+        """Detiene el actor descartando los mensajes pendientes"""
+        if self._actor_task is not None:
+            self._actor_task.cancel()
+            self._actor_task = None
+        while not self.mailbox.empty():
+            _, _, future, _ = self.mailbox.get_nowait()
+            if future is not None:
+                future.cancel()
+
+    def touch(self):
+        """Registra actividad en la sala"""
+        self.last_activity = datetime.now()
+
+    def bind_player(self, player_name: str, client_id: str):
+        """Asocia jugador y cliente manteniendo los dos índices consistentes"""
+        old_client_id = self.player_connections.get(player_name)
+        if old_client_id is not None and old_client_id != client_id:
+            self.client_players.pop(old_client_id, None)
+        old_player_name = self.client_players.get(client_id)
+        if old_player_name is not None and old_player_name != player_name:
+            self.player_connections.pop(old_player_name, None)
+        self.player_connections[player_name] = client_id
+        self.client_players[client_id] = player_name
+
+    def unbind_client(self, client_id: str) -> Optional[str]:
+        """Elimina la asociación de un cliente y devuelve el jugador que tenía"""
+        player_name = self.client_players.pop(client_id, None)
+        if player_name is not None and self.player_connections.get(player_name) == client_id:
+            del self.player_connections[player_name]
+        return player_name
+
+    def player_for(self, client_id: str) -> Optional[str]:
+        """Jugador asociado a un cliente en O(1)"""
+        return self.client_players.get(client_id)
+
+    def issue_token(self, player_name: str) -> str:
+        """Nuevo token de reanudación del jugador; invalida el anterior"""
+        self.revoke_token(player_name)
+        token = secrets.token_urlsafe(16)
+        self.resume_tokens[token] = player_name
+        self.player_tokens[player_name] = token
+        return token
+
+    def revoke_token(self, player_name: str):
+        """Invalida el token del jugador (p. ej. al vencer su gracia de desconexión)"""
+        token = self.player_tokens.pop(player_name, None)
+        if token is not None:
+            self.resume_tokens.pop(token, None)
+
+    def player_for_token(self, token: Optional[str]) -> Optional[str]:
+        """Jugador dueño de un token de reanudación"""
+        return self.resume_tokens.get(token) if isinstance(token, str) else None
+
+    def remember_patch(self, base_version: int, version: int, frame: str):
+        """Guarda un parche difundido en el buffer circular de la sala"""
+        self.recent_patches.append((base_version, version, frame))
+
+    def patches_since(self, version: int) -> Optional[List[str]]:
+        """Parches posteriores a `version`, o None si el buffer ya no los cubre"""
+        missed = [entry for entry in self.recent_patches if entry[1] > version]
+        if not missed:
+            return [] if version == self.game_state.version else None
+        if missed[0][0] != version:
+            return None
+        return [frame for _, _, frame in missed]
+
+    def is_empty(self) -> bool:
+        """Indica si la sala no tiene conexiones activas"""
+        return not self.clients
+
+class RoomRegistry:
+    def __init__(self, idle_timeout: timedelta = timedelta(seconds=60)):
+        self.rooms: Dict[str, Room] = {}
+        self.idle_timeout = idle_timeout
+
+    @staticmethod
+    def normalize_room_id(room_id: Optional[str]) -> str:
+        """Normaliza el identificador de sala recibido del cliente"""
+        room_id = (room_id or "").strip()[:MAX_ROOM_ID_LENGTH]
+        return room_id or DEFAULT_ROOM
+
+    @staticmethod
+    def owner_of(room_id: str, worker_count: int = settings.WORKER_COUNT) -> int:
+        """Worker dueño de la sala; hash estable para que todos los workers coincidan"""
+        if worker_count <= 1:
+            return 0
+        return zlib.crc32(room_id.encode()) % worker_count
+
+    def get(self, room_id: str) -> Optional[Room]:
+        """Obtiene una sala existente"""
+        return self.rooms.get(room_id)
+
+    def get_or_create(self, room_id: str, language: Optional[str] = None, category: Optional[str] = None) -> Room:
+        """Obtiene una sala o la crea si no existe (idioma y categoría sólo cuentan al crearla)"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            room = Room(room_id, language, category)
+            self.rooms[room_id] = room
+            logger.info(f"Sala {room_id} creada ({len(self.rooms)} salas activas)")
+            # Si nadie llega a conectarse, la sala vence como cualquier sala vacía
+            self.schedule_expiry(room)
+        room.touch()
+        return room
+
+    def remove(self, room_id: str):
+        """Elimina una sala del registro"""
+        scheduler.cancel(("room", room_id))
+        room = self.rooms.pop(room_id, None)
+        if room is not None:
+            room.stop()
+            logger.info(f"Sala {room_id} eliminada ({len(self.rooms)} salas activas)")
+
+    def schedule_expiry(self, room: Room):
+        """Programa la eliminación de la sala si sigue vacía tras el tiempo de inactividad"""
+        scheduler.schedule(("room", room.room_id), self.idle_timeout.total_seconds(), self._expire, room.room_id)
+
+    def _expire(self, room_id: str):
+        room = self.rooms.get(room_id)
+        if room is None or not room.is_empty():
+            # Al vaciarse de nuevo se vuelve a programar
+            return
+        idle = datetime.now() - room.last_activity
+        if idle < self.idle_timeout:
+            scheduler.schedule(("room", room_id), (self.idle_timeout - idle).total_seconds(), self._expire, room_id)
+            return
+        self.remove(room_id)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+registry = RoomRegistry()
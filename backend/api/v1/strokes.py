@@ -0,0 +1,309 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+# Subprotocolo WebSocket opcional para trazos binarios
+STROKE_SUBPROTOCOL = "pictionary.strokes.v1"
+
+# Códigos de operación de cada frame binario
+OP_POINTS = 0x01  # [op][varint stroke_id][varint n][zigzag-varint dx, dy] * n
+OP_CLEAR = 0x02   # [op]
+
+KNOWN_OPS = (OP_POINTS, OP_CLEAR)
+CLEAR_FRAME = bytes((OP_CLEAR,))
+
+# Coordenadas admitidas en un trazo (holgado para cualquier canvas, cabe de sobra en array("i"))
+MAX_COORD = 1 << 15
+# Un delta entre coordenadas acotadas (zigzag < 2^17) cabe en 3 bytes de varint
+MAX_DELTA_SHIFT = 3 * 7
+
+class StrokeFormatError(ValueError):
+    """Frame binario de trazos mal formado"""
+
+def _write_varint(buf: bytearray, value: int):
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise StrokeFormatError("Varint truncado")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift > 35:
+            raise StrokeFormatError("Varint demasiado largo")
+
+def encode_points(stroke_id: int, points: Sequence[int]) -> bytes:
+    """Codifica puntos planos [x0, y0, x1, y1, ...] como deltas zigzag/varint"""
+    buf = bytearray((OP_POINTS,))
+    _write_varint(buf, stroke_id)
+    _write_varint(buf, len(points) // 2)
+    last_x = last_y = 0
+    for i in range(0, len(points) - 1, 2):
+        x, y = points[i], points[i + 1]
+        dx, dy = x - last_x, y - last_y
+        _write_varint(buf, dx << 1 if dx >= 0 else (-dx << 1) - 1)
+        _write_varint(buf, dy << 1 if dy >= 0 else (-dy << 1) - 1)
+        last_x, last_y = x, y
+    return bytes(buf)
+
+def encode_clear() -> bytes:
+    """Codifica la orden de limpiar el canvas"""
+    return CLEAR_FRAME
+
+def decode_frames(data: bytes) -> Iterator[Tuple[int, int, array]]:
+    """Decodifica uno o varios frames concatenados en (op, stroke_id, puntos)"""
+    pos = 0
+    while pos < len(data):
+        op = data[pos]
+        pos += 1
+        if op == OP_CLEAR:
+            yield op, 0, array("i")
+        elif op == OP_POINTS:
+            stroke_id, pos = _read_varint(data, pos)
+            count, pos = _read_varint(data, pos)
+            points = array("i")
+            x = y = 0
+            for _ in range(count):
+                zx, pos = _read_varint(data, pos)
+                zy, pos = _read_varint(data, pos)
+                x += (zx >> 1) ^ -(zx & 1)
+                y += (zy >> 1) ^ -(zy & 1)
+                points.append(x)
+                points.append(y)
+            yield op, stroke_id, points
+        else:
+            raise StrokeFormatError(f"Operación desconocida: {op}")
+
+def validate_frame(data: bytes) -> bool:
+    """Recorre el frame una sola vez sin crear arrays: varints completos y cortos, coordenadas acotadas"""
+    end = len(data)
+    if not end:
+        return False
+    pos = 0
+    try:
+        while pos < end:
+            op = data[pos]
+            pos += 1
+            if op == OP_CLEAR:
+                continue
+            if op != OP_POINTS:
+                return False
+            _, pos = _read_varint(data, pos)
+            count, pos = _read_varint(data, pos)
+            # Cada delta ocupa al menos un byte: un conteo mayor que lo que queda es falso
+            if 2 * count > end - pos:
+                return False
+            x = y = 0
+            for i in range(2 * count):
+                # Varint en línea: el bucle por punto es el camino caliente de la ingesta
+                value = shift = 0
+                while True:
+                    if pos >= end or shift == MAX_DELTA_SHIFT:
+                        return False
+                    byte = data[pos]
+                    pos += 1
+                    value |= (byte & 0x7F) << shift
+                    shift += 7
+                    if not byte & 0x80:
+                        break
+                value = (value >> 1) ^ -(value & 1)
+                if i & 1:
+                    y += value
+                    if y > MAX_COORD or y < -MAX_COORD:
+                        return False
+                else:
+                    x += value
+                    if x > MAX_COORD or x < -MAX_COORD:
+                        return False
+    except StrokeFormatError:
+        return False
+    return True
+
+def frames_to_messages(data: bytes) -> List[dict]:
+    """Convierte frames binarios en mensajes JSON para clientes sin subprotocolo"""
+    messages = []
+    for op, stroke_id, points in decode_frames(data):
+        if op == OP_CLEAR:
+            messages.append({"type": "clear"})
+        else:
+            messages.append({"type": "draw", "stroke": stroke_id, "points": points.tolist()})
+    return messages
+
+def message_to_frame(message: dict) -> bytes:
+    """Convierte un mensaje JSON de trazo (draw/clear) en su frame binario"""
+    if message.get("type") == "clear":
+        return encode_clear()
+    stroke_id = int(message.get("stroke") or 0)
+    if "points" in message:
+        points = [int(v) for v in message["points"]]
+    elif "x1" in message:
+        points = [int(message["x1"]), int(message["y1"]), int(message["x2"]), int(message["y2"])]
+    else:
+        points = [int(message["x"]), int(message["y"])]
+    return encode_points(stroke_id, points)
+
+def valid_stroke_message(message: dict) -> bool:
+    """Aplica a un mensaje JSON de trazo las mismas comprobaciones que a un frame binario"""
+    try:
+        return validate_frame(message_to_frame(message))
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return False
+
+class StrokeBatch:
+    """Eventos de canvas pendientes de una sala, en orden de llegada"""
+    def __init__(self):
+        # (client_id emisor, frame binario o None, mensaje JSON o None)
+        self.events: List[Tuple[str, Optional[bytes], Optional[dict]]] = []
+
+    def add_frame(self, sender: str, frame: bytes):
+        self.events.append((sender, frame, None))
+
+    def add_message(self, sender: str, message: dict):
+        self.events.append((sender, None, message))
+
+    def senders(self) -> Set[str]:
+        return {sender for sender, _, _ in self.events}
+
+    def to_bytes(self, exclude: Optional[str] = None) -> bytes:
+        """Concatena todos los eventos como frames binarios"""
+        frames = []
+        for sender, frame, message in self.events:
+            if sender == exclude:
+                continue
+            if frame is None:
+                try:
+                    frame = message_to_frame(message)
+                except (KeyError, TypeError, ValueError, OverflowError):
+                    # Mensaje JSON de trazo mal formado: no se reenvía
+                    continue
+            frames.append(frame)
+        return b"".join(frames)
+
+    def to_messages(self, exclude: Optional[str] = None) -> List[dict]:
+        """Convierte todos los eventos en mensajes JSON"""
+        messages = []
+        for sender, frame, message in self.events:
+            if sender == exclude:
+                continue
+            if frame is not None:
+                try:
+                    messages.extend(frames_to_messages(frame))
+                except (ValueError, OverflowError, IndexError):
+                    # Sólo se pierde este evento, no el resto del tick
+                    continue
+            else:
+                messages.append(message)
+        return messages
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+class StrokeLog:
+    """Registro del dibujo de la ronda: checkpoint compactado + cola de eventos recientes"""
+    def __init__(self, max_points: int = 50000, compact_every: int = 256):
+        self.max_points = max_points
+        self.compact_every = compact_every
+        # Checkpoint: stroke_id -> puntos planos [x0, y0, x1, y1, ...] en orden de creación
+        self.strokes: Dict[int, array] = {}
+        self.point_count = 0
+        # Eventos aún sin compactar (frame binario o mensaje JSON)
+        self.tail: List[Union[bytes, dict]] = []
+        self._snapshot: Optional[bytes] = None
+
+    def clear(self):
+        """Vacía el registro (limpiar canvas o nueva ronda)"""
+        self.strokes = {}
+        self.point_count = 0
+        self.tail = []
+        self._snapshot = None
+
+    def append(self, event: Union[bytes, dict]):
+        """Añade un frame binario o un mensaje JSON de trazo"""
+        if event == CLEAR_FRAME or (isinstance(event, dict) and event.get("type") == "clear"):
+            self.clear()
+            return
+        self.tail.append(event)
+        self._snapshot = None
+        if len(self.tail) >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Incorpora la cola al checkpoint y aplica el límite de puntos"""
+        tail, self.tail = self.tail, []
+        for event in tail:
+            try:
+                frame = event if isinstance(event, bytes) else message_to_frame(event)
+                for op, stroke_id, points in decode_frames(frame):
+                    if op == OP_CLEAR:
+                        self.strokes = {}
+                        self.point_count = 0
+                    else:
+                        self._extend(stroke_id, points)
+            except (KeyError, TypeError, ValueError, OverflowError, IndexError):
+                # Evento mal formado: se descarta del registro
+                continue
+        if self.point_count > self.max_points:
+            self._decimate()
+
+    def _extend(self, stroke_id: int, points: array):
+        if points and (max(points) > MAX_COORD or min(points) < -MAX_COORD):
+            # Coordenadas acotadas: el snapshot de quien entra después no puede fallar
+            points = array("i", [min(max(v, -MAX_COORD), MAX_COORD) for v in points])
+        stroke = self.strokes.get(stroke_id)
+        if stroke is None:
+            stroke = self.strokes[stroke_id] = array("i")
+        elif len(stroke) >= 2 and len(points) >= 2 and stroke[-2] == points[0] and stroke[-1] == points[1]:
+            # Segmentos consecutivos comparten el punto de unión
+            points = points[2:]
+        stroke.extend(points)
+        self.point_count += len(points) // 2
+
+    def _decimate(self):
+        """Descarta puntos intermedios alternos (y, si no basta, los trazos más antiguos)"""
+        while self.point_count > self.max_points:
+            removed = 0
+            for stroke_id, stroke in self.strokes.items():
+                count = len(stroke) // 2
+                if count <= 2:
+                    continue
+                kept = array("i")
+                for i in range(0, count - 1, 2):
+                    kept.append(stroke[2 * i])
+                    kept.append(stroke[2 * i + 1])
+                kept.extend(stroke[-2:])
+                removed += count - len(kept) // 2
+                self.strokes[stroke_id] = kept
+            self.point_count -= removed
+            if removed == 0:
+                oldest = next(iter(self.strokes))
+                self.point_count -= len(self.strokes.pop(oldest)) // 2
+
+    def snapshot_frame(self) -> bytes:
+        """Dibujo completo como frames binarios concatenados (un frame por trazo)"""
+        if self.tail:
+            self.compact()
+        if self._snapshot is None:
+            self._snapshot = b"".join(
+                encode_points(stroke_id, stroke) for stroke_id, stroke in self.strokes.items()
+            )
+        return self._snapshot
+
+    def snapshot_messages(self) -> List[dict]:
+        """Dibujo completo como mensajes JSON (un mensaje por trazo)"""
+        if self.tail:
+            self.compact()
+        return [
+            {"type": "draw", "stroke": stroke_id, "points": stroke.tolist()}
+            for stroke_id, stroke in self.strokes.items()
+        ]
+
+    def __len__(self) -> int:
+        return self.point_count + len(self.tail)
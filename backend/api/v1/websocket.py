@@ -1,181 +1,605 @@
 from fastapi import WebSocket, WebSocketDisconnect, APIRouter, HTTPException
 from typing import Dict, Set, Optional
-import json
 import logging
 import asyncio
+import itertools
+import time
 from datetime import datetime, timedelta
-from .game_state import game_state
+from .connection import Connection, RemoteConnection, frame_from_wire, frame_to_wire
+from .rooms import Room, registry
+from .strokes import STROKE_SUBPROTOCOL, StrokeBatch, valid_stroke_message, validate_frame
+from core import codec
+from core.backplane import Backplane, InProcessBackplane, create_backplane, worker_channel
+from core.config import settings
+from core.logs import get_logger
+from core.metrics import BROADCAST_SECONDS, MESSAGES_RECEIVED, RATE_LIMITED, counter, gauge
+from core.ratelimit import RateLimiter, parse_limits, peek_type
+from core.scheduler import scheduler
+from services.score_store import score_store
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+logger = get_logger(__name__)
 
 router = APIRouter()
 players = []  # Global y compartido
 
+# Campos de trazo que se reenvían tal cual al resto de la sala
+STROKE_FIELDS = ("x1", "y1", "x2", "y2", "x", "y", "isStart", "stroke", "points")
+
+# Tipos de mensaje con métrica propia; el resto cuenta como "unknown"
+MESSAGE_TYPES = frozenset(("join", "sync", "guess", "draw", "clear", "ping"))
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.player_connections: Dict[str, str] = {}  # player_name -> client_id
+        self.active_connections: Dict[str, Connection] = {}
+        self.client_rooms: Dict[str, Room] = {}  # client_id -> sala
         self.connection_states: Dict[str, bool] = {}  # client_id -> is_connected
+        self.binary_clients: Set[str] = set()  # clientes con subprotocolo de trazos binarios
         self.last_ping: Dict[str, datetime] = {}  # client_id -> last_ping_time
         self.ping_timeout = timedelta(seconds=30)
-        self._lock = asyncio.Lock()
-        self._cleanup_task = None
-        self.frontend_client = None
-        self.desktop_client = None
-
-    async def start_cleanup_task(self):
-        """Inicia la tarea de limpieza periódica"""
-        if self._cleanup_task is None:
-            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-
-    async def _cleanup_loop(self):
-        """Loop de limpieza periódica de conexiones muertas"""
-        while True:
-            try:
-                await self.cleanup_dead_connections()
-                await asyncio.sleep(10)  # Revisar cada 10 segundos
-            except Exception as e:
-                logger.error(f"Error en cleanup loop: {e}")
+        self.rate_limits = parse_limits(settings.RATE_LIMITS)
+        self.limiters: Dict[str, RateLimiter] = {}  # client_id -> buckets por tipo de mensaje
+        self._client_ids = itertools.count()
+        # Clúster: este worker, el backplane y las conexiones reenviadas a otros workers
+        self.worker_id = settings.WORKER_ID
+        self.backplane: Optional[Backplane] = None
+        self.relays: Dict[str, Connection] = {}  # client_id -> WebSocket local de una sala remota
+        self._pending_relays: Dict[str, asyncio.Future] = {}
 
-    async def cleanup_dead_connections(self):
-        """Limpia conexiones que no han respondido al ping"""
-        async with self._lock:
-            now = datetime.now()
-            to_remove = []
-            
-            for client_id, last_ping in list(self.last_ping.items()):
-                if now - last_ping > self.ping_timeout:
-                    logger.warning(f"Cliente {client_id} no responde desde {last_ping}")
-                    to_remove.append(client_id)
-            
-            for client_id in to_remove:
-                await self.disconnect(client_id)
+    def new_client_id(self) -> str:
+        """Genera un identificador de cliente único en el clúster"""
+        return f"client_{self.worker_id}_{next(self._client_ids)}"
+
+    def _mark_alive(self, client_id: str):
+        """Un envío exitoso cuenta como señal de vida del cliente"""
+        if client_id in self.last_ping:
+            self.last_ping[client_id] = datetime.now()
+
+    def _evict(self, client_id: str, reason: str):
+        """Expulsa un cliente lento o caído reutilizando la limpieza de disconnect"""
+        self.connection_states[client_id] = False
+        asyncio.ensure_future(self.disconnect(client_id))
+
+    def send(self, client_id: str, data) -> bool:
+        """Encola un frame para un cliente sin esperar al envío"""
+        connection = self.active_connections.get(client_id)
+        if connection is None or not self.connection_states.get(client_id, False):
+            return False
+        return connection.send(data)
+
+    def send_json(self, client_id: str, message: dict) -> bool:
+        """Encola un mensaje JSON para un cliente"""
+        return self.send(client_id, codec.dumps(message))
+
+    def admit(self, client_id: str, message_type: Optional[str]) -> bool:
+        """Aplica el límite del tipo de mensaje; lo que lo excede se descarta"""
+        limiter = self.limiters.get(client_id)
+        if limiter is None or limiter.allow(message_type):
+            return True
+        RATE_LIMITED.inc(message_type if message_type in MESSAGE_TYPES or message_type == "stroke_binary" else "other")
+        logger.warning("Mensaje descartado por límite", client_id=client_id, type=message_type, every=5.0)
+        return False
+
+    def admit_frame(self, client_id: str, data) -> bool:
+        """Límite de un frame antes de decodificarlo: binario de trazos o tipo leído del JSON"""
+        if isinstance(data, bytes):
+            return self.admit(client_id, "stroke_binary")
+        return self.admit(client_id, peek_type(data))
 
-    async def connect(self, websocket: WebSocket, client_id: str, client_type: str):
-        """Establece una nueva conexión WebSocket"""
-        logger.info(f"Nueva conexión WebSocket recibida: {client_id} ({client_type})")
+    def rate_limited(self) -> Dict[str, int]:
+        """Mensajes descartados por límite de cada conexión que ha tenido alguno"""
+        return {
+            client_id: limiter.violations
+            for client_id, limiter in self.limiters.items()
+            if limiter.violations
+        }
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Profundidad de la cola de salida de cada conexión"""
+        return {
+            client_id: connection.queue_depth
+            for client_id, connection in self.active_connections.items()
+        }
+
+    def _watch_ping(self, client_id: str, delay: Optional[float] = None):
+        """Programa la revisión del ping del cliente para cuando venza su plazo"""
+        if delay is None:
+            delay = self.ping_timeout.total_seconds()
+        scheduler.schedule(("ping", client_id), delay, self._check_ping, client_id)
+
+    def _check_ping(self, client_id: str):
+        """Vence el plazo de ping: desconecta o reprograma por el tiempo que falta"""
+        last_ping = self.last_ping.get(client_id)
+        if last_ping is None:
+            return
+        idle = datetime.now() - last_ping
+        if idle < self.ping_timeout:
+            # Hubo señal de vida desde que se programó: sólo se mueve el plazo
+            self._watch_ping(client_id, (self.ping_timeout - idle).total_seconds())
+            return
+        logger.warning(f"Cliente {client_id} no responde desde {last_ping}")
+        room = self.client_rooms.get(client_id)
+        if room is not None:
+            room.post(self.leave, room, client_id)
+
+    def _expire_player(self, room: Room, player_name: str):
+        """Vence la gracia de desconexión de un jugador (dentro del actor)"""
+        if room.game_state.expire_player(player_name):
+            room.revoke_token(player_name)
+            self.broadcast_state(room)
+
+    def has_slot(self, client_type: str, room: Room) -> bool:
+        """Verifica que no exista ya una conexión del mismo tipo en la sala"""
+        if client_type == "frontend" and room.frontend_client is not None:
+            logger.warning(f"Ya existe una conexión frontend en la sala {room.room_id}")
+            return False
+        elif client_type == "desktop" and room.desktop_client is not None:
+            logger.warning(f"Ya existe una conexión desktop en la sala {room.room_id}")
+            return False
+        return True
+
+    async def connect(self, websocket: WebSocket, client_id: str, client_type: str, room: Room, resume_token: Optional[str] = None):
+        """Establece una nueva conexión WebSocket dentro de una sala"""
+        logger.info(f"Nueva conexión WebSocket recibida: {client_id} ({client_type}) en sala {room.room_id}")
+        # El hueco se reserva en el actor antes de aceptar: dos clientes del mismo tipo no pueden colarse a la vez
+        if not await room.call(self._claim_slot, client_id, client_type, room, resume_token):
+            return False
         try:
-            # Verificar si ya existe una conexión del mismo tipo
-            if client_type == "frontend" and self.frontend_client is not None:
-                logger.warning("Ya existe una conexión frontend")
-                return False
-            elif client_type == "desktop" and self.desktop_client is not None:
-                logger.warning("Ya existe una conexión desktop")
-                return False
-
-            await websocket.accept()
-            logger.info(f"Conexión aceptada: {client_id}")
-            async with self._lock:
-                self.active_connections[client_id] = websocket
-                self.connection_states[client_id] = True
-                self.last_ping[client_id] = datetime.now()
-                
-                # Guardar referencia al tipo de cliente
-                if client_type == "frontend":
-                    self.frontend_client = client_id
-                elif client_type == "desktop":
-                    self.desktop_client = client_id
-                
+            # Negociar el subprotocolo binario de trazos si el cliente lo ofrece
+            binary = STROKE_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+            await websocket.accept(subprotocol=STROKE_SUBPROTOCOL if binary else None)
+            logger.info(f"Conexión aceptada: {client_id} (trazos binarios: {binary})")
+            connection = Connection(
+                websocket,
+                client_id,
+                on_sent=self._mark_alive,
+                on_failure=self._evict
+            )
+            connection.start()
+            await room.call(self._register, connection, client_id, room, binary)
             return True
         except Exception as e:
             logger.error(f"Error al aceptar conexión: {e}")
+            room.post(self._release_slot, client_id, room)
             return False
 
+    def _claim_slot(self, client_id: str, client_type: str, room: Room, resume_token: Optional[str] = None) -> bool:
+        """Reserva el hueco del tipo de cliente en la sala (dentro del actor)"""
+        occupant = room.frontend_client if client_type == "frontend" else room.desktop_client if client_type == "desktop" else None
+        player_name = room.player_for_token(resume_token)
+        if occupant is not None and player_name is not None and room.player_for(occupant) == player_name:
+            # El mismo jugador reanuda con su socket anterior medio abierto: se libera sin
+            # marcarlo como desconectado, así la reanudación no cambia el estado de la sala
+            logger.info(f"Jugador {player_name} reanuda desde {client_id}; se libera {occupant}")
+            room.unbind_client(occupant)
+            self.release(occupant)
+        if not self.has_slot(client_type, room):
+            return False
+        # Guardar referencia al tipo de cliente
+        if client_type == "frontend":
+            room.frontend_client = client_id
+        elif client_type == "desktop":
+            room.desktop_client = client_id
+        return True
+
+    def _release_slot(self, client_id: str, room: Room):
+        """Libera el hueco que ocupaba el cliente en la sala (dentro del actor)"""
+        if room.frontend_client == client_id:
+            room.frontend_client = None
+        if room.desktop_client == client_id:
+            room.desktop_client = None
+
+    def _register(self, connection, client_id: str, room: Room, binary: bool):
+        """Da de alta una conexión (local o remota) en el manager y en la sala (dentro del actor)"""
+        self.active_connections[client_id] = connection
+        if binary:
+            self.binary_clients.add(client_id)
+        self.client_rooms[client_id] = room
+        self.connection_states[client_id] = True
+        self.last_ping[client_id] = datetime.now()
+        self._watch_ping(client_id)
+        if self.rate_limits:
+            self.limiters[client_id] = RateLimiter(self.rate_limits)
+        room.clients.add(client_id)
+        room.touch()
+
+    async def start_backplane(self):
+        """Conecta este worker al backplane y escucha su canal"""
+        if settings.WORKER_COUNT <= 1 or self.backplane is not None:
+            return
+        self.backplane = create_backplane(settings.BACKPLANE_URL)
+        if isinstance(self.backplane, InProcessBackplane):
+            logger.error(f"Backplane en memoria con WORKER_COUNT={settings.WORKER_COUNT}: los demás workers no recibirán los mensajes de este")
+        await self.backplane.start()
+        await self.backplane.subscribe(worker_channel(self.worker_id), self._on_backplane_message)
+        logger.info(f"Worker {self.worker_id}/{settings.WORKER_COUNT} conectado a {settings.BACKPLANE_URL}")
+
+    async def stop_backplane(self):
+        """Desconecta este worker del backplane"""
+        if self.backplane is not None:
+            await self.backplane.stop()
+            self.backplane = None
+
+    def owner_of(self, room_id: str) -> int:
+        """Worker dueño de una sala"""
+        return registry.owner_of(room_id)
+
+    async def _on_backplane_message(self, message: dict):
+        """Atiende los mensajes del backplane dirigidos a este worker"""
+        kind = message.get("kind")
+        client_id = message.get("client_id")
+        
+        # Como dueño de la sala: eventos de clientes conectados a otro worker.
+        # Se encolan en el actor de la sala sin esperar, para que una sala lenta no frene al resto
+        if kind == "open":
+            room = registry.get_or_create(message["room"], message.get("language"), message.get("category"))
+            room.post(self._open_remote, room, message)
+        elif kind == "frame":
+            room = self.client_rooms.get(client_id)
+            if room is None or not self.is_connected(client_id):
+                return
+            self.last_ping[client_id] = datetime.now()
+            data = frame_from_wire(message)
+            if not self.admit_frame(client_id, data):
+                return
+            if isinstance(data, bytes):
+                room.post(handle_stroke_frame, room, client_id, data)
+            else:
+                connection = self.active_connections[client_id]
+                room.post(handle_text_frame, room, client_id, connection.client_type, data)
+        elif kind == "leave":
+            room = self.client_rooms.get(client_id)
+            if room is not None:
+                room.post(self.leave, room, client_id)
+        
+        # Como worker de entrada: respuestas y frames del dueño de la sala
+        elif kind in ("accept", "reject"):
+            future = self._pending_relays.pop(client_id, None)
+            if future is not None and not future.done():
+                future.set_result(kind == "accept")
+        elif kind == "data":
+            connection = self.relays.get(client_id)
+            if connection is not None:
+                connection.send(frame_from_wire(message))
+        elif kind == "close":
+            connection = self.relays.pop(client_id, None)
+            if connection is not None:
+                await connection.close()
+
+    def _open_remote(self, room: Room, message: dict):
+        """Alta de un cliente cuyo WebSocket vive en otro worker (dentro del actor)"""
+        client_id = message["client_id"]
+        client_type = message["client_type"]
+        reply_channel = worker_channel(message["worker"])
+        logger.info(f"Conexión remota {client_id} ({client_type}) desde worker {message['worker']} en sala {room.room_id}")
+        
+        if not self._claim_slot(client_id, client_type, room, message.get("resume")):
+            self.backplane.publish(reply_channel, {"kind": "reject", "client_id": client_id})
+            return
+        
+        connection = RemoteConnection(
+            self.backplane,
+            reply_channel,
+            client_id,
+            client_type,
+            on_sent=self._mark_alive
+        )
+        self._register(connection, client_id, room, message.get("binary", False))
+        self.backplane.publish(reply_channel, {"kind": "accept", "client_id": client_id})
+        self.open_session(client_id, room, message.get("resume"), message.get("version"))
+
+    async def relay(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        client_type: str,
+        room_id: str,
+        owner: int,
+        language: Optional[str] = None,
+        category: Optional[str] = None,
+        resume_token: Optional[str] = None,
+        resume_version: Optional[str] = None
+    ):
+        """Acepta un WebSocket de una sala de otro worker y reenvía sus frames por el backplane"""
+        if self.backplane is None:
+            logger.error(f"Sala {room_id} pertenece al worker {owner} pero no hay backplane")
+            return
+        owner_channel = worker_channel(owner)
+        binary = STROKE_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+        
+        # La conexión se crea antes de pedir el alta: los frames que lleguen se encolan
+        connection = Connection(websocket, client_id, on_failure=self._relay_failed)
+        future = asyncio.get_running_loop().create_future()
+        self._pending_relays[client_id] = future
+        self.relays[client_id] = connection
+        self.backplane.publish(owner_channel, {
+            "kind": "open",
+            "client_id": client_id,
+            "client_type": client_type,
+            "room": room_id,
+            "language": language,
+            "category": category,
+            "resume": resume_token,
+            "version": resume_version,
+            "binary": binary,
+            "worker": self.worker_id
+        })
+        
+        try:
+            accepted = await asyncio.wait_for(future, settings.BACKPLANE_OPEN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.error(f"El worker {owner} no respondió al alta de {client_id}")
+            accepted = False
+        finally:
+            self._pending_relays.pop(client_id, None)
+        if not accepted:
+            self.relays.pop(client_id, None)
+            return
+        
+        await websocket.accept(subprotocol=STROKE_SUBPROTOCOL if binary else None)
+        logger.info(f"Conexión {client_id} reenviada al worker {owner} (trazos binarios: {binary})")
+        connection.start()
+        try:
+            while client_id in self.relays:
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                data = frame.get("text")
+                if data is None:
+                    data = frame.get("bytes") or b""
+                self.backplane.publish(
+                    owner_channel,
+                    frame_to_wire({"kind": "frame", "client_id": client_id}, data)
+                )
+        except Exception as e:
+            logger.error(f"Error reenviando frames de {client_id}: {e}")
+        finally:
+            connection.stop()
+            if self.relays.pop(client_id, None) is not None:
+                self.backplane.publish(owner_channel, {"kind": "leave", "client_id": client_id})
+
+    def _relay_failed(self, client_id: str, reason: str):
+        """Cliente reenviado lento o caído: se avisa al dueño y se cierra el WebSocket"""
+        connection = self.relays.get(client_id)
+        if connection is not None:
+            asyncio.ensure_future(connection.close())
+
     async def disconnect(self, client_id: str):
         """Maneja la desconexión de un cliente"""
+        room = self.client_rooms.get(client_id)
+        if room is None:
+            return
+        # leave difunde el parche de la desconexión: no quedan cambios sin versionar
+        await room.call(self.leave, room, client_id)
+
+    def leave(self, room: Room, client_id: str):
+        """Desconecta un cliente y difunde el estado resultante (dentro del actor)"""
+        self.release(client_id)
+        self.broadcast_state(room)
+
+    def release(self, client_id: str):
+        """Libera un cliente de su sala (dentro del actor); el cierre del WebSocket no se espera"""
+        room = self.client_rooms.get(client_id)
+        if room is None:
+            return
         logger.info(f"Desconexión de WebSocket: {client_id}")
-        async with self._lock:
-            # Cerrar WebSocket si está abierto
-            if client_id in self.active_connections:
-                try:
-                    await self.active_connections[client_id].close()
-                except Exception as e:
-                    logger.error(f"Error cerrando WebSocket {client_id}: {e}")
-                finally:
-                    del self.active_connections[client_id]
-            
-            # Limpiar estados
-            if client_id in self.connection_states:
-                del self.connection_states[client_id]
-            if client_id in self.last_ping:
-                del self.last_ping[client_id]
-            
-            # Encontrar y marcar como desconectado al jugador asociado
-            player_name = None
-            for name, cid in list(self.player_connections.items()):
-                if cid == client_id:
-                    player_name = name
-                    break
-            
-            if player_name:
-                logger.info(f"Marcando jugador {player_name} como desconectado")
-                game_state.mark_player_disconnected(player_name)
-                # Limpiar la conexión del jugador
-                if player_name in self.player_connections:
-                    del self.player_connections[player_name]
-
-    async def send_game_state(self, websocket: WebSocket, player_name: str = None):
-        """Envía el estado del juego a un cliente específico con mensajes personalizados"""
+        
+        # Cerrar WebSocket si está abierto
+        connection = self.active_connections.pop(client_id, None)
+        if connection is not None:
+            asyncio.ensure_future(self._close(client_id, connection))
+        
+        # Limpiar estados
+        if client_id in self.connection_states:
+            del self.connection_states[client_id]
+        if client_id in self.last_ping:
+            del self.last_ping[client_id]
+        scheduler.cancel(("ping", client_id))
+        self.limiters.pop(client_id, None)
+        self.binary_clients.discard(client_id)
+        self.client_rooms.pop(client_id, None)
+        
+        # Liberar la conexión en la sala
+        room.clients.discard(client_id)
+        room.touch()
+        self._release_slot(client_id, room)
+        
+        # Liberar y marcar como desconectado al jugador asociado
+        player_name = room.unbind_client(client_id)
+        if player_name:
+            logger.info(f"Marcando jugador {player_name} como desconectado")
+            room.game_state.mark_player_disconnected(player_name)
+            scheduler.schedule(
+                ("player", room.room_id, player_name),
+                room.game_state.disconnect_timeout.total_seconds(),
+                room.post,
+                self._expire_player,
+                room,
+                player_name
+            )
+        
+        if room.is_empty():
+            registry.schedule_expiry(room)
+
+    async def _close(self, client_id: str, connection):
         try:
-            state = game_state.get_state()
-            logger.info(f"Enviando estado a {player_name or 'todos los clientes'}: {state}")
-            
-            # Preparar mensaje base
-            message = {
-                "type": "state",
-                "state": state
-            }
-            
-            # Agregar mensaje personalizado si se proporciona el nombre del jugador
-            if player_name and player_name in state["players"]:
-                player = state["players"][player_name]
-                if player["is_drawer"]:
-                    message["status_message"] = f"Es tu turno para dibujar: {state['current_word']}"
-                else:
-                    message["status_message"] = "Es tu turno para adivinar"
-            
-            await websocket.send_json(message)
-            logger.info(f"Estado enviado exitosamente a {player_name or 'todos los clientes'}")
+            await connection.close()
         except Exception as e:
-            logger.error(f"Error al enviar estado: {e}")
-            raise
-
-    async def broadcast_state(self):
-        """Envía el estado del juego a todos los clientes conectados"""
-        state = game_state.get_state()
-        logger.info(f"Enviando estado a todos los clientes: {state}")
-        disconnected_clients = []
+            logger.error(f"Error cerrando WebSocket {client_id}: {e}")
+
+    def open_session(self, client_id: str, room: Room, resume_token: Optional[str] = None, version=None):
+        """Estado inicial de un cliente recién conectado o reanudación de su sesión (dentro del actor)"""
+        if resume_token:
+            if self.resume(client_id, room, resume_token, version):
+                return
+            RESUMES.inc("failed")
+            # El cliente vuelve a entrar con join
+            self.send_json(client_id, {"type": "resume_failed"})
+        self.send_game_state(client_id, room)
+        logger.info(f"Estado inicial enviado a {client_id}")
+
+    def resume(self, client_id: str, room: Room, token: str, version) -> bool:
+        """Reengancha al jugador del token enviándole sólo lo que se perdió, sin join ni snapshot general"""
+        game_state = room.game_state
+        player_name = room.player_for_token(token)
+        player = game_state.players.get(player_name) if player_name else None
+        if player is None:
+            return False
+        try:
+            version = int(version)
+        except (TypeError, ValueError):
+            version = -1
         
-        # Usar list() para evitar modificar el diccionario durante la iteración
-        for client_id, connection in list(self.active_connections.items()):
-            try:
-                if self.connection_states.get(client_id, False):
-                    # Encontrar el jugador asociado a este cliente
-                    player_name = None
-                    for name, cid in list(self.player_connections.items()):
-                        if cid == client_id:
-                            player_name = name
-                            break
-                    
-                    await self.send_game_state(connection, player_name)
-                    # Actualizar último ping exitoso
-                    self.last_ping[client_id] = datetime.now()
-            except Exception as e:
-                logger.error(f"Error al enviar estado a {client_id}: {e}")
-                disconnected_clients.append(client_id)
+        old_client_id = room.player_connections.get(player_name)
+        if old_client_id is not None and old_client_id != client_id:
+            room.unbind_client(old_client_id)
+            self.release(old_client_id)
+        scheduler.cancel(("player", room.room_id, player_name))
+        room.bind_player(player_name, client_id)
+        if not player.is_connected:
+            game_state.add_player(player_name, player.client_type)
+        # Versionar primero la reconexión: el resto recibe el parche y este cliente lo recupera con lo perdido
+        self.broadcast_state(room, skip=client_id)
         
-        # Limpiar conexiones desconectadas después de terminar el envío
-        for client_id in disconnected_clients:
-            await self.disconnect(client_id)
+        missed = room.patches_since(version)
+        if missed is None:
+            # El hueco ya no está en el buffer: estado completo sólo para este cliente
+            RESUMES.inc("snapshot")
+            self.send_game_state(client_id, room, player_name)
+        else:
+            RESUMES.inc("replay")
+            for data in missed:
+                self.send(client_id, data)
+            private = game_state.get_private_state(player_name)
+            if private is not None:
+                self.send_json(client_id, private)
+        self.send_json(client_id, {"type": "resumed", "name": player_name, "missed": len(missed or ())})
+        self.send_canvas(client_id, room)
+        logger.info(f"Jugador {player_name} reanudó su sesión en {client_id}")
+        return True
+
+    def send_game_state(self, client_id: str, room: Room, player_name: str = None):
+        """Encola el snapshot público compartido y, si hay jugador, su mensaje privado"""
+        logger.debug("Enviando estado", version=room.game_state.version, to=player_name or client_id)
+        sent = self.send(client_id, room.game_state.public_snapshot())
+        if player_name:
+            private = room.game_state.get_private_state(player_name)
+            if private is not None:
+                self.send_json(client_id, private)
+        return sent
+
+    def broadcast_state(self, room: Room, skip: Optional[str] = None):
+        """Encola para toda la sala el parche con los cambios desde la última versión (skip recibe después su estado completo)"""
+        game_state = room.game_state
+        patch = game_state.commit_patch()
+        if patch is not None:
+            start = time.perf_counter()
+            logger.debug("Enviando parche", room=room.room_id, version=patch["version"], changes=lambda: patch["changes"])
+            data = codec.dumps(patch)
+            room.remember_patch(patch["base_version"], patch["version"], data)
+            
+            # Usar list() para evitar modificar el conjunto durante la iteración
+            for client_id in list(room.clients):
+                if client_id != skip:
+                    self.send(client_id, data)
+            BROADCAST_SECONDS.observe(time.perf_counter() - start, "patch")
+        
+        if game_state.take_private_changed():
+            # Nuevo drawer o nueva palabra: empieza una ronda con el canvas vacío
+            start = time.perf_counter()
+            room.stroke_log.clear()
+            self.send_private_states(room, skip)
+            BROADCAST_SECONDS.observe(time.perf_counter() - start, "private")
+
+    def send_private_states(self, room: Room, skip: Optional[str] = None):
+        """Envía la palabra sólo al drawer; los adivinadores comparten un mensaje idéntico"""
+        game_state = room.game_state
+        guesser_data = None
+        for client_id in list(room.clients):
+            if client_id == skip:
+                continue
+            player_name = room.player_for(client_id)
+            if not player_name:
+                continue
+            if player_name == game_state.current_drawer:
+                private = game_state.get_private_state(player_name)
+                if private is not None:
+                    self.send_json(client_id, private)
+            else:
+                if guesser_data is None:
+                    guesser_data = codec.dumps(game_state.get_private_state(player_name))
+                self.send(client_id, guesser_data)
+
+    def send_canvas(self, client_id: str, room: Room):
+        """Envía en un solo frame el dibujo actual de la ronda a quien llega o reconecta"""
+        if not len(room.stroke_log):
+            return
+        if client_id in self.binary_clients:
+            self.send(client_id, room.stroke_log.snapshot_frame())
+        else:
+            self.send_json(client_id, {"type": "strokes", "events": room.stroke_log.snapshot_messages()})
+
+    def queue_stroke(self, room: Room, client_id: str, frame: Optional[bytes] = None, message: Optional[dict] = None):
+        """Encola un evento de canvas (trazo o limpiar) para el próximo tick de la sala"""
+        if frame is not None:
+            room.stroke_batch.add_frame(client_id, frame)
+            room.stroke_log.append(frame)
+        else:
+            room.stroke_batch.add_message(client_id, message)
+            room.stroke_log.append(message)
+        
+        if room._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            room._flush_handle = loop.call_later(
+                settings.STROKE_FLUSH_INTERVAL_MS / 1000,
+                room.post,
+                self.flush_strokes,
+                room
+            )
+
+    def flush_strokes(self, room: Room):
+        """Encola un único frame por destinatario con todos los eventos de canvas acumulados (dentro del actor)"""
+        room._flush_handle = None
+        batch, room.stroke_batch = room.stroke_batch, StrokeBatch()
+        if not batch:
+            return
+        
+        start = time.perf_counter()
+        senders = batch.senders()
+        shared_bytes = None
+        shared_text = None
+        
+        for client_id in list(room.clients):
+            if not self.connection_states.get(client_id, False):
+                continue
+            binary = client_id in self.binary_clients
+            if client_id in senders:
+                # El emisor no recibe sus propios trazos
+                if binary:
+                    data = batch.to_bytes(exclude=client_id)
+                else:
+                    events = batch.to_messages(exclude=client_id)
+                    data = codec.dumps({"type": "strokes", "events": events}) if events else None
+            elif binary:
+                if shared_bytes is None:
+                    shared_bytes = batch.to_bytes()
+                data = shared_bytes
+            else:
+                if shared_text is None:
+                    shared_text = codec.dumps({"type": "strokes", "events": batch.to_messages()})
+                data = shared_text
+            
+            if data:
+                self.send(client_id, data)
+        BROADCAST_SECONDS.observe(time.perf_counter() - start, "strokes")
 
     def get_client_type(self, headers: dict) -> str:
         """Determina el tipo de cliente basado en los headers"""
         user_agent = headers.get("user-agent", "").lower()
         origin = headers.get("origin", "").lower()
         
-        logger.info(f"Headers recibidos - User-Agent: {user_agent}, Origin: {origin}")
+        logger.debug("Headers recibidos", user_agent=user_agent, origin=origin)
         
         if "pictionarydesktop" in user_agent:
             return "desktop"
@@ -189,141 +613,224 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+def _queue_depth_metrics():
+    """Profundidad de cola de las conexiones con envíos pendientes"""
+    return {(client_id,): depth for client_id, depth in manager.queue_depths().items() if depth}
+
+def _connected_players() -> int:
+    return sum(
+        1
+        for room in registry.rooms.values()
+        for player in room.game_state.players.values()
+        if player.is_connected
+    )
+
+RESUMES = counter("pictionary_session_resumes_total", "Reanudaciones de sesión por resultado", ("result",))
+
+gauge("pictionary_send_queue_depth", "Frames pendientes por conexión (sólo las que tienen cola)", ("client_id",), _queue_depth_metrics)
+gauge("pictionary_send_queue_depth_max", "Mayor cola de salida entre todas las conexiones",
+      callback=lambda: max(manager.queue_depths().values(), default=0))
+gauge("pictionary_rooms", "Salas activas", callback=lambda: len(registry))
+gauge("pictionary_players", "Jugadores conectados", callback=_connected_players)
+gauge("pictionary_connections", "Conexiones WebSocket activas", callback=lambda: len(manager.active_connections))
+
+def handle_stroke_frame(room: Room, client_id: str, frame: bytes):
+    """Fast path de trazos binarios: se valida el frame una vez y se reenvía sin recodificar (dentro del actor)"""
+    MESSAGES_RECEIVED.inc("stroke_binary")
+    # Un frame mal formado nunca llega al lote ni al registro: rompería los frames concatenados tras él
+    if not validate_frame(frame):
+        logger.warning("Frame binario inválido", client_id=client_id, every=5.0)
+        return
+    
+    player_name = room.player_for(client_id)
+    if player_name and player_name == room.game_state.current_drawer:
+        manager.queue_stroke(room, client_id, frame=frame)
+    else:
+        manager.send_json(client_id, {
+            "type": "error",
+            "message": "No es tu turno para dibujar"
+        })
+
+def handle_text_frame(room: Room, client_id: str, client_type: str, data: str):
+    """Decodifica y despacha un mensaje JSON de un cliente de la sala (dentro del actor)"""
+    try:
+        message = codec.loads(data)
+    except codec.DecodeError as e:
+        MESSAGES_RECEIVED.inc("invalid")
+        logger.warning("Error decodificando mensaje", client_id=client_id, error=str(e), every=5.0)
+        return
+    message_type = message.get("type")
+    # El límite se aplicó al tipo leído sin decodificar; si no coincide, se cobra también el real
+    if message_type != peek_type(data) and not manager.admit(client_id, message_type):
+        return
+    MESSAGES_RECEIVED.inc(message_type if message_type in MESSAGE_TYPES else "unknown")
+    logger.debug("Mensaje recibido", client_id=client_id, data=data, sample=settings.LOG_MESSAGE_SAMPLE)
+    game_state = room.game_state
+
+    if message["type"] == "join":
+        player_name = message.get("name")
+        if not player_name:
+            logger.error("Error: nombre de jugador no proporcionado")
+            manager.send_json(client_id, {
+                "type": "error",
+                "message": "Nombre de jugador requerido"
+            })
+            return
+
+        logger.info(f"Jugador {player_name} uniéndose como {client_type}")
+
+        # Verificar si el jugador ya existe
+        old_client_id = room.player_connections.get(player_name)
+        if old_client_id is not None and old_client_id != client_id:
+            logger.info(f"Jugador {player_name} reconectando desde {old_client_id} a {client_id}")
+            # release cierra el socket anterior y libera ambos índices
+            manager.release(old_client_id)
+
+        if game_state.add_player(player_name, client_type):
+            room.bind_player(player_name, client_id)
+            logger.info(f"Jugador {player_name} añadido/actualizado")
+            # Token para reanudar la sesión sin join si se corta la conexión
+            manager.send_json(client_id, {"type": "session", "token": room.issue_token(player_name)})
+            # Versionar el join antes del snapshot: el jugador recibe el estado ya con su alta
+            manager.broadcast_state(room, skip=client_id)
+            manager.send_game_state(client_id, room, player_name)
+            manager.send_canvas(client_id, room)
+        else:
+            manager.send_json(client_id, {
+                "type": "error",
+                "message": "No se pudo unir al juego"
+            })
+
+    elif message["type"] == "ping":
+        # Latido de la aplicación: la recepción ya renovó last_ping, basta con contestar
+        manager.send_json(client_id, {"type": "pong"})
+
+    elif message["type"] == "sync":
+        # El cliente detectó un hueco de versiones y pide el estado completo
+        manager.send_game_state(client_id, room, room.player_for(client_id))
+        manager.send_canvas(client_id, room)
+
+    elif message["type"] == "guess":
+        if not game_state.game_started or game_state.game_paused:
+            manager.send_json(client_id, {
+                "type": "error",
+                "message": "El juego no está activo"
+            })
+            return
+
+        player_name = room.player_for(client_id)
+        if not player_name:
+            logger.error("Error: jugador no encontrado para adivinar", client_id=client_id, every=5.0)
+            return
+
+        if game_state.handle_guess(player_name, message.get("guess")):
+            for word, drawer, guesser in game_state.take_finished_rounds():
+                score_store.record_round(room.room_id, word, drawer, guesser)
+            manager.broadcast_state(room)
+        elif settings.GUESS_CLOSE_HINT and game_state.is_close_guess(message.get("guess")):
+            manager.send_json(client_id, {
+                "type": "close_guess",
+                "message": "¡Casi! Estás muy cerca"
+            })
+
+    elif message["type"] == "draw":
+        player_name = room.player_for(client_id)
+        if not player_name:
+            logger.error("Error: jugador no encontrado para dibujar", client_id=client_id, every=5.0)
+            return
+
+        if player_name == game_state.current_drawer:
+            stroke = {"type": "draw"}
+            for field in STROKE_FIELDS:
+                if field in message:
+                    stroke[field] = message[field]
+            if "stroke" not in stroke and "x" in stroke:
+                # Sin id todos los puntos caerían en el trazo 0 y se unirían con líneas fantasma
+                if stroke.get("isStart"):
+                    room.web_stroke_id += 1
+                stroke["stroke"] = room.web_stroke_id
+            if not valid_stroke_message(stroke):
+                logger.warning("Mensaje de trazo inválido", client_id=client_id, every=5.0)
+                return
+            manager.queue_stroke(room, client_id, message=stroke)
+        else:
+            manager.send_json(client_id, {
+                "type": "error",
+                "message": "No es tu turno para dibujar"
+            })
+
+    elif message["type"] == "clear":
+        player_name = room.player_for(client_id)
+        if not player_name:
+            logger.error("Error: jugador no encontrado para limpiar", client_id=client_id, every=5.0)
+            return
+
+        if player_name == game_state.current_drawer:
+            manager.queue_stroke(room, client_id, message={"type": "clear"})
+        else:
+            manager.send_json(client_id, {
+                "type": "error",
+                "message": "No es tu turno para dibujar"
+            })
+    else:
+        logger.warning("Tipo de mensaje desconocido", type=message_type, every=5.0)
+
 @router.websocket("/ws")
 
 async def websocket_endpoint(websocket: WebSocket):
-    client_id = f"client_{len(manager.active_connections)}"
-    
-    # Iniciar tarea de limpieza si no está corriendo
-    if manager._cleanup_task is None:
-        await manager.start_cleanup_task()
+    client_id = manager.new_client_id()
+    room_id = registry.normalize_room_id(websocket.query_params.get("room"))
+    # Idioma y categoría de palabras: sólo se aplican si la conexión crea la sala
+    language = websocket.query_params.get("lang")
+    category = websocket.query_params.get("category")
+    # Reanudación: token recibido en la sesión anterior y última versión de estado aplicada
+    resume_token = websocket.query_params.get("resume")
+    resume_version = websocket.query_params.get("version")
     
     # Determinar el tipo de cliente
     client_type = manager.get_client_type(dict(websocket.headers))
     logger.info(f"Tipo de cliente detectado: {client_type}")
     
+    # Las salas de otro worker se atienden reenviando los frames a su dueño
+    owner = manager.owner_of(room_id)
+    if owner != manager.worker_id:
+        await manager.relay(websocket, client_id, client_type, room_id, owner, language, category, resume_token, resume_version)
+        return
+    
+    room = registry.get_or_create(room_id, language, category)
+    
     # Intentar conectar
-    if not await manager.connect(websocket, client_id, client_type):
+    if not await manager.connect(websocket, client_id, client_type, room, resume_token):
         return
     
     try:
-        # Enviar estado inicial
-        await manager.send_game_state(websocket)
-        logger.info(f"Estado inicial enviado a {client_id}")
+        # Enviar estado inicial o reanudar la sesión
+        await room.call(manager.open_session, client_id, room, resume_token, resume_version)
 
         while True:
             try:
-                data = await websocket.receive_text()
-                logger.info(f"Datos recibidos: {data}")
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
                 
-                try:
-                    message = json.loads(data)
-                    logger.info(f"Mensaje recibido de {client_id}: {message}")
-
-                    if not manager.is_connected(client_id):
-                        logger.warning(f"Cliente {client_id} no está conectado")
-                        break
-
-                    # Actualizar último ping
-                    manager.last_ping[client_id] = datetime.now()
-
-                    if message["type"] == "join":
-                        player_name = message.get("name")
-                        if not player_name:
-                            logger.error("Error: nombre de jugador no proporcionado")
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": "Nombre de jugador requerido"
-                            })
-                            continue
-
-                        client_type = manager.get_client_type(dict(websocket.headers))
-                        logger.info(f"Jugador {player_name} uniéndose como {client_type}")
-                        
-                        # Verificar si el jugador ya existe
-                        if player_name in manager.player_connections:
-                            old_client_id = manager.player_connections[player_name]
-                            if old_client_id in manager.active_connections:
-                                logger.info(f"Jugador {player_name} reconectando desde {old_client_id} a {client_id}")
-                                await manager.active_connections[old_client_id].close()
-                                await manager.disconnect(old_client_id)
-                        
-                        if await game_state.add_player(player_name, client_type):
-                            manager.player_connections[player_name] = client_id
-                            logger.info(f"Jugador {player_name} añadido/actualizado")
-                            # Enviar estado personalizado al jugador reconectado
-                            await manager.send_game_state(websocket, player_name)
-                            await manager.broadcast_state()
-                        else:
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": "No se pudo unir al juego"
-                            })
-
-                    elif message["type"] == "guess":
-                        if not game_state.game_started or game_state.game_paused:
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": "El juego no está activo"
-                            })
-                            continue
-                            
-                        player_name = None
-                        for name, cid in list(manager.player_connections.items()):
-                            if cid == client_id:
-                                player_name = name
-                                break
-                        
-                        if not player_name:
-                            logger.error("Error: jugador no encontrado para adivinar")
-                            continue
-                            
-                        if await game_state.handle_guess(player_name, message["guess"]):
-                            await manager.broadcast_state()
-
-                    elif message["type"] == "draw":
-                        player_name = None
-                        for name, cid in list(manager.player_connections.items()):
-                            if cid == client_id:
-                                player_name = name
-                                break
-                        
-                        if not player_name:
-                            logger.error("Error: jugador no encontrado para dibujar")
-                            continue
-                            
-                        if player_name == game_state.current_drawer:
-                            await manager.broadcast_state()
-                        else:
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": "No es tu turno para dibujar"
-                            })
-
-                    elif message["type"] == "clear":
-                        player_name = None
-                        for name, cid in list(manager.player_connections.items()):
-                            if cid == client_id:
-                                player_name = name
-                                break
-                        
-                        if not player_name:
-                            logger.error("Error: jugador no encontrado para limpiar")
-                            continue
-                            
-                        if player_name == game_state.current_drawer:
-                            await manager.broadcast_state()
-                        else:
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": "No es tu turno para dibujar"
-                            })
-                    else:
-                        logger.warning(f"Tipo de mensaje desconocido: {message['type']}")
-
-                except json.JSONDecodeError as e:
-                    logger.error(f"Error decodificando mensaje: {data}, Error: {e}")
+                if not manager.is_connected(client_id):
+                    logger.warning(f"Cliente {client_id} no está conectado")
+                    break
+                
+                # Actualizar último ping
+                manager.last_ping[client_id] = datetime.now()
+                
+                data = frame.get("text")
+                if data is None:
+                    data = frame.get("bytes") or b""
+                # Lo que excede el límite se descarta sin decodificar ni pasar por la sala
+                if not manager.admit_frame(client_id, data):
+                    continue
+                if isinstance(data, bytes):
+                    # Trazos binarios del subprotocolo opcional
+                    await room.call(handle_stroke_frame, room, client_id, data)
                     continue
+                await room.call(handle_text_frame, room, client_id, client_type, data)
 
             except WebSocketDisconnect:
                 logger.info(f"Cliente {client_id} desconectado")
@@ -335,5 +842,4 @@ async def websocket_endpoint(websocket: WebSocket):
 
     finally:
         logger.info(f"Cerrando conexión de {client_id}")
-        await manager.disconnect(client_id)
-        await manager.broadcast_state()
+        await room.call(manager.leave, room, client_id)
@@ -0,0 +1,56 @@
+"""
+Benchmark de codificación/decodificación por mensaje: stdlib json vs core.codec.
+
+Uso (desde backend/):
+    python benchmarks/bench_codec.py -o codec.json
+    python -m pyperf compare_to base.json codec.json
+"""
+import json
+import sys
+from pathlib import Path
+
+import pyperf
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core import codec
+
+DRAW = {"type": "draw", "stroke": 12, "x1": 310, "y1": 204, "x2": 314, "y2": 207}
+PATCH = {
+    "type": "patch",
+    "version": 42,
+    "base_version": 41,
+    "changes": {"players": {"Web_417": {"score": 7}, "Desktop_101512": {"is_drawer": True}}, "current_drawer": "Desktop_101512"}
+}
+STROKES = {
+    "type": "strokes",
+    "events": [{"type": "draw", "stroke": 3, "points": list(range(i, i + 16))} for i in range(12)]
+}
+STATE = {
+    "type": "state",
+    "version": 42,
+    "state": {
+        "players": {
+            f"Jugador_{i}": {"name": f"Jugador_{i}", "score": i, "is_drawer": i == 0, "is_connected": True, "client_type": "frontend"}
+            for i in range(50)
+        },
+        "game_started": True,
+        "game_paused": False,
+        "current_drawer": "Jugador_0"
+    }
+}
+
+MESSAGES = {"draw": DRAW, "patch": PATCH, "strokes": STROKES, "state_50": STATE}
+
+def main():
+    runner = pyperf.Runner()
+    runner.metadata["codec_backend"] = codec.BACKEND
+    for name, message in MESSAGES.items():
+        text = json.dumps(message)
+        runner.bench_func(f"encode_{name}_stdlib", json.dumps, message)
+        runner.bench_func(f"encode_{name}_{codec.BACKEND}", codec.dumps, message)
+        runner.bench_func(f"decode_{name}_stdlib", json.loads, text)
+        runner.bench_func(f"decode_{name}_{codec.BACKEND}", codec.loads, text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Microbenchmarks de ConnectionManager y del despacho de mensajes del WebSocket.
+
+Las conexiones son falsas (sólo cuentan frames), así que se mide el trabajo
+del servidor por mensaje sin red ni tareas escritoras.
+
+Uso (desde backend/):
+    python benchmarks/bench_connection_manager.py -o manager.json
+    python -m pyperf compare_to base.json manager.json
+"""
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pyperf
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.rooms import Room
+from api.v1.websocket import handle_text_frame, manager
+
+SIZES = (2, 50, 1000)
+
+class FakeConnection:
+    """Conexión que descarta los frames en lugar de enviarlos"""
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.frames = 0
+        self.failed = False
+
+    @property
+    def queue_depth(self) -> int:
+        return 0
+
+    def send(self, data) -> bool:
+        self.frames += 1
+        return True
+
+    async def close(self):
+        pass
+
+def make_room(size: int, room_id: str = None) -> Room:
+    """Sala con `size` jugadores, cada uno con su conexión falsa en el manager"""
+    room = Room(room_id or f"bench-{size}")
+    room.game_state.add_player("Web", "frontend")
+    room.game_state.add_player("Desktop", "desktop")
+    for i in range(size - 2):
+        room.game_state.add_player(f"Jugador_{i}", "frontend")
+    for i, name in enumerate(room.game_state.players):
+        client_id = f"{room.room_id}_{i}"
+        manager.active_connections[client_id] = FakeConnection(client_id)
+        manager.connection_states[client_id] = True
+        manager.client_rooms[client_id] = room
+        room.clients.add(client_id)
+        room.bind_player(name, client_id)
+    room.game_state.commit_patch()
+    room.game_state.take_private_changed()
+    return room
+
+def time_broadcast_state(loops: int, size: int) -> float:
+    """Un cambio de puntuación difundido como parche a toda la sala"""
+    room = make_room(size)
+    game_state = room.game_state
+    player = game_state.players[room.player_for(next(iter(room.clients)))]
+    start = time.perf_counter()
+    for i in range(loops):
+        game_state._set_player(player, "score", i)
+        manager.broadcast_state(room)
+    return time.perf_counter() - start
+
+def time_dispatch(loops: int, size: int, kind: str) -> float:
+    """Decodificación y despacho de un frame de texto en handle_text_frame"""
+    room = make_room(size)
+    game_state = room.game_state
+    drawer_client = room.player_connections[game_state.current_drawer]
+    guesser_client = next(c for c in room.clients if c != drawer_client)
+    if kind == "draw":
+        client_id = drawer_client
+        data = json.dumps({"type": "draw", "stroke": 7, "x1": 310, "y1": 204, "x2": 314, "y2": 207})
+    elif kind == "guess":
+        client_id = guesser_client
+        data = json.dumps({"type": "guess", "guess": "nada"})
+    else:
+        client_id = guesser_client
+        data = json.dumps({"type": "sync"})
+
+    async def run() -> float:
+        total = 0.0
+        for _ in range(loops):
+            start = time.perf_counter()
+            handle_text_frame(room, client_id, "frontend", data)
+            total += time.perf_counter() - start
+            # El tick de trazos no llega a correr dentro del bucle: se descarta a mano
+            if room._flush_handle is not None:
+                room._flush_handle.cancel()
+                room._flush_handle = None
+                room.stroke_batch.events.clear()
+        return total
+
+    # queue_stroke programa el tick en el event loop en curso
+    return asyncio.run(run())
+
+def main():
+    runner = pyperf.Runner()
+    runner.argparser.add_argument("--keep-logs", action="store_true", help="mantener los logs INFO")
+    args = runner.parse_args()
+    if not args.keep_logs:
+        logging.disable(logging.INFO)
+    runner.metadata["logging"] = "info" if args.keep_logs else "warning"
+
+    for size in SIZES:
+        runner.bench_time_func(f"broadcast_state_{size}", time_broadcast_state, size)
+    for kind in ("draw", "guess", "sync"):
+        runner.bench_time_func(f"dispatch_{kind}_50", time_dispatch, 50, kind)
+
+if __name__ == "__main__":
+    main()
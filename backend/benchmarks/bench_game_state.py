@@ -0,0 +1,121 @@
+"""
+Microbenchmarks de GameState con 2, 50 y 1000 jugadores.
+
+Uso (desde backend/):
+    python benchmarks/bench_game_state.py -o game_state.json
+    python -m pyperf compare_to base.json game_state.json
+
+Por defecto el logging queda en WARNING para medir sólo el código;
+--keep-logs mide también el coste de los logs INFO del camino caliente.
+"""
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pyperf
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.game_state import GameState
+
+SIZES = (2, 50, 1000)
+
+def make_state(size: int) -> GameState:
+    """GameState con `size` jugadores conectados (web y desktop incluidos)"""
+    game_state = GameState()
+    game_state.add_player("Web", "frontend")
+    game_state.add_player("Desktop", "desktop")
+    for i in range(size - 2):
+        game_state.add_player(f"Jugador_{i}", "frontend")
+    game_state.commit_patch()
+    game_state.take_private_changed()
+    return game_state
+
+def guesser_of(game_state: GameState) -> str:
+    return next(name for name, player in game_state.players.items() if not player.is_drawer)
+
+def time_add_player(loops: int, size: int) -> float:
+    """Alta de un jugador nuevo en una partida de `size` jugadores"""
+    game_state = make_state(size)
+    total = 0.0
+    for i in range(loops):
+        name = f"Nuevo_{i}"
+        start = time.perf_counter()
+        game_state.add_player(name, "frontend")
+        total += time.perf_counter() - start
+        game_state._remove_player(name)
+        game_state.commit_patch()
+    return total
+
+def time_handle_guess(loops: int, size: int) -> float:
+    """Intento fallido de un adivinador"""
+    game_state = make_state(size)
+    name = guesser_of(game_state)
+    start = time.perf_counter()
+    for _ in range(loops):
+        game_state.handle_guess(name, "nada")
+    return time.perf_counter() - start
+
+def time_close_guess(loops: int, size: int) -> float:
+    """Intentos fallidos distintos con la pista de "casi" (sin caché de normalización)"""
+    game_state = make_state(size)
+    game_state._set("current_word", "bicicleta")
+    guesses = [f"bicicleta {i}" if i % 2 else f"Bisicleta{i}" for i in range(loops)]
+    start = time.perf_counter()
+    for guess in guesses:
+        game_state.is_close_guess(guess)
+    return time.perf_counter() - start
+
+def time_handle_guess_hit(loops: int, size: int) -> float:
+    """Acierto: puntos, nuevo drawer y nueva palabra"""
+    game_state = make_state(size)
+    total = 0.0
+    for _ in range(loops):
+        name = guesser_of(game_state)
+        word = game_state.current_word
+        start = time.perf_counter()
+        game_state.handle_guess(name, word)
+        total += time.perf_counter() - start
+        game_state.commit_patch()
+        game_state.take_private_changed()
+    return total
+
+def time_select_new_drawer(loops: int, size: int) -> float:
+    """Cambio de drawer y palabra"""
+    game_state = make_state(size)
+    total = 0.0
+    for _ in range(loops):
+        start = time.perf_counter()
+        game_state.select_new_drawer()
+        total += time.perf_counter() - start
+        game_state.commit_patch()
+        game_state.take_private_changed()
+    return total
+
+def time_get_state(loops: int, size: int) -> float:
+    """Construcción del estado público completo"""
+    get_state = make_state(size).get_state
+    start = time.perf_counter()
+    for _ in range(loops):
+        get_state()
+    return time.perf_counter() - start
+
+def main():
+    runner = pyperf.Runner()
+    runner.argparser.add_argument("--keep-logs", action="store_true", help="mantener los logs INFO")
+    args = runner.parse_args()
+    if not args.keep_logs:
+        logging.disable(logging.INFO)
+    runner.metadata["logging"] = "info" if args.keep_logs else "warning"
+
+    for size in SIZES:
+        runner.bench_time_func(f"add_player_{size}", time_add_player, size)
+        runner.bench_time_func(f"handle_guess_miss_{size}", time_handle_guess, size)
+        runner.bench_time_func(f"handle_guess_hit_{size}", time_handle_guess_hit, size)
+        runner.bench_time_func(f"close_guess_{size}", time_close_guess, size)
+        runner.bench_time_func(f"select_new_drawer_{size}", time_select_new_drawer, size)
+        runner.bench_time_func(f"get_state_{size}", time_get_state, size)
+
+if __name__ == "__main__":
+    main()
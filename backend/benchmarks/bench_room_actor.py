@@ -0,0 +1,121 @@
+"""
+Throughput del actor por sala frente al diseño anterior con locks.
+
+N salas con M clientes concurrentes cada una envían mensajes (el drawer
+trazos, el resto intentos fallidos). Se compara:
+
+- lock: el handler protegido por un asyncio.Lock por sala, como hacía
+  GameState antes del actor.
+- actor_call: cada cliente encola en el buzón de su sala y espera el
+  resultado (lo que hace el endpoint WebSocket).
+- actor_post: se encola sin esperar (lo que hace el backplane con los
+  clientes de otros workers).
+
+Uso (desde backend/):
+    python benchmarks/bench_room_actor.py -o actor.json
+    python -m pyperf compare_to base.json actor.json
+"""
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pyperf
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.websocket import handle_text_frame
+from bench_connection_manager import make_room
+
+ROOMS = 10
+CLIENTS = (2, 8)
+DRAW = json.dumps({"type": "draw", "stroke": 7, "x1": 310, "y1": 204, "x2": 314, "y2": 207})
+GUESS = json.dumps({"type": "guess", "guess": "nada"})
+
+def make_rooms(clients: int) -> list:
+    """Salas de benchmark con sus clientes: el drawer dibuja y el resto adivina"""
+    rooms = []
+    for i in range(ROOMS):
+        room = make_room(clients, f"bench-{clients}-{i}")
+        drawer_client = room.player_connections[room.game_state.current_drawer]
+        senders = [
+            (client_id, DRAW if client_id == drawer_client else GUESS)
+            for client_id in sorted(room.clients)
+        ]
+        rooms.append((room, senders))
+    return rooms
+
+def discard_strokes(room):
+    """El tick de trazos no llega a correr dentro del bucle: se descarta a mano"""
+    if room._flush_handle is not None:
+        room._flush_handle.cancel()
+        room._flush_handle = None
+    room.stroke_batch.events.clear()
+    room.stroke_log.clear()
+
+def time_throughput(loops: int, clients: int, mode: str) -> float:
+    """Tiempo de procesar `loops` mensajes por cliente en todas las salas"""
+    rooms = make_rooms(clients)
+
+    async def lock_client(room, lock, client_id, data):
+        for _ in range(loops):
+            async with lock:
+                handle_text_frame(room, client_id, "frontend", data)
+            # Cada mensaje real llega tras un await de receive()
+            await asyncio.sleep(0)
+
+    async def call_client(room, client_id, data):
+        for _ in range(loops):
+            await room.call(handle_text_frame, room, client_id, "frontend", data)
+            await asyncio.sleep(0)
+
+    async def post_client(room, client_id, data):
+        for _ in range(loops):
+            room.post(handle_text_frame, room, client_id, "frontend", data)
+            await asyncio.sleep(0)
+        # Barrera: el buzón es FIFO, así que esto termina después de sus mensajes
+        await room.call(len, room.clients)
+
+    async def run() -> float:
+        tasks = []
+        for room, senders in rooms:
+            lock = asyncio.Lock()
+            for client_id, data in senders:
+                if mode == "lock":
+                    tasks.append(lock_client(room, lock, client_id, data))
+                elif mode == "actor_call":
+                    tasks.append(call_client(room, client_id, data))
+                else:
+                    tasks.append(post_client(room, client_id, data))
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        for room, _ in rooms:
+            discard_strokes(room)
+            room.stop()
+        return elapsed
+
+    return asyncio.run(run())
+
+def main():
+    runner = pyperf.Runner()
+    runner.argparser.add_argument("--keep-logs", action="store_true", help="mantener los logs INFO")
+    args = runner.parse_args()
+    if not args.keep_logs:
+        logging.disable(logging.INFO)
+    runner.metadata["logging"] = "info" if args.keep_logs else "warning"
+
+    for clients in CLIENTS:
+        for mode in ("lock", "actor_call", "actor_post"):
+            runner.bench_time_func(
+                f"{mode}_{ROOMS}x{clients}",
+                time_throughput,
+                clients,
+                mode,
+                inner_loops=ROOMS * clients
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Escrituras de puntuaciones en SQLite (WAL) a través de la cola de ScoreStore.
+
+- record_round: lo que paga el actor de la sala al terminar una ronda (encolar).
+- write_rounds_<lote>: rondas encoladas y confirmadas en disco; el tiempo por
+  ronda da el máximo sostenido (1 us por ronda son 60M rondas por minuto).
+- top_10: consulta del ranking con 10k jugadores.
+
+Uso (desde backend/):
+    python benchmarks/bench_scores.py -o scores.json
+"""
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pyperf
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from services.score_store import ScoreStore
+
+PLAYERS = [f"Jugador_{i}" for i in range(10000)]
+WORDS = ["casa", "árbol", "sol", "luna", "estrella", "bicicleta"]
+
+def make_store(directory: str, batch_size: int = 500) -> ScoreStore:
+    # Intervalo largo: la tarea de fondo no compite con la medición
+    return ScoreStore(str(Path(directory) / "scores.db"), batch_size=batch_size, flush_interval=60, queue_max=10_000_000)
+
+def make_rounds(count: int, seed: int) -> list:
+    """Rondas (sala, palabra, drawer, adivinador) entre 500 salas y 10k jugadores"""
+    rng = random.Random(seed)
+    return [(f"sala_{i % 500}", rng.choice(WORDS), *rng.sample(PLAYERS, 2)) for i in range(count)]
+
+def time_record_round(loops: int) -> float:
+    """Coste de encolar una ronda terminada"""
+    async def run() -> float:
+        with tempfile.TemporaryDirectory() as directory:
+            store = make_store(directory)
+            await store.start()
+            rounds = make_rounds(loops, 1)
+            start = time.perf_counter()
+            for room, word, drawer, guesser in rounds:
+                store.record_round(room, word, drawer, guesser)
+            elapsed = time.perf_counter() - start
+            await store.stop()
+            return elapsed
+
+    return asyncio.run(run())
+
+def time_write_rounds(loops: int, batch_size: int) -> float:
+    """Rondas encoladas y confirmadas en disco en lotes de `batch_size`"""
+    async def run() -> float:
+        with tempfile.TemporaryDirectory() as directory:
+            store = make_store(directory, batch_size)
+            await store.start()
+            rounds = make_rounds(loops, 2)
+            start = time.perf_counter()
+            for room, word, drawer, guesser in rounds:
+                store.record_round(room, word, drawer, guesser)
+            await store.flush()
+            elapsed = time.perf_counter() - start
+            await store.stop()
+            return elapsed
+
+    return asyncio.run(run())
+
+def time_top(loops: int) -> float:
+    """Top 10 del ranking con 10k jugadores en la tabla"""
+    async def run() -> float:
+        with tempfile.TemporaryDirectory() as directory:
+            store = make_store(directory)
+            await store.start()
+            for room, word, drawer, guesser in make_rounds(50000, 3):
+                store.record_round(room, word, drawer, guesser)
+            await store.flush()
+            start = time.perf_counter()
+            for _ in range(loops):
+                await store.top(10)
+            elapsed = time.perf_counter() - start
+            await store.stop()
+            return elapsed
+
+    return asyncio.run(run())
+
+def main():
+    runner = pyperf.Runner()
+    runner.argparser.add_argument("--keep-logs", action="store_true", help="mantener los logs INFO")
+    args = runner.parse_args()
+    if not args.keep_logs:
+        logging.disable(logging.INFO)
+    runner.metadata["logging"] = "info" if args.keep_logs else "warning"
+
+    runner.bench_time_func("record_round", time_record_round)
+    for batch_size in (1, 50, 500):
+        runner.bench_time_func(f"write_rounds_{batch_size}", time_write_rounds, batch_size)
+    runner.bench_time_func("top_10", time_top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Generador de carga para /api/v1/ws.
+
+Simula salas completas (un cliente web y uno desktop por sala, como exige el
+servidor) que hablan el mismo protocolo join/draw/guess/clear que los clientes
+reales: el drawer dibuja trazos continuos y a veces limpia, el adivinador
+manda intentos. Mide conexiones por segundo, mensajes por segundo y la latencia
+de fan-out de trazos (envío del drawer -> recepción en el otro cliente; ambos
+viven en el mismo proceso, así que comparten reloj).
+
+Uso (desde backend/):
+    python benchmarks/loadgen.py --spawn-server --rooms 500 --duration 20 -o load.json
+    python benchmarks/loadgen.py --url ws://127.0.0.1:8000/api/v1/ws --rooms 2000 --processes 4
+
+Como control de regresión, --max-p99-ms / --min-msgs-per-sec / --max-errors
+hacen que el proceso termine con código 1 si no se cumplen.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import websockets
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.append(str(BACKEND_DIR))
+
+from api.v1.strokes import OP_POINTS, STROKE_SUBPROTOCOL, decode_frames, encode_clear, encode_points
+
+FRONTEND_HEADERS = {"User-Agent": "loadgen", "Origin": "http://localhost:5173"}
+DESKTOP_HEADERS = {"User-Agent": "PictionaryDesktop/loadgen"}
+
+# Muestras de latencia que cada proceso devuelve como máximo
+MAX_SAMPLES = 200000
+
+class Stats:
+    """Contadores de un proceso generador"""
+    def __init__(self):
+        self.connected = 0
+        self.connect_errors = 0
+        self.connect_seconds = 0.0
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.latencies: List[float] = []  # milisegundos
+
+    def to_dict(self) -> dict:
+        latencies = self.latencies
+        if len(latencies) > MAX_SAMPLES:
+            latencies = random.sample(latencies, MAX_SAMPLES)
+        return {
+            "connected": self.connected,
+            "connect_errors": self.connect_errors,
+            "connect_seconds": self.connect_seconds,
+            "sent": self.sent,
+            "received": self.received,
+            "errors": self.errors,
+            "latencies": latencies
+        }
+
+class SimRoom:
+    """Sala simulada: dos clientes y los instantes de envío de sus trazos"""
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.pending: Dict[int, float] = {}  # stroke_id -> perf_counter del envío
+        self.next_stroke = 1
+
+class SimClient:
+    def __init__(self, room: SimRoom, name: str, headers: dict, args, stats: Stats):
+        self.room = room
+        self.name = name
+        self.headers = headers
+        self.args = args
+        self.stats = stats
+        self.ws = None
+        self.binary = False
+        self.is_drawer = False
+
+    async def connect(self) -> bool:
+        url = f"{self.args.url}?room={self.room.room_id}"
+        subprotocols = [STROKE_SUBPROTOCOL] if self.args.binary else None
+        try:
+            self.ws = await websockets.connect(
+                url,
+                extra_headers=self.headers,
+                subprotocols=subprotocols,
+                open_timeout=self.args.connect_timeout,
+                max_queue=None
+            )
+        except Exception:
+            self.stats.connect_errors += 1
+            return False
+        self.binary = self.ws.subprotocol == STROKE_SUBPROTOCOL
+        self.stats.connected += 1
+        await self.send_json({"type": "join", "name": self.name})
+        return True
+
+    async def send_json(self, message: dict):
+        await self.ws.send(json.dumps(message))
+        self.stats.sent += 1
+
+    async def receive_loop(self):
+        """Consume todo lo que llega y registra la latencia de los trazos ajenos"""
+        pending = self.room.pending
+        now = time.perf_counter
+        try:
+            async for data in self.ws:
+                self.stats.received += 1
+                if isinstance(data, bytes):
+                    stroke_ids = [stroke_id for op, stroke_id, _ in decode_frames(data) if op == OP_POINTS]
+                else:
+                    message = json.loads(data)
+                    kind = message.get("type")
+                    if kind == "private":
+                        self.is_drawer = bool(message.get("current_word"))
+                        continue
+                    if kind == "error":
+                        self.stats.errors += 1
+                        continue
+                    if kind != "strokes":
+                        continue
+                    stroke_ids = [e.get("stroke") for e in message.get("events", ()) if e.get("type") == "draw"]
+                received_at = now()
+                for stroke_id in stroke_ids:
+                    sent_at = pending.pop(stroke_id, None)
+                    if sent_at is not None:
+                        self.stats.latencies.append((received_at - sent_at) * 1000)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def act_loop(self, deadline: float):
+        """Dibuja si es el drawer y adivina si no, hasta el final de la prueba"""
+        args = self.args
+        draw_interval = 1 / args.draw_rate
+        guess_interval = 1 / args.guess_rate
+        x, y = random.randint(0, 800), random.randint(0, 600)
+        segments = 0
+        attempt = 0
+        try:
+            while time.perf_counter() < deadline:
+                if not self.is_drawer:
+                    await asyncio.sleep(guess_interval * random.uniform(0.5, 1.5))
+                    if not self.is_drawer:
+                        attempt += 1
+                        # Intentos que nunca aciertan: la palabra sólo la conoce el drawer
+                        await self.send_json({"type": "guess", "guess": f"intento-{attempt}"})
+                    continue
+
+                await asyncio.sleep(draw_interval)
+                segments += 1
+                if args.clear_every and segments % args.clear_every == 0:
+                    if self.binary:
+                        await self.ws.send(encode_clear())
+                        self.stats.sent += 1
+                    else:
+                        await self.send_json({"type": "clear"})
+                    continue
+
+                # Trazo continuo: cada segmento empieza donde terminó el anterior
+                nx = min(max(x + random.randint(-12, 12), 0), 800)
+                ny = min(max(y + random.randint(-12, 12), 0), 600)
+                stroke_id = self.room.next_stroke
+                self.room.next_stroke += 1
+                self.room.pending[stroke_id] = time.perf_counter()
+                if self.binary:
+                    await self.ws.send(encode_points(stroke_id, (x, y, nx, ny)))
+                    self.stats.sent += 1
+                else:
+                    await self.send_json({"type": "draw", "stroke": stroke_id, "x1": x, "y1": y, "x2": nx, "y2": ny})
+                x, y = nx, ny
+        except websockets.ConnectionClosed:
+            self.stats.errors += 1
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+async def run_rooms(args, room_ids: List[str]) -> Stats:
+    """Conecta todas las salas de este proceso y las ejercita durante args.duration"""
+    stats = Stats()
+    clients: List[SimClient] = []
+    for room_id in room_ids:
+        room = SimRoom(room_id)
+        clients.append(SimClient(room, f"web-{room_id}", FRONTEND_HEADERS, args, stats))
+        clients.append(SimClient(room, f"desk-{room_id}", DESKTOP_HEADERS, args, stats))
+
+    semaphore = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(client: SimClient) -> bool:
+        async with semaphore:
+            return await client.connect()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(connect(client) for client in clients))
+    stats.connect_seconds = time.perf_counter() - started
+    connected = [client for client, ok in zip(clients, results) if ok]
+
+    # Dejar que el servidor asigne drawer antes de medir
+    receivers = [asyncio.create_task(client.receive_loop()) for client in connected]
+    await asyncio.sleep(args.warmup)
+    stats.sent = stats.received = 0
+    stats.latencies.clear()
+
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(client.act_loop(deadline) for client in connected))
+    await asyncio.sleep(args.drain)
+
+    for client in connected:
+        await client.close()
+    await asyncio.gather(*receivers, return_exceptions=True)
+    return stats
+
+def run_worker(args, room_ids: List[str]) -> dict:
+    """Punto de entrada de cada proceso generador"""
+    return asyncio.run(run_rooms(args, room_ids)).to_dict()
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+def summarize(args, results: List[dict], wall_seconds: float) -> dict:
+    latencies: List[float] = []
+    for result in results:
+        latencies.extend(result["latencies"])
+    connected = sum(r["connected"] for r in results)
+    connect_seconds = max((r["connect_seconds"] for r in results), default=0.0)
+    sent = sum(r["sent"] for r in results)
+    received = sum(r["received"] for r in results)
+    return {
+        "url": args.url,
+        "rooms": args.rooms,
+        "clients": args.rooms * 2,
+        "processes": args.processes,
+        "binary": args.binary,
+        "duration_s": args.duration,
+        "wall_s": round(wall_seconds, 3),
+        "connected": connected,
+        "connect_errors": sum(r["connect_errors"] for r in results),
+        "connections_per_s": round(connected / connect_seconds, 1) if connect_seconds else None,
+        "sent": sent,
+        "received": received,
+        "sent_per_s": round(sent / args.duration, 1),
+        "received_per_s": round(received / args.duration, 1),
+        "msgs_per_s": round((sent + received) / args.duration, 1),
+        "errors": sum(r["errors"] for r in results),
+        "fanout_samples": len(latencies),
+        "fanout_p50_ms": _round(percentile(latencies, 0.50)),
+        "fanout_p99_ms": _round(percentile(latencies, 0.99)),
+        "fanout_max_ms": _round(max(latencies) if latencies else None)
+    }
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+def check_gates(args, summary: dict) -> List[str]:
+    """Devuelve los umbrales incumplidos"""
+    failures = []
+    if args.max_p99_ms is not None:
+        p99 = summary["fanout_p99_ms"]
+        if p99 is None or p99 > args.max_p99_ms:
+            failures.append(f"p99 de fan-out {p99} ms > {args.max_p99_ms} ms")
+    if args.min_msgs_per_sec is not None and summary["msgs_per_s"] < args.min_msgs_per_sec:
+        failures.append(f"{summary['msgs_per_s']} msgs/s < {args.min_msgs_per_sec}")
+    if args.max_errors is not None:
+        errors = summary["errors"] + summary["connect_errors"]
+        if errors > args.max_errors:
+            failures.append(f"{errors} errores > {args.max_errors}")
+    return failures
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """Arranca un backend local sin recarga y espera a que acepte conexiones"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("El backend no arrancó a tiempo")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generador de carga para el WebSocket de Pictionary")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/api/v1/ws")
+    parser.add_argument("--spawn-server", action="store_true", help="arrancar un backend local en un puerto libre")
+    parser.add_argument("--rooms", type=int, default=100, help="salas simuladas (2 clientes cada una)")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos de medición")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--drain", type=float, default=0.5, help="espera final para recibir lo pendiente")
+    parser.add_argument("--draw-rate", type=float, default=30.0, help="segmentos por segundo del drawer")
+    parser.add_argument("--guess-rate", type=float, default=0.5, help="intentos por segundo del adivinador")
+    parser.add_argument("--clear-every", type=int, default=0, help="limpiar el canvas cada N segmentos (0 = nunca)")
+    parser.add_argument("--binary", action="store_true", help="usar el subprotocolo de trazos binarios")
+    parser.add_argument("--connect-concurrency", type=int, default=200)
+    parser.add_argument("--connect-timeout", type=float, default=10.0)
+    parser.add_argument("-o", "--output", help="guardar el resumen en JSON")
+    parser.add_argument("--max-p99-ms", type=float)
+    parser.add_argument("--min-msgs-per-sec", type=float)
+    parser.add_argument("--max-errors", type=int)
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    server = None
+    if args.spawn_server:
+        port = _free_port()
+        server = spawn_server(port)
+        args.url = f"ws://127.0.0.1:{port}/api/v1/ws"
+
+    run_id = f"{os.getpid()}-{int(time.time())}"
+    room_ids = [f"load-{run_id}-{i}" for i in range(args.rooms)]
+    chunks = [room_ids[i::args.processes] for i in range(args.processes)]
+
+    started = time.perf_counter()
+    try:
+        if args.processes == 1:
+            results = [run_worker(args, chunks[0])]
+        else:
+            with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+                results = pool.starmap(run_worker, [(args, chunk) for chunk in chunks])
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(args, results, time.perf_counter() - started)
+    failures = check_gates(args, summary)
+    summary["gate_failures"] = failures
+
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
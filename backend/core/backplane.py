@@ -0,0 +1,335 @@
+"""
+Backplane pub/sub entre workers.
+
+Cada worker se suscribe a su propio canal y publica mensajes JSON en el canal
+del worker destino. Hay dos implementaciones: una en memoria (un solo proceso)
+y un cliente para el broker TCP local de este módulo, que hace de sustituto
+de un broker real (Redis, NATS...) en desarrollo y pruebas.
+
+Ejecutar el broker: python -m core.backplane
+"""
+import asyncio
+import logging
+import struct
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from core import codec
+from core.metrics import counter
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], Awaitable[None]]
+
+# Cabecera de cada frame del broker: longitud del cuerpo JSON (uint32 big-endian)
+_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# Bytes pendientes de enviar al broker (cliente) o a un suscriptor lento (broker) antes de descartar
+MAX_PENDING_BYTES = 8 * 1024 * 1024
+# Espera entre reintentos de conexión con el broker (crece al doble hasta el máximo)
+RECONNECT_MIN_DELAY = 0.25
+RECONNECT_MAX_DELAY = 5.0
+
+DROPPED = counter("pictionary_backplane_dropped_total", "Mensajes del backplane descartados por cola llena")
+RECONNECTS = counter("pictionary_backplane_reconnects_total", "Reconexiones con el broker del backplane")
+
+def worker_channel(worker_id: int) -> str:
+    """Canal en el que escucha un worker"""
+    return f"worker.{worker_id}"
+
+class Backplane(ABC):
+    """Interfaz común: publicar sin bloquear y entregar en orden por canal.
+
+    publish y subscribe sólo valen entre start() y stop(); fuera de ese
+    intervalo lanzan RuntimeError en todas las implementaciones.
+    """
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._consumers: Dict[str, asyncio.Task] = {}
+        self.started = False
+
+    async def start(self):
+        """Abre los recursos del backplane"""
+        self.started = True
+
+    async def stop(self):
+        """Detiene los consumidores y libera los recursos"""
+        self.started = False
+        for task in self._consumers.values():
+            task.cancel()
+        self._consumers.clear()
+        self._queues.clear()
+
+    def _check_started(self):
+        if not self.started:
+            raise RuntimeError("Backplane no iniciado")
+
+    @abstractmethod
+    def publish(self, channel: str, message: dict):
+        """Publica un mensaje en un canal sin esperar a la entrega"""
+
+    async def subscribe(self, channel: str, handler: Handler):
+        """Registra un handler; los mensajes de un canal se procesan de uno en uno"""
+        self._check_started()
+        self.handlers[channel].append(handler)
+        if channel not in self._consumers:
+            self._queues[channel] = asyncio.Queue()
+            self._consumers[channel] = asyncio.create_task(self._consume(channel))
+
+    def _deliver(self, channel: str, message: dict):
+        queue = self._queues.get(channel)
+        if queue is not None:
+            queue.put_nowait(message)
+
+    async def _consume(self, channel: str):
+        queue = self._queues[channel]
+        while True:
+            message = await queue.get()
+            for handler in list(self.handlers.get(channel, ())):
+                try:
+                    await handler(message)
+                except Exception as e:
+                    logger.error(f"Error procesando mensaje del canal {channel}: {e}")
+
+class InProcessBackplane(Backplane):
+    """Backplane en memoria para varios workers dentro de un mismo proceso"""
+    def publish(self, channel: str, message: dict):
+        self._check_started()
+        self._deliver(channel, message)
+
+class BrokerBackplane(Backplane):
+    """Cliente del broker TCP local, con cola de salida acotada y reconexión automática"""
+    def __init__(self, host: str, port: int, max_pending_bytes: int = MAX_PENDING_BYTES):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.max_pending_bytes = max_pending_bytes
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        # Frames pendientes: publish no espera nunca; la tarea de escritura los vacía con drain()
+        self._outbox: Deque[bytes] = deque()
+        self._pending_bytes = 0
+        self._outbox_ready = asyncio.Event()
+        self.dropped = 0
+
+    async def start(self, retries: int = 20, delay: float = 0.25):
+        # El broker puede estar arrancando a la vez que los workers
+        for attempt in range(retries):
+            try:
+                await self._connect()
+                break
+            except OSError:
+                if attempt == retries - 1:
+                    raise
+                await asyncio.sleep(delay)
+        await super().start()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Conectado al broker {self.host}:{self.port}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._close()
+        await super().stop()
+
+    async def _connect(self):
+        """Abre la conexión y vuelve a suscribir los canales que ya tenía este worker"""
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        for channel in self._consumers:
+            self._writer.write(_encode({"op": "sub", "channel": channel}))
+        await self._writer.drain()
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._reader = None
+
+    async def _run(self):
+        """Lee y escribe mientras dura la conexión; si se cae, reconecta con backoff"""
+        while True:
+            tasks = {asyncio.create_task(self._read_loop()), asyncio.create_task(self._write_loop())}
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    logger.error(f"Error en la conexión con el broker: {task.exception()}")
+            self._close()
+            await self._reconnect()
+
+    async def _reconnect(self):
+        delay = RECONNECT_MIN_DELAY
+        while True:
+            try:
+                await self._connect()
+                RECONNECTS.inc()
+                logger.info(f"Reconectado al broker {self.host}:{self.port}")
+                return
+            except OSError as e:
+                logger.error(f"No se pudo reconectar al broker ({e}); reintento en {delay:.2f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+    def _enqueue(self, envelope: dict):
+        self._check_started()
+        frame = _encode(envelope)
+        if self._pending_bytes + len(frame) > self.max_pending_bytes:
+            # Broker caído o lento: se descarta en lugar de crecer sin límite
+            self.dropped += 1
+            DROPPED.inc()
+            if self.dropped % 1000 == 1:
+                logger.error(f"Cola del backplane llena: {self.dropped} mensajes descartados")
+            return
+        self._outbox.append(frame)
+        self._pending_bytes += len(frame)
+        self._outbox_ready.set()
+
+    async def _write_loop(self):
+        while True:
+            if not self._outbox:
+                self._outbox_ready.clear()
+                await self._outbox_ready.wait()
+                continue
+            while self._outbox:
+                frame = self._outbox.popleft()
+                self._pending_bytes -= len(frame)
+                self._writer.write(frame)
+            # Respeta el control de flujo del socket antes de seguir escribiendo
+            await self._writer.drain()
+
+    def publish(self, channel: str, message: dict):
+        self._enqueue({"op": "pub", "channel": channel, "message": message})
+
+    async def subscribe(self, channel: str, handler: Handler):
+        first = channel not in self._consumers
+        await super().subscribe(channel, handler)
+        if first:
+            self._enqueue({"op": "sub", "channel": channel})
+
+    async def _read_loop(self):
+        while True:
+            envelope = await _read_frame(self._reader)
+            if envelope is None:
+                logger.error("Conexión con el broker cerrada")
+                return
+            self._deliver(envelope["channel"], envelope["message"])
+
+def _encode(envelope: dict) -> bytes:
+    """Frame del broker: cabecera de longitud más cuerpo JSON"""
+    body = codec.dumps_bytes(envelope)
+    return _HEADER.pack(len(body)) + body
+
+async def _read_body(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Lee el cuerpo de un frame completo; None si el otro extremo cerró"""
+    try:
+        header = await reader.readexactly(_HEADER.size)
+        (size,) = _HEADER.unpack(header)
+        if size > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame demasiado grande: {size} bytes")
+        return await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        return None
+
+async def _read_frame(reader: asyncio.StreamReader) -> Optional[dict]:
+    """Lee y decodifica un frame completo"""
+    body = await _read_body(reader)
+    return None if body is None else codec.loads(body)
+
+class LocalBroker:
+    """Broker pub/sub mínimo sobre TCP: reenvía cada publicación a los suscriptores del canal"""
+    def __init__(self, host: str = "127.0.0.1", port: int = 6380):
+        self.host = host
+        self.port = port
+        self.subscribers: Dict[str, Set[asyncio.StreamWriter]] = defaultdict(set)
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        logger.info(f"Broker escuchando en {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        channels: Set[str] = set()
+        try:
+            while True:
+                body = await _read_body(reader)
+                if body is None:
+                    break
+                envelope = codec.loads(body)
+                op = envelope.get("op")
+                channel = envelope.get("channel")
+                if op == "pub":
+                    # Se reenvía el frame tal cual, sin volver a serializarlo por suscriptor
+                    frame = _HEADER.pack(len(body)) + body
+                    for subscriber in list(self.subscribers.get(channel, ())):
+                        if subscriber.transport.get_write_buffer_size() > MAX_PENDING_BYTES:
+                            # Suscriptor que no lee: no se acumula memoria por su culpa
+                            DROPPED.inc()
+                            continue
+                        subscriber.write(frame)
+                elif op == "sub":
+                    self.subscribers[channel].add(writer)
+                    channels.add(channel)
+                elif op == "unsub":
+                    self.subscribers[channel].discard(writer)
+                    channels.discard(channel)
+        except Exception as e:
+            logger.error(f"Error en cliente del broker: {e}")
+        finally:
+            for channel in channels:
+                self.subscribers[channel].discard(writer)
+            writer.close()
+
+def parse_url(url: str) -> Tuple[str, Optional[str], Optional[int]]:
+    """Descompone BACKPLANE_URL en (esquema, host, puerto)"""
+    parsed = urlparse(url)
+    return parsed.scheme, parsed.hostname, parsed.port
+
+def create_backplane(url: str) -> Backplane:
+    """Crea el backplane indicado por la URL: memory:// o tcp://host:puerto"""
+    scheme, host, port = parse_url(url)
+    if scheme == "memory":
+        return InProcessBackplane()
+    if scheme == "tcp":
+        return BrokerBackplane(host or "127.0.0.1", port or 6380)
+    raise ValueError(f"Backplane no soportado: {url}")
+
+def run_broker(url: str):
+    """Ejecuta el broker local hasta que se interrumpa el proceso"""
+    _, host, port = parse_url(url)
+    broker = LocalBroker(host or "127.0.0.1", port or 6380)
+    try:
+        asyncio.run(broker.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    from core.config import settings
+    run_broker(settings.BACKPLANE_URL)
@@ -0,0 +1,46 @@
+"""
+Códec JSON del camino caliente de WebSocket.
+
+Usa orjson o msgspec si están instalados y cae a la librería estándar si no.
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+    DecodeError = orjson.JSONDecodeError
+    dumps_bytes = orjson.dumps
+    loads = orjson.loads
+
+    def dumps(obj: Any) -> str:
+        """Serializa a texto para frames WebSocket de texto"""
+        return orjson.dumps(obj).decode()
+elif msgspec is not None:
+    BACKEND = "msgspec"
+    DecodeError = msgspec.DecodeError
+    dumps_bytes = msgspec.json.Encoder().encode
+    loads = msgspec.json.Decoder().decode
+
+    def dumps(obj: Any) -> str:
+        """Serializa a texto para frames WebSocket de texto"""
+        return dumps_bytes(obj).decode()
+else:
+    BACKEND = "json"
+    DecodeError = json.JSONDecodeError
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return dumps(obj).encode()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        return json.loads(data)
@@ -1,5 +1,56 @@
-# Configuración futura, ejemplo:
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Cargar variables de backend/.env sin sobrescribir las del entorno
+load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
 class Settings:
     APP_NAME: str = "Pictionary Backend"
+    # Intervalo con el que cada sala agrupa y envía los trazos pendientes
+    STROKE_FLUSH_INTERVAL_MS: int = int(os.getenv("STROKE_FLUSH_INTERVAL_MS", "25"))
+    # Frames pendientes por conexión antes de expulsar a un cliente lento
+    SEND_QUEUE_MAX: int = int(os.getenv("SEND_QUEUE_MAX", "256"))
+    # Límites por conexión y tipo de mensaje: tipo=mensajes por segundo:ráfaga ("other" para el resto).
+    # Vacío desactiva los límites
+    RATE_LIMITS: str = os.getenv(
+        "RATE_LIMITS",
+        "join=1:3,sync=2:4,guess=4:8,draw=200:400,stroke_binary=200:400,clear=2:4,other=5:10"
+    )
+    # Límite de puntos del dibujo guardado por sala y eventos entre compactaciones
+    STROKE_LOG_MAX_POINTS: int = int(os.getenv("STROKE_LOG_MAX_POINTS", "50000"))
+    STROKE_LOG_COMPACT_EVERY: int = int(os.getenv("STROKE_LOG_COMPACT_EVERY", "256"))
+    # Avisar al adivinador cuando su intento está a uno o dos errores de la palabra
+    GUESS_CLOSE_HINT: bool = os.getenv("GUESS_CLOSE_HINT", "1") == "1"
+    # Listas de palabras (<idioma>/<categoría>.txt) e idioma de las salas que no eligen uno
+    WORDS_DIR: str = os.getenv("WORDS_DIR", str(Path(__file__).resolve().parent.parent / "data" / "words"))
+    WORDS_LANGUAGE: str = os.getenv("WORDS_LANGUAGE", "es")
+    # Puntuaciones persistentes (SQLite en WAL; vacío las desactiva): tamaño máximo de lote,
+    # espera para agrupar rondas y rondas pendientes antes de descartar
+    SCORES_DB_PATH: str = os.getenv("SCORES_DB_PATH", str(Path(__file__).resolve().parent.parent / "data" / "scores.db"))
+    SCORES_BATCH_SIZE: int = int(os.getenv("SCORES_BATCH_SIZE", "500"))
+    SCORES_FLUSH_INTERVAL_MS: int = int(os.getenv("SCORES_FLUSH_INTERVAL_MS", "200"))
+    SCORES_QUEUE_MAX: int = int(os.getenv("SCORES_QUEUE_MAX", "100000"))
+    # Parches recientes por sala que se reenvían a un cliente que reanuda su sesión
+    RESUME_BUFFER_SIZE: int = int(os.getenv("RESUME_BUFFER_SIZE", "256"))
+    # Dirección de escucha del servidor
+    BACKEND_HOST: str = os.getenv("BACKEND_HOST", "0.0.0.0")
+    BACKEND_PORT: int = int(os.getenv("BACKEND_PORT", "8000"))
+    # Workers del clúster: cada sala pertenece a un único worker (WORKER_ID de WORKER_COUNT)
+    WORKER_COUNT: int = int(os.getenv("WORKER_COUNT", "1"))
+    WORKER_ID: int = int(os.getenv("WORKER_ID", "0"))
+    # Backplane entre workers: memory:// (un proceso) o tcp://host:puerto (broker local)
+    BACKPLANE_URL: str = os.getenv("BACKPLANE_URL", "tcp://127.0.0.1:6380")
+    # Segundos que un worker espera a que el dueño de la sala acepte una conexión
+    BACKPLANE_OPEN_TIMEOUT: float = float(os.getenv("BACKPLANE_OPEN_TIMEOUT", "5"))
+
+    # Logging: nivel global, niveles por subsistema ("api.v1.websocket=DEBUG,core=WARNING"),
+    # formato (text o json) y tamaño de la cola del handler no bloqueante
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    # Fracción de mensajes entrantes que se registran en DEBUG
+    LOG_MESSAGE_SAMPLE: float = float(os.getenv("LOG_MESSAGE_SAMPLE", "0.01"))
 
 settings = Settings()
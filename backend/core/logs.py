@@ -0,0 +1,176 @@
+"""
+Logging estructurado para el camino caliente.
+
+- get_logger(nombre) devuelve un EventLogger: logger.debug("evento", campo=valor)
+  no hace nada si el nivel está desactivado, y los valores invocables se evalúan
+  sólo si el evento se emite (p. ej. state=game_state.get_state).
+- sample=0.01 emite sólo una fracción de los eventos; every=5.0 emite como mucho
+  uno por intervalo y por evento, indicando cuántos se suprimieron.
+- configure_logging() envía los registros a una cola acotada que vacía un hilo
+  aparte, de modo que la E/S de logs nunca bloquea el event loop (si la cola se
+  llena se descartan y se cuentan).
+
+Los niveles por subsistema se configuran en core/config.py (LOG_LEVELS).
+"""
+import logging
+import logging.handlers
+import queue
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from core import codec
+from core.config import settings
+
+class EventLogger:
+    """Envoltorio de logging.Logger con campos perezosos, muestreo y límite de frecuencia"""
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self.name = logger.name
+        # evento -> [instante de la última emisión, eventos suprimidos desde entonces]
+        self._limits: Dict[str, list] = {}
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level: int, event: str, *args, sample: Optional[float] = None, every: Optional[float] = None, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample is not None and random.random() >= sample:
+            return
+        if every is not None:
+            now = time.monotonic()
+            limit = self._limits.get(event)
+            if limit is not None and now - limit[0] < every:
+                limit[1] += 1
+                return
+            if limit is not None and limit[1]:
+                fields["suppressed"] = limit[1]
+            self._limits[event] = [now, 0]
+        for key, value in fields.items():
+            if callable(value):
+                fields[key] = value()
+        exc_info = fields.pop("exc_info", None)
+        self.logger.log(level, event, *args, exc_info=exc_info, extra={"fields": fields}, stacklevel=3)
+
+    def debug(self, event: str, *args, **fields):
+        self.log(logging.DEBUG, event, *args, **fields)
+
+    def info(self, event: str, *args, **fields):
+        self.log(logging.INFO, event, *args, **fields)
+
+    def warning(self, event: str, *args, **fields):
+        self.log(logging.WARNING, event, *args, **fields)
+
+    def error(self, event: str, *args, **fields):
+        self.log(logging.ERROR, event, *args, **fields)
+
+    def exception(self, event: str, *args, **fields):
+        fields.setdefault("exc_info", True)
+        self.log(logging.ERROR, event, *args, **fields)
+
+def get_logger(name: str) -> EventLogger:
+    """Logger estructurado del módulo"""
+    return EventLogger(logging.getLogger(name))
+
+class StructuredFormatter(logging.Formatter):
+    """Formatea el mensaje y sus campos como texto key=value o como JSON"""
+    def __init__(self, fmt: str = "text"):
+        super().__init__()
+        self.json = fmt == "json"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", None) or {}
+        timestamp = datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds")
+        message = record.getMessage()
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = self.formatException(record.exc_info)
+        if self.json:
+            entry: Dict[str, Any] = {
+                "ts": timestamp,
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": message
+            }
+            entry.update(fields)
+            if exc_text:
+                entry["exc"] = exc_text
+            try:
+                return codec.dumps(entry)
+            except TypeError:
+                # Campos no serializables: se exportan como texto
+                return codec.dumps({key: value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+                                    for key, value in entry.items()})
+        line = f"{timestamp} - {record.levelname} - {record.name} - {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if exc_text:
+            line += "\n" + exc_text
+        return line
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta (y cuenta) en lugar de bloquear si la cola está llena"""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Sólo se resuelven los argumentos; el formateo completo ocurre en el hilo del listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[DroppingQueueHandler] = None
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Convierte "api.v1.websocket=WARNING,core=INFO" en {logger: nivel}"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging():
+    """Logging raíz no bloqueante con los niveles por subsistema de la configuración"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler()
+    output.setFormatter(StructuredFormatter(settings.LOG_FORMAT))
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+    _listener.start()
+
+def dropped_records() -> int:
+    """Registros descartados por cola llena"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+def shutdown_logging():
+    """Vacía la cola y detiene el hilo del listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
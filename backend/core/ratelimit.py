@@ -0,0 +1,78 @@
+"""
+Límites de mensajes por conexión con token buckets.
+
+Cada conexión tiene un bucket por tipo de mensaje (tasa por segundo y ráfaga
+máxima, configurables en RATE_LIMITS). El tipo se lee de los primeros bytes
+del frame con una expresión regular, así que un cliente que inunda la sala se
+descarta sin decodificar su JSON ni pasar por el actor de la sala.
+"""
+import re
+import time
+from typing import Dict, Optional, Tuple
+
+# Tipo de mensaje para los que no tienen límite propio (incluidos los inválidos)
+OTHER = "other"
+
+# Los clientes envían "type" como primer campo; basta con mirar el principio del frame
+_TYPE_PATTERN = re.compile(r'"type"\s*:\s*"([A-Za-z_]{1,32})"')
+_PEEK_BYTES = 128
+
+def peek_type(data: str) -> Optional[str]:
+    """Tipo de un mensaje JSON sin decodificarlo entero (None si no se encuentra)"""
+    match = _TYPE_PATTERN.search(data, 0, _PEEK_BYTES)
+    return match.group(1) if match else None
+
+def parse_limits(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Convierte "draw=200:400,guess=4:8" en {tipo: (tasa por segundo, ráfaga)}"""
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.strip().partition("=")
+        rate, _, burst = value.partition(":")
+        if name and rate:
+            rate = float(rate)
+            limits[name.strip()] = (rate, float(burst) if burst else rate)
+    return limits
+
+class TokenBucket:
+    """Bucket que se rellena a `rate` tokens por segundo hasta `capacity`"""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now: float) -> bool:
+        """Consume un token si hay; el relleno se calcula al consultar, sin temporizadores"""
+        tokens = self.tokens + (now - self.updated) * self.rate
+        self.updated = now
+        if tokens >= 1:
+            self.tokens = min(tokens, self.capacity) - 1
+            return True
+        self.tokens = tokens
+        return False
+
+class RateLimiter:
+    """Buckets de una conexión, creados al recibir el primer mensaje de cada tipo"""
+    __slots__ = ("limits", "buckets", "violations")
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]]):
+        self.limits = limits
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.violations = 0
+
+    def allow(self, message_type: Optional[str]) -> bool:
+        """Indica si el mensaje cabe en el límite de su tipo"""
+        if message_type not in self.limits:
+            message_type = OTHER
+        bucket = self.buckets.get(message_type)
+        if bucket is None:
+            limit = self.limits.get(message_type)
+            if limit is None:
+                return True
+            bucket = self.buckets[message_type] = TokenBucket(*limit)
+        if bucket.take(time.monotonic()):
+            return True
+        self.violations += 1
+        return False
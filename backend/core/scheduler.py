@@ -0,0 +1,52 @@
+"""
+Plazos por clave (timeouts de ping, gracia de desconexión, salas inactivas).
+
+Se apoya en el heap de timers del event loop: programar o cancelar cuesta
+O(log n) y sólo se despiertan las entradas que vencen, sin recorrer todas las
+conexiones. Para señales que se refrescan a menudo (pings) conviene no
+reprogramar en cada refresco: el callback comprueba la última señal al vencer
+y vuelve a programarse por el tiempo que falta.
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Hashable
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class DeadlineScheduler:
+    """Un único timer pendiente por clave sobre el event loop en curso"""
+    def __init__(self):
+        self._handles: Dict[Hashable, asyncio.TimerHandle] = {}
+
+    def schedule(self, key: Hashable, delay: float, callback: Callable[..., Any], *args):
+        """Programa callback(*args) dentro de delay segundos, reemplazando el plazo de la clave"""
+        self.cancel(key)
+        loop = asyncio.get_running_loop()
+        self._handles[key] = loop.call_later(max(delay, 0), self._fire, key, callback, args)
+
+    def cancel(self, key: Hashable) -> bool:
+        """Cancela el plazo de una clave si existe"""
+        handle = self._handles.pop(key, None)
+        if handle is None:
+            return False
+        handle.cancel()
+        return True
+
+    def _fire(self, key: Hashable, callback: Callable[..., Any], args: tuple):
+        self._handles.pop(key, None)
+        try:
+            result = callback(*args)
+            if asyncio.iscoroutine(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            logger.error(f"Error en plazo {key}: {e}")
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._handles
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+scheduler = DeadlineScheduler()
@@ -1,30 +1,52 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import logging
+import os
+import signal
+import socket
 import sys
 from pathlib import Path
 
-# Configurar logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
 # Asegurar que el directorio actual está en el path
 sys.path.append(str(Path(__file__).parent))
 
+# Configurar logging: cola no bloqueante y niveles por subsistema (core/config.py)
+from core.logs import configure_logging, dropped_records, shutdown_logging
+configure_logging()
+logger = logging.getLogger(__name__)
+
 try:
     from api.v1 import endpoints, websocket
-    from api.v1.websocket import router as ws_router
+    from api.v1.websocket import router as ws_router, manager
+    from core.config import settings
+    from core import metrics
+    from services.score_store import score_store
+    from services.word_bank import word_bank
 except ImportError as e:
     logger.error(f"Error importando módulos: {e}")
     raise
 
+lag_probe = metrics.LoopLagProbe()
+metrics.gauge("pictionary_log_records_dropped", "Registros de log descartados por cola llena", callback=dropped_records)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Carga las palabras y arranca las puntuaciones, la sonda del event loop y, con varios workers, el backplane"""
+    word_bank.load()
+    await score_store.start()
+    lag_probe.start()
+    await manager.start_backplane()
+    yield
+    await manager.stop_backplane()
+    lag_probe.stop()
+    await score_store.stop()
+
 app = FastAPI(
     title="Pictionary API",
     description="API para el juego Pictionary",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuración de CORS
@@ -62,7 +84,66 @@ async def health_check():
         "game_state": True
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+def run_worker(worker_id: int, sock: socket.socket):
+    """Proceso worker: sirve la app sobre el socket compartido"""
+    import uvicorn
+    logger.info(f"Worker {worker_id} iniciado (pid {os.getpid()})")
+    config = uvicorn.Config("main:app", log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+def run_cluster():
+    """Lanza el broker local y WORKER_COUNT workers que comparten el puerto"""
+    import multiprocessing
+    from core.backplane import parse_url, run_broker
+    
+    if parse_url(settings.BACKPLANE_URL)[0] == "memory":
+        # Cada proceso tendría su propio backplane y las salas quedarían repartidas sin conexión
+        logger.error(f"BACKPLANE_URL={settings.BACKPLANE_URL} no comunica procesos; con WORKER_COUNT > 1 usa tcp://")
+        shutdown_logging()
+        sys.exit(1)
+    
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.BACKEND_HOST, settings.BACKEND_PORT))
+    sock.set_inheritable(True)
+    
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    if parse_url(settings.BACKPLANE_URL)[0] == "tcp" and os.getenv("BACKPLANE_EXTERNAL") != "1":
+        broker = context.Process(target=run_broker, args=(settings.BACKPLANE_URL,), name="broker")
+        broker.start()
+        processes.append(broker)
+    
+    logger.info(f"Iniciando {settings.WORKER_COUNT} workers en {settings.BACKEND_HOST}:{settings.BACKEND_PORT}")
+    
+    for worker_id in range(settings.WORKER_COUNT):
+        # El proceso hijo hereda el entorno al arrancar y lee WORKER_ID al importar la configuración
+        os.environ["WORKER_ID"] = str(worker_id)
+        worker = context.Process(target=run_worker, args=(worker_id, sock), name=f"worker-{worker_id}")
+        worker.start()
+        processes.append(worker)
+    # SIGTERM detiene también a los hijos
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        sock.close()
+
 if __name__ == "__main__":
+    if settings.WORKER_COUNT > 1:
+        run_cluster()
+        sys.exit(0)
     import uvicorn
     try:
         uvicorn.run(
@@ -0,0 +1,213 @@
+"""
+Puntuaciones persistentes y ranking en SQLite.
+
+Las rondas terminadas se encolan en memoria (record_round no espera nunca a
+disco) y una tarea las escribe por lotes: cada lote suma los puntos de cada
+jugador una sola vez y se confirma en una única transacción. La base de datos
+usa WAL, así que las consultas del ranking no bloquean a la escritura y varios
+workers pueden compartir el fichero.
+
+Los accesos a SQLite corren en hilos propios (uno para escribir y otro para
+leer), nunca en el event loop.
+"""
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.metrics import counter, gauge, histogram
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    room TEXT NOT NULL,
+    word TEXT NOT NULL,
+    drawer TEXT,
+    guesser TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    score INTEGER NOT NULL DEFAULT 0,
+    rounds_won INTEGER NOT NULL DEFAULT 0,
+    rounds_drawn INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_by_score ON players (score DESC, name);
+"""
+
+UPSERT_PLAYER = """
+INSERT INTO players (name, score, rounds_won, rounds_drawn, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (name) DO UPDATE SET
+    score = score + excluded.score,
+    rounds_won = rounds_won + excluded.rounds_won,
+    rounds_drawn = rounds_drawn + excluded.rounds_drawn,
+    updated_at = excluded.updated_at
+"""
+
+INSERT_ROUND = "INSERT INTO rounds (room, word, drawer, guesser, finished_at) VALUES (?, ?, ?, ?, ?)"
+
+TOP_PLAYERS = """
+SELECT name, score, rounds_won, rounds_drawn FROM players
+ORDER BY score DESC, name LIMIT ?
+"""
+
+# (sala, palabra, drawer, adivinador, instante)
+Round = Tuple[str, str, Optional[str], str, float]
+
+ROUNDS_WRITTEN = counter("pictionary_score_rounds_written_total", "Rondas guardadas en la base de datos")
+ROUNDS_DROPPED = counter("pictionary_score_rounds_dropped_total", "Rondas descartadas por cola llena o error de escritura")
+BATCH_SECONDS = histogram("pictionary_score_batch_duration_seconds", "Duración de escribir y confirmar un lote de rondas")
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # Con WAL, NORMAL sólo arriesga las últimas transacciones ante un corte de luz
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+class ScoreStore:
+    """Cola de escritura diferida y consultas del ranking sobre SQLite"""
+    def __init__(
+        self,
+        path: str = settings.SCORES_DB_PATH,
+        batch_size: int = settings.SCORES_BATCH_SIZE,
+        flush_interval: float = settings.SCORES_FLUSH_INTERVAL_MS / 1000,
+        queue_max: int = settings.SCORES_QUEUE_MAX
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_max)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        # Un hilo por conexión: SQLite serializa igualmente las escrituras
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scores-write")
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="scores-read")
+        self._task: Optional[asyncio.Task] = None
+        self._held: Optional[Round] = None  # ronda sacada de la cola esperando a su lote
+
+    async def start(self):
+        """Abre la base de datos y arranca la tarea de escritura (SCORES_DB_PATH vacío la desactiva)"""
+        if self._task is not None or not self.path:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._write_executor, self._open_writer)
+        self._reader = await loop.run_in_executor(self._read_executor, _connect, self.path)
+        self._task = asyncio.create_task(self._run(), name="score-writer")
+        logger.info(f"Puntuaciones en {self.path}")
+
+    def _open_writer(self):
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._writer = _connect(self.path)
+        self._writer.executescript(SCHEMA)
+
+    async def stop(self):
+        """Escribe lo pendiente y cierra la base de datos"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._held is not None:
+            await self._write([self._held])
+            self._held = None
+        await self.flush()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._write_executor, self._writer.close)
+        await loop.run_in_executor(self._read_executor, self._reader.close)
+        self._writer = self._reader = None
+
+    def record_round(self, room: str, word: str, drawer: Optional[str], guesser: str):
+        """Encola una ronda terminada sin esperar a disco"""
+        if self._task is None:
+            return
+        try:
+            self.queue.put_nowait((room, word, drawer, guesser, time.time()))
+        except asyncio.QueueFull:
+            ROUNDS_DROPPED.inc()
+            logger.error(f"Cola de puntuaciones llena: se descarta la ronda de {room}")
+
+    def _take_batch(self) -> List[Round]:
+        batch = []
+        while len(batch) < self.batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        """Espera rondas y las escribe por lotes, como mucho una vez por intervalo"""
+        while True:
+            self._held = await self.queue.get()
+            # Se deja que el lote crezca un poco antes de pagar la transacción
+            await asyncio.sleep(self.flush_interval)
+            batch = [self._held] + self._take_batch()
+            self._held = None
+            await self._write(batch)
+
+    async def flush(self):
+        """Escribe ya todo lo que haya en la cola"""
+        while not self.queue.empty():
+            await self._write(self._take_batch())
+
+    async def _write(self, batch: List[Round]):
+        if not batch:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self._write_executor, self._write_batch, batch)
+            ROUNDS_WRITTEN.inc(amount=len(batch))
+        except sqlite3.Error as e:
+            ROUNDS_DROPPED.inc(amount=len(batch))
+            logger.error(f"Error guardando {len(batch)} rondas: {e}")
+
+    def _write_batch(self, batch: List[Round]):
+        start = time.perf_counter()
+        # Los puntos de cada jugador se suman en memoria: una fila por jugador y lote
+        totals: Dict[str, List[int]] = {}  # nombre -> [puntos, rondas ganadas, rondas dibujadas]
+        for _, _, drawer, guesser, _ in batch:
+            entry = totals.setdefault(guesser, [0, 0, 0])
+            entry[0] += 1
+            entry[1] += 1
+            if drawer:
+                entry = totals.setdefault(drawer, [0, 0, 0])
+                entry[0] += 1
+                entry[2] += 1
+        now = time.time()
+        with self._writer:
+            self._writer.executemany(INSERT_ROUND, batch)
+            self._writer.executemany(
+                UPSERT_PLAYER,
+                [(name, score, won, drawn, now) for name, (score, won, drawn) in totals.items()]
+            )
+        BATCH_SECONDS.observe(time.perf_counter() - start)
+
+    async def top(self, limit: int = 10) -> List[dict]:
+        """Los `limit` jugadores con más puntos (usa el índice por puntuación)"""
+        if self._reader is None:
+            return []
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self._read_executor, self._top, limit)
+        return [
+            {"name": name, "score": score, "rounds_won": won, "rounds_drawn": drawn}
+            for name, score, won, drawn in rows
+        ]
+
+    def _top(self, limit: int) -> list:
+        return self._reader.execute(TOP_PLAYERS, (limit,)).fetchall()
+
+score_store = ScoreStore()
+
+gauge("pictionary_score_queue_depth", "Rondas pendientes de guardar", callback=lambda: score_store.queue.qsize())
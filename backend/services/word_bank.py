@@ -0,0 +1,196 @@
+"""
+Banco de palabras compartido por todas las salas.
+
+Las listas se cargan una vez al arrancar desde WORDS_DIR/<idioma>/<categoría>.txt
+(una palabra por línea, "#" para comentarios). Cada lista se guarda como una
+sola cadena más un array de offsets, así que 100k palabras ocupan unos pocos MB
+en lugar de 100k objetos str, y las salas la leen sin copiarla.
+
+Cada sala saca palabras de su propia ShuffleBag: una permutación pseudoaleatoria
+de los índices (una red Feistel con claves propias) que recorre toda la lista
+sin repetir antes de volver a barajar. La bolsa guarda sólo unas claves y un
+contador, de modo que la memoria no crece con el número de salas.
+"""
+import logging
+import random
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from core.config import settings
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lista mínima si no hay ficheros de palabras
+FALLBACK_WORDS = (
+    "casa", "árbol", "sol", "luna", "estrella", "mar", "montaña",
+    "río", "nube", "flor", "perro", "gato", "pájaro", "pez",
+    "coche", "tren", "avión", "barco", "bicicleta", "moto"
+)
+
+FEISTEL_ROUNDS = 4
+
+class WordList:
+    """Lista inmutable de palabras empaquetada en una cadena y sus offsets"""
+    __slots__ = ("name", "_blob", "_offsets")
+
+    def __init__(self, name: str, words: Iterable[str]):
+        self.name = name
+        unique = list(dict.fromkeys(words))
+        self._blob = "".join(unique)
+        self._offsets = array("I", [0])
+        end = 0
+        for word in unique:
+            end += len(word)
+            self._offsets.append(end)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return self._blob[self._offsets[index]:self._offsets[index + 1]]
+
+class WordSet:
+    """Unión de varias listas (p. ej. todas las categorías de un idioma) sin copiarlas"""
+    __slots__ = ("name", "parts", "_starts", "_size")
+
+    def __init__(self, name: str, parts: Sequence[WordList]):
+        self.name = name
+        self.parts = list(parts)
+        self._starts: List[int] = []
+        total = 0
+        for part in self.parts:
+            self._starts.append(total)
+            total += len(part)
+        self._size = total
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> str:
+        part = bisect_right(self._starts, index) - 1
+        return self.parts[part][index - self._starts[part]]
+
+class ShuffleBag:
+    """Saca palabras sin repetir hasta agotar la lista, en O(1) por palabra y memoria constante"""
+    __slots__ = ("words", "_half_bits", "_mask", "_rng", "_keys", "_position", "_last")
+
+    def __init__(self, words, rng: Optional[random.Random] = None):
+        self.words = words
+        # Dominio 2^(2 * half_bits) >= len(words): los índices fuera de rango se saltan
+        # (cycle walking), con menos de 4 intentos por palabra en el peor caso
+        bits = max(2, (len(words) - 1).bit_length())
+        self._half_bits = (bits + 1) // 2
+        self._mask = (1 << self._half_bits) - 1
+        self._rng = rng
+        self._last: Optional[int] = None
+        self._reshuffle()
+
+    def _reshuffle(self):
+        rng = self._rng or random
+        while True:
+            self._keys = tuple(rng.getrandbits(32) for _ in range(FEISTEL_ROUNDS))
+            self._position = 0
+            # Tampoco se repite la última palabra al empezar una bolsa nueva: se rebaraja
+            # (probabilidad 1/n) en lugar de saltarla, que la dejaría fuera de toda la bolsa
+            if self._last is None or len(self.words) == 1 or self._first_index() != self._last:
+                return
+
+    def _first_index(self) -> int:
+        """Primer índice válido de la permutación actual, sin consumirlo"""
+        position = 0
+        while True:
+            index = self._permute(position)
+            if index < len(self.words):
+                return index
+            position += 1
+
+    def _permute(self, value: int) -> int:
+        half_bits = self._half_bits
+        mask = self._mask
+        left = value >> half_bits
+        right = value & mask
+        for key in self._keys:
+            mixed = ((right ^ key) * 0x9E3779B1) & 0xFFFFFFFF
+            mixed ^= mixed >> 15
+            left, right = right, left ^ (mixed & mask)
+        return (left << half_bits) | right
+
+    def draw(self) -> str:
+        """Siguiente palabra de la bolsa; al vaciarse se vuelve a barajar"""
+        size = len(self.words)
+        domain = 1 << (2 * self._half_bits)
+        while True:
+            if self._position == domain:
+                self._reshuffle()
+            index = self._permute(self._position)
+            self._position += 1
+            if index < size:
+                self._last = index
+                return self.words[index]
+
+class WordBank:
+    """Listas de palabras por idioma y categoría, cargadas una sola vez"""
+    def __init__(self):
+        self.lists: Dict[str, Dict[str, WordList]] = {}  # idioma -> categoría -> lista
+        self._sets: Dict[str, WordSet] = {}  # idioma -> todas sus categorías
+        self.loaded = False
+
+    def load(self, directory: Optional[str] = None):
+        """Carga WORDS_DIR/<idioma>/<categoría>.txt; sin ficheros usa la lista mínima"""
+        root = Path(directory or settings.WORDS_DIR)
+        lists: Dict[str, Dict[str, WordList]] = {}
+        for path in sorted(root.glob("*/*.txt")):
+            language = path.parent.name
+            category = path.stem
+            try:
+                with path.open(encoding="utf-8") as f:
+                    words = [line.strip() for line in f]
+            except OSError as e:
+                logger.error(f"Error leyendo {path}: {e}")
+                continue
+            words = [word for word in words if word and not word.startswith("#")]
+            if words:
+                lists.setdefault(language, {})[category] = WordList(f"{language}/{category}", words)
+        if not lists:
+            logger.warning(f"No hay listas de palabras en {root}; se usa la lista mínima")
+            lists = {settings.WORDS_LANGUAGE: {"general": WordList(f"{settings.WORDS_LANGUAGE}/general", FALLBACK_WORDS)}}
+
+        self.lists = lists
+        self._sets = {
+            language: WordSet(language, list(categories.values()))
+            for language, categories in lists.items()
+        }
+        self.loaded = True
+        total = sum(len(words) for words in self._sets.values())
+        logger.info(f"Banco de palabras cargado: {total} palabras en {len(self._sets)} idiomas")
+
+    def languages(self) -> Dict[str, List[str]]:
+        """Idiomas disponibles y sus categorías"""
+        if not self.loaded:
+            self.load()
+        return {language: sorted(categories) for language, categories in self.lists.items()}
+
+    def words(self, language: Optional[str] = None, category: Optional[str] = None):
+        """Lista compartida de un idioma (y categoría); si no existe, la del idioma por defecto"""
+        if not self.loaded:
+            self.load()
+        language = language or settings.WORDS_LANGUAGE
+        if language not in self._sets:
+            logger.warning(f"Idioma de palabras desconocido: {language}")
+            language = settings.WORDS_LANGUAGE if settings.WORDS_LANGUAGE in self._sets else next(iter(self._sets))
+        if category:
+            words = self.lists[language].get(category)
+            if words is not None:
+                return words
+            logger.warning(f"Categoría de palabras desconocida: {language}/{category}")
+        return self._sets[language]
+
+    def bag(self, language: Optional[str] = None, category: Optional[str] = None) -> ShuffleBag:
+        """Bolsa sin repeticiones para una sala"""
+        return ShuffleBag(self.words(language, category))
+
+word_bank = WordBank()
@@ -0,0 +1,113 @@
+"""
+Backplane entre workers: contrato común antes de start(), entrega por el broker local,
+reconexión con resuscripción y cola de salida acotada.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from core import backplane
+from core.backplane import Backplane, BrokerBackplane, InProcessBackplane, LocalBroker
+
+async def next_message(queue: asyncio.Queue) -> dict:
+    return await asyncio.wait_for(queue.get(), timeout=2)
+
+async def subscribed(bp: Backplane, channel: str) -> asyncio.Queue:
+    queue = asyncio.Queue()
+
+    async def handler(message):
+        queue.put_nowait(message)
+
+    await bp.subscribe(channel, handler)
+    return queue
+
+def test_backplane_is_abstract():
+    with pytest.raises(TypeError):
+        Backplane()
+
+@pytest.mark.parametrize("create", [InProcessBackplane, lambda: BrokerBackplane("127.0.0.1", 1)])
+def test_publish_requires_start(create):
+    async def main():
+        bp = create()
+        with pytest.raises(RuntimeError):
+            bp.publish("worker.0", {"n": 1})
+        with pytest.raises(RuntimeError):
+            await bp.subscribe("worker.0", None)
+    asyncio.run(main())
+
+def test_in_process_delivers_in_order_until_stopped():
+    async def main():
+        bp = InProcessBackplane()
+        await bp.start()
+        queue = await subscribed(bp, "worker.0")
+        for n in range(3):
+            bp.publish("worker.0", {"n": n})
+        assert [(await next_message(queue))["n"] for _ in range(3)] == [0, 1, 2]
+        await bp.stop()
+        with pytest.raises(RuntimeError):
+            bp.publish("worker.0", {"n": 3})
+    asyncio.run(main())
+
+def reconnects() -> float:
+    return backplane.RECONNECTS.values.get((), 0)
+
+async def start_broker() -> tuple:
+    broker = LocalBroker("127.0.0.1", 0)
+    await broker.start()
+    return broker, broker._server.sockets[0].getsockname()[1]
+
+def test_broker_reconnects_and_resubscribes(monkeypatch):
+    monkeypatch.setattr(backplane, "RECONNECT_MIN_DELAY", 0.01)
+
+    async def main():
+        broker, port = await start_broker()
+        sender, receiver = BrokerBackplane("127.0.0.1", port), BrokerBackplane("127.0.0.1", port)
+        await sender.start()
+        await receiver.start()
+        try:
+            queue = await subscribed(receiver, "worker.1")
+            await asyncio.sleep(0.05)
+            sender.publish("worker.1", {"n": 1})
+            assert (await next_message(queue))["n"] == 1
+
+            before = reconnects()
+            # Se corta la conexión del receptor: debe reconectar y volver a suscribirse
+            receiver._writer.transport.abort()
+            for _ in range(100):
+                await asyncio.sleep(0.02)
+                if reconnects() > before:
+                    break
+            assert reconnects() == before + 1
+            await asyncio.sleep(0.05)
+            sender.publish("worker.1", {"n": 2})
+            assert (await next_message(queue))["n"] == 2
+        finally:
+            await sender.stop()
+            await receiver.stop()
+            await broker.stop()
+    asyncio.run(main())
+
+def test_outbox_is_capped():
+    async def main():
+        broker, port = await start_broker()
+        bp = BrokerBackplane("127.0.0.1", port, max_pending_bytes=1024)
+        await bp.start()
+        try:
+            # Sin ceder el loop la tarea de escritura no vacía la cola
+            for n in range(100):
+                bp.publish("worker.9", {"n": n, "pad": "x" * 40})
+            assert bp._pending_bytes <= 1024
+            assert bp.dropped > 0 and len(bp._outbox) + bp.dropped == 100
+            await asyncio.sleep(0.05)
+            assert bp._pending_bytes == 0 and not bp._outbox
+        finally:
+            await bp.stop()
+            await broker.stop()
+    asyncio.run(main())
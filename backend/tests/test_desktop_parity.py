@@ -0,0 +1,54 @@
+"""
+El cliente de escritorio lleva su propia copia de strokes.py y codec.py (se distribuye
+sin el backend): estas pruebas fallan si la copia se separa del original.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import ast
+import importlib.util
+import inspect
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+DESKTOP = BACKEND.parent / "desktop"
+sys.path.append(str(BACKEND))
+
+from api.v1 import strokes
+from core import codec
+
+def load(name: str):
+    """Importa un módulo del escritorio por ruta, sin tocar sys.path"""
+    spec = importlib.util.spec_from_file_location(f"desktop_{name}", DESKTOP / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def body(path: Path) -> str:
+    """Código del módulo sin su docstring"""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    if tree.body and isinstance(tree.body[0], ast.Expr) and isinstance(tree.body[0].value, ast.Constant):
+        tree.body = tree.body[1:]
+    return ast.dump(tree)
+
+def test_codec_matches_backend():
+    assert body(DESKTOP / "codec.py") == body(BACKEND / "core" / "codec.py")
+
+desktop_strokes = load("strokes")
+
+@pytest.mark.parametrize("name", ["_write_varint", "_read_varint", "encode_points", "decode_frames"])
+def test_stroke_functions_match_backend(name):
+    assert inspect.getsource(getattr(desktop_strokes, name)) == inspect.getsource(getattr(strokes, name))
+
+def test_stroke_constants_match_backend():
+    for name in ("STROKE_SUBPROTOCOL", "OP_POINTS", "OP_CLEAR", "KNOWN_OPS"):
+        assert getattr(desktop_strokes, name) == getattr(strokes, name)
+    assert desktop_strokes.encode_clear() == strokes.encode_clear()
+
+def test_desktop_frames_decode_in_backend():
+    frame = desktop_strokes.encode_points(9, [3, 4, -2, 8]) + desktop_strokes.encode_clear()
+    assert strokes.validate_frame(frame)
+    assert strokes.frames_to_messages(frame) == [{"type": "draw", "stroke": 9, "points": [3, 4, -2, 8]}, {"type": "clear"}]
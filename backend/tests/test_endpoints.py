@@ -0,0 +1,47 @@
+"""
+Las rutas REST responden en las URLs documentadas en el README (/api/v1/...).
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from main import app
+
+def get(path: str, query: str = ""):
+    """GET directo contra la app ASGI (sin lifespan ni servidor); devuelve (estado, cuerpo JSON)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, json.loads(body)
+
+@pytest.mark.parametrize("path, query, key", [
+    ("/api/v1/leaderboard", "limit=10", "players"),
+    ("/api/v1/words", "", None),
+    ("/api/v1/connections", "", "connections"),
+])
+def test_documented_urls(path, query, key):
+    status, body = get(path, query)
+    assert status == 200
+    if key is not None:
+        assert key in body
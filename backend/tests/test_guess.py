@@ -0,0 +1,58 @@
+"""
+Comparación de intentos: normalización, distancia de edición acotada y pista de "casi".
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.guess import CLOSE, HIT, MAX_GUESS_LENGTH, MISS, GuessMatcher, bounded_distance, normalize
+
+def levenshtein(a: str, b: str) -> int:
+    """Distancia de edición completa, como referencia"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+WORDS = ["", "a", "gato", "pato", "gaot", "perro", "prro", "elefante", "elefnate", "jirafa", "girafa"]
+
+@pytest.mark.parametrize("limit", [0, 1, 2, 3])
+def test_bounded_distance_matches_reference(limit):
+    for a, b in itertools.product(WORDS, repeat=2):
+        expected = levenshtein(a, b)
+        assert bounded_distance(a, b, limit) == (expected if expected <= limit else limit + 1), (a, b)
+
+@pytest.mark.parametrize("text, key", [
+    ("Árbol", "arbol"),
+    ("  Café   con  Leche ", "cafe con leche"),
+    ("PINGÜINO", "pinguino"),
+    ("gato", "gato"),
+])
+def test_normalize(text, key):
+    assert normalize(text) == key
+
+@pytest.mark.parametrize("word, guess, result", [
+    ("Árbol", "arbol", HIT),
+    ("Árbol", " ÁRBOL ", HIT),
+    ("Árbol", "arbl", CLOSE),
+    ("elefante", "elefnate", CLOSE),
+    ("elefante", "elfnt", MISS),
+    ("sol", "sal", MISS),  # palabras cortas: sin pista
+    ("gato", None, MISS),
+    ("gato", 42, MISS),
+    ("gato", "g" * (MAX_GUESS_LENGTH + 1), MISS),
+])
+def test_matcher_check(word, guess, result):
+    matcher = GuessMatcher(word)
+    assert matcher.check(guess) == result
+    assert matcher.matches(guess) == (result == HIT)
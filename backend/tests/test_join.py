@@ -0,0 +1,126 @@
+"""
+El join versiona el alta antes de enviar el snapshot: quien llega recibe un estado
+coherente con su versión y los parches siguientes encajan sin huecos.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import asyncio
+import copy
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.rooms import Room
+from api.v1.websocket import handle_text_frame, manager
+
+class FakeConnection:
+    """Conexión que guarda los frames encolados en lugar de enviarlos"""
+    def __init__(self):
+        self.frames = []
+
+    def send(self, data) -> bool:
+        self.frames.append(data)
+        return True
+
+    async def close(self):
+        pass
+
+    def messages(self):
+        return [json.loads(frame) for frame in self.frames]
+
+def connect(room: Room) -> tuple:
+    client_id = manager.new_client_id()
+    connection = FakeConnection()
+    manager._register(connection, client_id, room, False)
+    manager.open_session(client_id, room)
+    return client_id, connection
+
+def join(room: Room, client_id: str, client_type: str, name: str):
+    handle_text_frame(room, client_id, client_type, json.dumps({"type": "join", "name": name}))
+
+def merge(target: dict, patch: dict):
+    """JSON merge patch como lo aplican los clientes"""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+def replay(messages) -> dict:
+    """Aplica state/patch como un cliente y devuelve el estado visto en cada versión"""
+    state, version, history = None, None, {}
+    for message in messages:
+        if message["type"] == "state":
+            state, version = copy.deepcopy(message["state"]), message["version"]
+        elif message["type"] == "patch":
+            assert message["base_version"] == version, f"hueco de versión: {version} -> {message}"
+            merge(state, message["changes"])
+            version = message["version"]
+        else:
+            continue
+        history[version] = copy.deepcopy(state)
+    return history
+
+def run(scenario):
+    async def main():
+        room = Room("test-join")
+        try:
+            return scenario(room)
+        finally:
+            for client_id in list(room.clients):
+                manager.release(client_id)
+    return asyncio.run(main())
+
+def assert_snapshots_consistent(observer: FakeConnection, connection: FakeConnection):
+    """Cada snapshot debe ser el estado que un cliente que siguió todos los parches tenía en esa versión"""
+    history = replay(observer.messages())
+    replay(connection.messages())
+    for message in connection.messages():
+        if message["type"] == "state":
+            assert message["state"] == history[message["version"]]
+
+def test_join_snapshot_matches_version():
+    def scenario(room):
+        _, observer = connect(room)
+        client_id, connection = connect(room)
+        join(room, client_id, "frontend", "Ana")
+        assert_snapshots_consistent(observer, connection)
+        assert max(replay(connection.messages())) == room.game_state.version
+    run(scenario)
+
+def test_second_join_keeps_versions_contiguous():
+    def scenario(room):
+        _, observer = connect(room)
+        first_id, first = connect(room)
+        join(room, first_id, "frontend", "Ana")
+        second_id, second = connect(room)
+        join(room, second_id, "desktop", "Beto")
+        for connection in (first, second):
+            assert_snapshots_consistent(observer, connection)
+            seen = replay(connection.messages())
+            assert {"Ana", "Beto"} <= set(seen[room.game_state.version]["players"])
+    run(scenario)
+
+def test_snapshot_refuses_pending_changes():
+    def scenario(room):
+        room.game_state.add_player("Ana", "frontend")
+        with pytest.raises(RuntimeError):
+            room.game_state.public_snapshot()
+    run(scenario)
+
+def test_joiner_gets_one_private_message():
+    def scenario(room):
+        first_id, _ = connect(room)
+        join(room, first_id, "frontend", "Ana")
+        second_id, second = connect(room)
+        join(room, second_id, "desktop", "Beto")
+        assert room.game_state.game_started
+        assert [m["type"] for m in second.messages()].count("private") == 1
+    run(scenario)
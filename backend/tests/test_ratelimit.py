@@ -0,0 +1,75 @@
+"""
+Límites por conexión: token buckets, tipo leído sin decodificar y cobro del tipo real
+cuando el JSON repite "type".
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.rooms import Room
+from api.v1.websocket import handle_text_frame, manager
+from core.ratelimit import OTHER, RateLimiter, TokenBucket, parse_limits, peek_type
+
+@pytest.mark.parametrize("data, message_type", [
+    ('{"type":"draw","x":1}', "draw"),
+    ('{ "type" : "guess", "guess": "gato"}', "guess"),
+    ('{"x":1}', None),
+    ('{"pad":"' + "x" * 200 + '","type":"draw"}', None),  # fuera de la ventana leída
+    ("no es json", None),
+])
+def test_peek_type(data, message_type):
+    assert peek_type(data) == message_type
+
+def test_parse_limits():
+    assert parse_limits("draw=200:400, guess=4,bad,=3") == {"draw": (200.0, 400.0), "guess": (4.0, 4.0)}
+
+def test_bucket_burst_and_refill():
+    bucket = TokenBucket(rate=2, capacity=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(4)] == [True, True, True, False]
+    # Medio segundo a 2 tokens/s devuelve uno
+    assert bucket.take(now + 0.5)
+    assert not bucket.take(now + 0.5)
+    # El relleno no pasa de la capacidad
+    assert [bucket.take(now + 100) for _ in range(4)] == [True, True, True, False]
+
+def test_limiter_falls_back_to_other():
+    limiter = RateLimiter({"draw": (1, 1), OTHER: (1, 2)})
+    assert limiter.allow("draw") and not limiter.allow("draw")
+    assert limiter.allow("sync") and limiter.allow(None) and not limiter.allow("unknown")
+    assert limiter.violations == 2
+    assert RateLimiter({"draw": (1, 1)}).allow("guess")
+
+class FakeConnection:
+    def send(self, data) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+def test_duplicate_type_is_charged_as_decoded():
+    async def main():
+        room = Room("test-ratelimit")
+        client_id = manager.new_client_id()
+        manager._register(FakeConnection(), client_id, room, False)
+        limiter = manager.limiters[client_id] = RateLimiter({"draw": (1000, 1000), "join": (0.001, 1)})
+        try:
+            # peek_type ve "draw", pero el JSON decodificado es un join: se cobra también el join
+            frame = json.dumps({"type": "draw", "name": "Ana"})[:-1] + ', "type": "join"}'
+            assert peek_type(frame) == "draw"
+            handle_text_frame(room, client_id, "frontend", frame)
+            assert "Ana" in room.game_state.players
+            handle_text_frame(room, client_id, "frontend", frame.replace("Ana", "Beto"))
+            assert "Beto" not in room.game_state.players
+            assert limiter.violations == 1
+        finally:
+            manager.release(client_id)
+    asyncio.run(main())
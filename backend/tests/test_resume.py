@@ -0,0 +1,120 @@
+"""
+Reanudación de sesiones: buffer circular de parches por sala y vuelta a un snapshot
+cuando lo perdido ya no está en el buffer.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import asyncio
+import json
+import sys
+from collections import deque
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.rooms import Room
+from api.v1.websocket import handle_text_frame, manager
+
+class FakeConnection:
+    """Conexión que guarda los frames encolados en lugar de enviarlos"""
+    def __init__(self):
+        self.frames = []
+
+    def send(self, data) -> bool:
+        self.frames.append(data)
+        return True
+
+    async def close(self):
+        pass
+
+    def messages(self):
+        return [json.loads(frame) for frame in self.frames]
+
+def connect(room: Room, token=None, version=None) -> tuple:
+    client_id = manager.new_client_id()
+    connection = FakeConnection()
+    manager._register(connection, client_id, room, False)
+    manager.open_session(client_id, room, token, version)
+    return client_id, connection
+
+def join(room: Room, name: str, client_type: str = "frontend") -> tuple:
+    client_id, connection = connect(room)
+    handle_text_frame(room, client_id, client_type, json.dumps({"type": "join", "name": name}))
+    token = next(m["token"] for m in connection.messages() if m["type"] == "session")
+    return client_id, connection, token
+
+def last_version(connection: FakeConnection) -> int:
+    return [m["version"] for m in connection.messages() if m["type"] in ("state", "patch")][-1]
+
+def run(scenario):
+    async def main():
+        room = Room("test-resume")
+        try:
+            return scenario(room)
+        finally:
+            for client_id in list(room.clients):
+                manager.release(client_id)
+    return asyncio.run(main())
+
+def test_patches_since():
+    def scenario(room):
+        room.recent_patches = deque(maxlen=3)
+        for version in range(1, 6):
+            room.remember_patch(version - 1, version, f"p{version}")
+        room.game_state.version = 5
+        assert room.patches_since(5) == []
+        assert room.patches_since(3) == ["p4", "p5"]
+        assert room.patches_since(2) == ["p3", "p4", "p5"]
+        # p2 salió del buffer: hay que mandar el estado completo
+        assert room.patches_since(1) is None
+        assert room.patches_since(7) is None
+    run(scenario)
+
+def test_tokens_are_single_use_per_player():
+    def scenario(room):
+        first = room.issue_token("Ana")
+        second = room.issue_token("Ana")
+        assert room.player_for_token(first) is None
+        assert room.player_for_token(second) == "Ana"
+        room.revoke_token("Ana")
+        assert room.player_for_token(second) is None
+        assert room.player_for_token(None) is None
+    run(scenario)
+
+def test_resume_replays_missed_patches():
+    def scenario(room):
+        ana_id, ana, token = join(room, "Ana")
+        version = last_version(ana)
+        manager.leave(room, ana_id)
+        join(room, "Beto", "desktop")
+        _, resumed = connect(room, token, version)
+        messages = resumed.messages()
+        assert [m["type"] for m in messages if m["type"] in ("state", "resumed")] == ["resumed"]
+        patches = [m for m in messages if m["type"] == "patch"]
+        assert patches[0]["base_version"] == version
+        assert all(a["version"] == b["base_version"] for a, b in zip(patches, patches[1:]))
+        assert patches[-1]["version"] == room.game_state.version
+        assert next(m for m in messages if m["type"] == "resumed")["missed"] == len(patches)
+        assert room.game_state.players["Ana"].is_connected
+    run(scenario)
+
+def test_resume_falls_back_to_snapshot():
+    def scenario(room):
+        room.recent_patches = deque(maxlen=1)
+        ana_id, ana, token = join(room, "Ana")
+        version = last_version(ana)
+        manager.leave(room, ana_id)
+        join(room, "Beto", "desktop")
+        _, resumed = connect(room, token, version)
+        states = [m for m in resumed.messages() if m["type"] == "state"]
+        assert [s["version"] for s in states] == [room.game_state.version]
+        assert states[0]["state"]["players"]["Ana"]["is_connected"]
+        assert [m["type"] for m in resumed.messages()].count("private") == 1
+    run(scenario)
+
+def test_unknown_token_rejoins():
+    def scenario(room):
+        _, connection = connect(room, "no-existe", 0)
+        assert [m["type"] for m in connection.messages()] == ["resume_failed", "state"]
+    run(scenario)
@@ -0,0 +1,76 @@
+"""
+Plazos por clave: reemplazo, cancelación y el plazo de ping que se reprograma en
+lugar de desconectar a un cliente que sigue vivo.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.rooms import Room
+from api.v1.websocket import manager
+from core.scheduler import DeadlineScheduler, scheduler
+
+def test_schedule_replaces_and_cancels():
+    async def main():
+        deadlines = DeadlineScheduler()
+        fired = []
+        deadlines.schedule("a", 0.01, fired.append, "first")
+        deadlines.schedule("a", 0.02, fired.append, "second")
+        deadlines.schedule("b", 0.01, fired.append, "b")
+        assert len(deadlines) == 2
+        assert deadlines.cancel("b") and not deadlines.cancel("b")
+        await asyncio.sleep(0.05)
+        assert fired == ["second"]
+        assert "a" not in deadlines and len(deadlines) == 0
+    asyncio.run(main())
+
+def test_callback_errors_and_coroutines():
+    async def main():
+        deadlines = DeadlineScheduler()
+        fired = []
+
+        async def later(value):
+            fired.append(value)
+
+        deadlines.schedule("error", 0, lambda: 1 / 0)
+        deadlines.schedule("coro", 0, later, "coro")
+        await asyncio.sleep(0.02)
+        # Un callback que falla no impide los demás
+        assert fired == ["coro"]
+    asyncio.run(main())
+
+class FakeConnection:
+    def send(self, data) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+def test_ping_deadline_rearms_while_alive():
+    async def main():
+        room = Room("test-scheduler")
+        client_id = manager.new_client_id()
+        timeout = manager.ping_timeout
+        manager.ping_timeout = timedelta(seconds=0.2)
+        try:
+            manager._register(FakeConnection(), client_id, room, False)
+            for _ in range(4):
+                await asyncio.sleep(0.05)
+                manager.last_ping[client_id] = datetime.now()
+            # Sigue conectado y con un único plazo pendiente
+            assert client_id in room.clients and ("ping", client_id) in scheduler
+            await asyncio.sleep(0.5)
+            # Sin señales vence el plazo y la sala lo desconecta
+            assert client_id not in room.clients
+            assert ("ping", client_id) not in scheduler
+        finally:
+            manager.ping_timeout = timeout
+            manager.release(client_id)
+            room.stop()
+    asyncio.run(main())
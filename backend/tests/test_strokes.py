@@ -0,0 +1,138 @@
+"""
+Subprotocolo binario de trazos: ida y vuelta del códec varint/zigzag y rechazo de
+frames mal formados antes de que lleguen a la sala.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from api.v1.strokes import (
+    CLEAR_FRAME, MAX_COORD, OP_CLEAR, OP_POINTS, StrokeBatch, StrokeLog, decode_frames, encode_points,
+    frames_to_messages, message_to_frame, valid_stroke_message, validate_frame,
+)
+
+@pytest.mark.parametrize("points", [
+    [0, 0],
+    [10, 20, 11, 19, 400, 300],
+    [-5, -7, 5, 7, -MAX_COORD, MAX_COORD],
+    [i % 700 for i in range(2000)],
+])
+def test_points_round_trip(points):
+    frame = encode_points(42, points)
+    assert validate_frame(frame)
+    [(op, stroke_id, decoded)] = list(decode_frames(frame))
+    assert (op, stroke_id, decoded.tolist()) == (OP_POINTS, 42, points)
+
+def test_concatenated_frames_round_trip():
+    data = encode_points(1, [1, 2, 3, 4]) + CLEAR_FRAME + encode_points(2, [5, 6])
+    assert validate_frame(data)
+    assert [(op, stroke_id) for op, stroke_id, _ in decode_frames(data)] == [(OP_POINTS, 1), (OP_CLEAR, 0), (OP_POINTS, 2)]
+    assert frames_to_messages(data) == [
+        {"type": "draw", "stroke": 1, "points": [1, 2, 3, 4]},
+        {"type": "clear"},
+        {"type": "draw", "stroke": 2, "points": [5, 6]},
+    ]
+
+@pytest.mark.parametrize("message, points", [
+    ({"type": "draw", "stroke": 3, "points": [1, 2, 3, 4]}, [1, 2, 3, 4]),
+    ({"type": "draw", "stroke": 3, "x1": 1, "y1": 2, "x2": 3, "y2": 4}, [1, 2, 3, 4]),
+    ({"type": "draw", "stroke": 3, "x": 7, "y": 8}, [7, 8]),
+])
+def test_message_to_frame(message, points):
+    [(_, stroke_id, decoded)] = list(decode_frames(message_to_frame(message)))
+    assert (stroke_id, decoded.tolist()) == (3, points)
+    assert valid_stroke_message(message)
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"\x03",  # operación desconocida
+    encode_points(1, [1, 2, 3, 4])[:-1],  # truncado
+    bytes((OP_POINTS, 1, 1, 0xFF, 0xFF, 0xFF, 0x7F, 0)),  # delta de 4 bytes
+    bytes((OP_POINTS, 1, 100, 0, 0)),  # más puntos de los que caben
+    bytes((OP_POINTS, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0)),  # varint sin fin
+    encode_points(1, [MAX_COORD + 1, 0]),
+    encode_points(1, [0, 0, 0, -MAX_COORD - 1]),
+    CLEAR_FRAME + b"\x07",  # un frame válido no salva al siguiente
+])
+def test_malformed_frames_rejected(data):
+    assert not validate_frame(data)
+
+@pytest.mark.parametrize("message", [
+    {"type": "draw", "x": "a", "y": 1},
+    {"type": "draw", "x1": 1, "y1": 2},
+    {"type": "draw", "points": [1, 2, 10 ** 12, 3]},
+    {"type": "draw", "stroke": -1, "x": 1, "y": 1},
+])
+def test_malformed_messages_rejected(message):
+    assert not valid_stroke_message(message)
+
+def test_batch_excludes_sender_and_converts():
+    batch = StrokeBatch()
+    batch.add_frame("a", encode_points(1, [1, 2]))
+    batch.add_message("b", {"type": "draw", "stroke": 2, "points": [3, 4]})
+    batch.add_frame("a", CLEAR_FRAME)
+    assert batch.senders() == {"a", "b"}
+    assert frames_to_messages(batch.to_bytes(exclude="b")) == [
+        {"type": "draw", "stroke": 1, "points": [1, 2]},
+        {"type": "clear"},
+    ]
+    assert batch.to_messages(exclude="a") == [{"type": "draw", "stroke": 2, "points": [3, 4]}]
+
+def test_batch_isolates_malformed_events():
+    batch = StrokeBatch()
+    batch.add_frame("a", b"\x01\x01\x05\x00")  # truncado
+    batch.add_message("b", {"type": "draw", "x": "a", "y": 1})
+    batch.add_frame("c", encode_points(3, [5, 6]))
+    assert batch.to_messages() == [{"type": "draw", "x": "a", "y": 1}, {"type": "draw", "stroke": 3, "points": [5, 6]}]
+    # Los frames ya se validaron al recibirlos; aquí sólo se convierten los mensajes JSON
+    assert frames_to_messages(batch.to_bytes(exclude="a")) == [{"type": "draw", "stroke": 3, "points": [5, 6]}]
+
+def test_log_compacts_segments_into_strokes():
+    log = StrokeLog(compact_every=4)
+    log.append(encode_points(1, [0, 0, 1, 1]))
+    log.append({"type": "draw", "stroke": 1, "x1": 1, "y1": 1, "x2": 2, "y2": 2})
+    log.append(encode_points(2, [9, 9]))
+    log.append({"type": "draw", "stroke": 1, "points": [2, 2, 3, 3]})
+    # Al llegar a compact_every la cola pasa al checkpoint y se funden los puntos de unión
+    assert log.tail == []
+    assert {k: v.tolist() for k, v in log.strokes.items()} == {1: [0, 0, 1, 1, 2, 2, 3, 3], 2: [9, 9]}
+    assert len(log) == 5
+    assert frames_to_messages(log.snapshot_frame()) == log.snapshot_messages() == [
+        {"type": "draw", "stroke": 1, "points": [0, 0, 1, 1, 2, 2, 3, 3]},
+        {"type": "draw", "stroke": 2, "points": [9, 9]},
+    ]
+
+def test_log_clear_resets():
+    log = StrokeLog()
+    log.append(encode_points(1, [0, 0, 1, 1]))
+    log.append(CLEAR_FRAME)
+    assert len(log) == 0 and log.snapshot_frame() == b""
+    log.append(encode_points(2, [5, 5]))
+    log.append({"type": "clear"})
+    assert len(log) == 0
+
+def test_log_drops_malformed_events_and_clamps():
+    log = StrokeLog()
+    log.append({"type": "draw", "x": "a", "y": 1})
+    log.append({"type": "draw", "stroke": 4, "points": [1, 2, MAX_COORD * 4, -MAX_COORD * 4]})
+    assert log.snapshot_messages() == [{"type": "draw", "stroke": 4, "points": [1, 2, MAX_COORD, -MAX_COORD]}]
+    assert validate_frame(log.snapshot_frame())
+
+def test_log_decimates_to_max_points():
+    log = StrokeLog(max_points=100, compact_every=1)
+    points = [v for i in range(150) for v in (i, 2 * i)]
+    log.append(encode_points(1, points))
+    stroke = log.strokes[1].tolist()
+    assert log.point_count == len(stroke) // 2 <= 100
+    # Se conservan los extremos del trazo
+    assert stroke[:2] == points[:2] and stroke[-2:] == points[-2:]
+    for i in range(5):
+        log.append(encode_points(10 + i, [i, i] * 30))
+    assert log.point_count <= 100
+    assert log.point_count == sum(len(s) // 2 for s in log.strokes.values())
@@ -0,0 +1,28 @@
+"""
+Bolsa de palabras: cada vuelta saca todas las palabras una vez y la nueva bolsa no
+empieza por la última palabra de la anterior.
+
+Uso (desde backend/):
+    python -m pytest tests
+"""
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from services.word_bank import ShuffleBag
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 17, 100])
+def test_each_cycle_draws_every_word_once(size):
+    words = [f"w{i}" for i in range(size)]
+    bag = ShuffleBag(words, random.Random(size))
+    previous = None
+    for _ in range(50):
+        cycle = [bag.draw() for _ in range(size)]
+        assert sorted(cycle) == sorted(words)
+        if size > 1:
+            assert cycle[0] != previous
+        previous = cycle[-1]
@@ -1,5 +1,5 @@
+import os
 import sys
-import json
 import asyncio
 import websockets
 import tkinter as tk
@@ -12,6 +12,11 @@ import threading
 import queue
 from datetime import datetime
 import signal
+from collections import deque
+from urllib.parse import quote
+import codec
+from strokes import OP_CLEAR, STROKE_SUBPROTOCOL, decode_frames, encode_clear, encode_points
+from stroke_canvas import StrokeCanvas
 
 # Configurar logging
 logging.basicConfig(
@@ -20,6 +25,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Evento virtual con el que el hilo asíncrono despierta al loop de Tk
+MESSAGES_EVENT = "<<MensajesServidor>>"
+# Marca en la cola de mensajes: cambió el estado de la conexión
+CONNECTION_CHANGED = object()
+
+# Latido de la aplicación: el servidor cierra las conexiones sin mensajes durante 30 s
+HEARTBEAT_INTERVAL = 10
+
+# Trazos salientes: se envían como mucho una vez por intervalo y con un buffer acotado
+STROKE_SEND_INTERVAL = 0.03
+MAX_PENDING_POINTS = 4096
+# Marca en el buffer de trazos: limpiar el canvas
+CLEAR_CANVAS = object()
+
+def apply_merge_patch(target: dict, patch: dict):
+    """Aplica un JSON merge patch sobre el estado local (None elimina la clave)"""
+    for key, value in patch.items():
+        if value is None:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            apply_merge_patch(target[key], value)
+        else:
+            target[key] = value
+
 class DrawingGame:
     def __init__(self):
         self.root = tk.Tk()
@@ -37,22 +66,37 @@ class DrawingGame:
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
         self.player_name = f"Desktop_{datetime.now().strftime('%H%M%S')}"
+        self.room_id = os.environ.get("PICTIONARY_ROOM", "default")
         self.is_drawer = False
         self.current_word = None
         self.game_started = False
         self.game_paused = False
+        self.binary_strokes = False
+        self.state = {}
+        self.state_version = None
+        self.resume_token = None  # token de la sesión para reconectar sin join
+        self.stroke_id = 0
+        # Puntos (stroke_id, x, y) pendientes de enviar: el hilo de Tk añade y el asíncrono vacía
+        self.pending_points = deque()
+        self.dropped_points = 0
+        self.last_sent_point = None  # último punto enviado, para enlazar el siguiente lote del trazo
+        self.stroke_wakeup = None
+        self.stroke_wakeup_pending = False
         
-        # Colas para comunicación entre hilos
+        # Cola para comunicación entre hilos; sólo hay una notificación a Tk pendiente a la vez
         self.message_queue = queue.Queue()
-        self.command_queue = queue.Queue()
+        self.wakeup_pending = threading.Event()
         
         # Variables de control
         self.running = True
         self.ws = None
         self.ws_task = None
         self.ping_task = None
+        self.receive_task = None
+        self.stroke_task = None
         self.reconnect_task = None
         self.event_loop = None
+        self.shutdown_event = None
         
         # Configurar el manejo de señales
         signal.signal(signal.SIGINT, self.handle_shutdown)
@@ -92,6 +136,7 @@ class DrawingGame:
             highlightbackground="#cccccc"
         )
         self.canvas.pack(pady=10)
+        self.stroke_canvas = StrokeCanvas(self.canvas, 600, 400)
         
         # Botones
         button_frame = ttk.Frame(main_frame)
@@ -134,6 +179,9 @@ class DrawingGame:
         self.canvas.bind("<B1-Motion>", self.draw)
         self.canvas.bind("<ButtonRelease-1>", self.stop_drawing)
         
+        # Mensajes del servidor: el hilo asíncrono avisa con un evento virtual
+        self.root.bind(MESSAGES_EVENT, self.process_messages)
+        
         # Configurar evento de cierre
         self.root.protocol("WM_DELETE_WINDOW", self.handle_shutdown)
 
@@ -155,66 +203,152 @@ class DrawingGame:
 
     async def async_main(self):
         """Función principal asíncrona"""
+        self.shutdown_event = asyncio.Event()
+        self.stroke_wakeup = asyncio.Event()
         try:
             await self.connect_websocket()
+            if not self.ws:
+                return
             
-            # Iniciar tareas de mantenimiento
+            # Iniciar tareas de mantenimiento y recepción
             self.ping_task = asyncio.create_task(self.keep_alive())
+            self.receive_task = asyncio.create_task(self.receive_messages())
+            self.stroke_task = asyncio.create_task(self.send_strokes())
             
-            # Procesar mensajes
-            while self.running:
-                try:
-                    # Procesar comandos de la UI
-                    while not self.command_queue.empty():
-                        cmd = self.command_queue.get_nowait()
-                        if cmd == "shutdown":
-                            await self.cleanup()
-                            return
-                    
-                    # Procesar mensajes del WebSocket
-                    if self.ws:
-                        try:
-                            message = await asyncio.wait_for(
-                                self.ws.recv(),
-                                timeout=0.1
-                            )
-                            self.message_queue.put(message)
-                        except asyncio.TimeoutError:
-                            continue
-                        except websockets.exceptions.ConnectionClosed:
-                            logger.warning("Conexión WebSocket cerrada")
-                            break
-                    
-                    # Actualizar UI
-                    self.root.after(100, self.process_messages)
-                    
-                    await asyncio.sleep(0.1)
-                except Exception as e:
-                    logger.error(f"Error en el loop principal: {e}")
-                    break
+            # Sin sondeo: el loop duerme hasta el cierre o hasta que la recepción termina
+            shutdown = asyncio.create_task(self.shutdown_event.wait())
+            await asyncio.wait({self.receive_task, shutdown}, return_when=asyncio.FIRST_COMPLETED)
+            shutdown.cancel()
         except Exception as e:
             logger.error(f"Error en async_main: {e}")
         finally:
             await self.cleanup()
 
+    async def receive_messages(self):
+        """Recibe mensajes a medida que llegan y los entrega al hilo de Tk; reconecta si se cae la conexión"""
+        while self.running and self.ws:
+            try:
+                async for message in self.ws:
+                    self.message_queue.put(message)
+                    self.notify_ui()
+            except websockets.exceptions.ConnectionClosed:
+                pass
+            except Exception as e:
+                logger.error(f"Error recibiendo mensajes: {e}")
+            if not self.running:
+                return
+            
+            logger.warning("Conexión WebSocket cerrada, reconectando...")
+            self.connected = False
+            self.ws = None
+            self.message_queue.put(CONNECTION_CHANGED)
+            self.notify_ui()
+            await self.connect_websocket()
+
+    def notify_ui(self):
+        """Despierta al loop de Tk si no tiene ya una notificación pendiente (desde el hilo asíncrono)"""
+        if not self.running or self.wakeup_pending.is_set():
+            return
+        self.wakeup_pending.set()
+        try:
+            # event_generate es seguro desde otro hilo: Tk lo encola en su propio loop
+            self.root.event_generate(MESSAGES_EVENT, when="tail")
+        except (tk.TclError, RuntimeError) as e:
+            # La ventana ya se está cerrando
+            self.wakeup_pending.clear()
+            logger.debug(f"No se pudo notificar a la UI: {e}")
+
+    async def send_strokes(self):
+        """Envía los puntos acumulados a ritmo fijo: un mensaje por trazo y tick, en orden"""
+        while self.running:
+            await self.stroke_wakeup.wait()
+            self.stroke_wakeup.clear()
+            # Se deja acumular el tick completo antes de enviar
+            await asyncio.sleep(STROKE_SEND_INTERVAL)
+            self.stroke_wakeup_pending = False
+            for data in self.take_stroke_messages():
+                if not (self.ws and self.connected):
+                    break
+                try:
+                    await self.ws.send(data)
+                except websockets.exceptions.ConnectionClosed:
+                    # La recepción detecta el cierre y reconecta; lo pendiente se descarta
+                    break
+
+    def take_stroke_messages(self) -> list:
+        """Vacía el buffer agrupando los puntos consecutivos de cada trazo en un mensaje"""
+        messages = []
+        stroke_id = None
+        points = []
+        while True:
+            try:
+                item = self.pending_points.popleft()
+            except IndexError:
+                break
+            if item is CLEAR_CANVAS or item[0] != stroke_id:
+                if points:
+                    messages.append(self.encode_stroke(stroke_id, points))
+                points = []
+                stroke_id = None
+            if item is CLEAR_CANVAS:
+                self.last_sent_point = None
+                messages.append(encode_clear() if self.binary_strokes else codec.dumps({"type": "clear"}))
+                continue
+            if stroke_id is None:
+                stroke_id = item[0]
+                if self.last_sent_point and self.last_sent_point[0] == stroke_id:
+                    # Repetir el último punto enviado: cada mensaje es una polilínea completa
+                    points.extend(self.last_sent_point[1:])
+            points.extend(item[1:])
+        if points:
+            messages.append(self.encode_stroke(stroke_id, points))
+        return messages
+
+    def encode_stroke(self, stroke_id: int, points: list):
+        """Mensaje con los puntos planos [x0, y0, x1, y1, ...] de un trazo"""
+        self.last_sent_point = (stroke_id, points[-2], points[-1])
+        if self.binary_strokes:
+            return encode_points(stroke_id, points)
+        return codec.dumps({"type": "draw", "stroke": stroke_id, "points": points})
+
+    def queue_stroke_event(self, item):
+        """Añade un punto o un limpiado al buffer y despierta al envío una vez por tick (hilo de Tk)"""
+        if item is not CLEAR_CANVAS and len(self.pending_points) >= MAX_PENDING_POINTS:
+            # Conexión lenta: no se deja crecer el buffer
+            self.dropped_points += 1
+            if self.dropped_points % 1000 == 1:
+                logger.warning(f"Buffer de trazos lleno, {self.dropped_points} puntos descartados")
+            return
+        self.pending_points.append(item)
+        if not self.stroke_wakeup_pending and self.stroke_wakeup is not None:
+            self.stroke_wakeup_pending = True
+            self.event_loop.call_soon_threadsafe(self.stroke_wakeup.set)
+
     async def connect_websocket(self):
         """Establece la conexión WebSocket"""
         while self.running and self.reconnect_attempts < self.max_reconnect_attempts:
             try:
+                url = f"ws://localhost:8000/api/v1/ws?room={quote(self.room_id)}"
+                if self.resume_token:
+                    # Reanudar: el servidor envía sólo lo que se perdió desde state_version
+                    version = self.state_version if self.state_version is not None else -1
+                    url += f"&resume={quote(self.resume_token)}&version={version}"
                 self.ws = await websockets.connect(
-                    "ws://localhost:8000/api/v1/ws",
-                    extra_headers={"User-Agent": "PictionaryDesktop"}
+                    url,
+                    extra_headers={"User-Agent": "PictionaryDesktop"},
+                    subprotocols=[STROKE_SUBPROTOCOL]
                 )
+                # Si el servidor no acepta el subprotocolo se usa JSON
+                self.binary_strokes = self.ws.subprotocol == STROKE_SUBPROTOCOL
                 
-                # Enviar mensaje de unión
-                await self.ws.send(json.dumps({
-                    "type": "join",
-                    "name": self.player_name
-                }))
+                # Enviar mensaje de unión (con token se espera "resumed" o "resume_failed")
+                if not self.resume_token:
+                    await self.send_join()
                 
                 self.connected = True
                 self.reconnect_attempts = 0
-                self.update_ui_state()
+                self.message_queue.put(CONNECTION_CHANGED)
+                self.notify_ui()
                 logger.info("Conectado al servidor")
                 return
                 
@@ -227,18 +361,26 @@ class DrawingGame:
                     logger.error("Máximo número de intentos de reconexión alcanzado")
                     self.running = False
 
+    async def send_join(self):
+        """Envía el mensaje de unión a la partida"""
+        await self.ws.send(codec.dumps({
+            "type": "join",
+            "name": self.player_name
+        }))
+
     async def keep_alive(self):
         """Mantiene la conexión WebSocket activa"""
-        while self.running and self.ws:
+        while self.running:
             try:
-                await asyncio.sleep(15)  # Reducir el intervalo a 15 segundos
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
                 if self.ws:
                     try:
-                        await self.ws.ping()
+                        # Un ping del protocolo no llega a la aplicación: el servidor necesita un mensaje
+                        await self.ws.send(codec.dumps({"type": "ping"}))
                         logger.debug("Ping enviado al servidor")
                     except Exception as e:
+                        # La recepción detecta el cierre y reconecta
                         logger.error(f"Error al enviar ping: {e}")
-                        break
             except Exception as e:
                 logger.error(f"Error en keep_alive: {e}")
                 break
@@ -255,6 +397,14 @@ class DrawingGame:
             except asyncio.CancelledError:
                 pass
         
+        for task in (self.receive_task, self.stroke_task):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        
         if self.reconnect_task:
             self.reconnect_task.cancel()
             try:
@@ -270,14 +420,16 @@ class DrawingGame:
                 logger.error(f"Error al cerrar WebSocket: {e}")
         
         self.connected = False
-        self.update_ui_state()
+        self.message_queue.put(CONNECTION_CHANGED)
+        self.notify_ui()
         logger.info("Limpieza completada")
 
     def handle_shutdown(self, *args):
         """Maneja el cierre de la aplicación"""
         logger.info("Iniciando cierre de la aplicación...")
         self.running = False
-        self.command_queue.put("shutdown")
+        if self.event_loop and self.shutdown_event and not self.event_loop.is_closed():
+            self.event_loop.call_soon_threadsafe(self.shutdown_event.set)
         
         # Esperar a que se complete la limpieza
         if self.async_thread and self.async_thread.is_alive():
@@ -336,44 +488,52 @@ class DrawingGame:
             current_player = state.get("players", {}).get(self.player_name, {})
             self.is_drawer = current_player.get("is_drawer", False)
             
-            # Actualizar palabra si es el dibujante
-            if self.is_drawer:
-                self.current_word = state.get("current_word")
+            # La palabra llega sólo por mensaje privado al dibujante
+            if not self.is_drawer:
+                self.current_word = None
             
             self.update_ui_state()
             
         except Exception as e:
             logger.error(f"Error al procesar estado del juego: {e}")
 
+    def handle_state_patch(self, patch):
+        """Aplica un parche incremental o pide el estado completo si falta una versión"""
+        if self.state_version is not None and patch["version"] <= self.state_version:
+            return
+        if patch["base_version"] != self.state_version:
+            logger.warning(f"Hueco de versiones ({self.state_version} -> {patch['base_version']}), pidiendo estado completo")
+            if self.ws and self.connected:
+                asyncio.run_coroutine_threadsafe(
+                    self.ws.send(codec.dumps({"type": "sync"})),
+                    self.event_loop
+                )
+            return
+        apply_merge_patch(self.state, patch["changes"])
+        self.state_version = patch["version"]
+        self.handle_game_state(self.state)
+
     def draw(self, event):
         """Maneja el evento de dibujo"""
         if not self.is_drawer or not self.game_started or self.game_paused:
             return
             
         x, y = event.x, event.y
-        if hasattr(self, 'last_x') and hasattr(self, 'last_y'):
-            self.canvas.create_line(
-                self.last_x, self.last_y, x, y,
-                fill="black", width=2, capstyle=tk.ROUND, smooth=tk.TRUE
-            )
-            
-            # Enviar línea al servidor
-            if self.ws and self.connected:
-                asyncio.run_coroutine_threadsafe(
-                    self.ws.send(json.dumps({
-                        "type": "draw",
-                        "x1": self.last_x,
-                        "y1": self.last_y,
-                        "x2": x,
-                        "y2": y
-                    })),
-                    self.event_loop
-                )
+        if not hasattr(self, 'last_x'):
+            # Nuevo trazo
+            self.stroke_id += 1
+        # Una sola polilínea por trazo, alargada en su sitio
+        self.stroke_canvas.add_points(("local", self.stroke_id), (x, y))
+        
+        # El punto se envía en el próximo tick junto con el resto del trazo
+        if self.ws and self.connected:
+            self.queue_stroke_event((self.stroke_id, x, y))
         
         self.last_x, self.last_y = x, y
 
     def stop_drawing(self, event):
         """Maneja el evento de soltar el botón del mouse"""
+        self.stroke_canvas.end_stroke(("local", self.stroke_id))
         if hasattr(self, 'last_x'):
             del self.last_x
         if hasattr(self, 'last_y'):
@@ -384,12 +544,11 @@ class DrawingGame:
         if not self.is_drawer or not self.game_started or self.game_paused:
             return
             
-        self.canvas.delete("all")
+        self.stroke_canvas.clear()
         if self.ws and self.connected:
-            asyncio.run_coroutine_threadsafe(
-                self.ws.send(json.dumps({"type": "clear"})),
-                self.event_loop
-            )
+            # Los puntos aún sin enviar quedarían borrados: se descartan y el limpiado va en orden
+            self.pending_points.clear()
+            self.queue_stroke_event(CLEAR_CANVAS)
 
     def send_guess(self):
         """Envía una adivinanza"""
@@ -402,7 +561,7 @@ class DrawingGame:
             
         if self.ws and self.connected:
             asyncio.run_coroutine_threadsafe(
-                self.ws.send(json.dumps({
+                self.ws.send(codec.dumps({
                     "type": "guess",
                     "guess": guess
                 })),
@@ -410,20 +569,77 @@ class DrawingGame:
             )
             self.guess_var.set("")
 
-    def process_messages(self):
-        """Procesa mensajes de la cola"""
-        try:
-            while not self.message_queue.empty():
+    def process_messages(self, event=None):
+        """Procesa de una vez todos los mensajes encolados (en el hilo de Tk)"""
+        # Se limpia antes de vaciar la cola: un mensaje que llegue ahora vuelve a notificar
+        self.wakeup_pending.clear()
+        while True:
+            try:
                 message = self.message_queue.get_nowait()
-                data = json.loads(message)
-                
-                if data["type"] == "state":
-                    self.handle_game_state(data["state"])
-                elif data["type"] == "error":
-                    messagebox.showerror("Error", data["message"])
-                
-        except Exception as e:
-            logger.error(f"Error al procesar mensajes: {e}")
+            except queue.Empty:
+                break
+            try:
+                self.handle_message(message)
+            except Exception as e:
+                logger.error(f"Error al procesar mensajes: {e}")
+
+    def handle_message(self, message):
+        """Aplica un mensaje del servidor a la UI"""
+        if message is CONNECTION_CHANGED:
+            self.update_ui_state()
+            return
+        if isinstance(message, bytes):
+            # Trazos binarios de otros jugadores: uno o varios frames concatenados
+            for op, stroke_id, points in decode_frames(message):
+                if op == OP_CLEAR:
+                    self.stroke_canvas.clear()
+                else:
+                    self.stroke_canvas.add_points(stroke_id, points)
+            return
+        data = codec.loads(message)
+        
+        if data["type"] == "state":
+            self.state = data["state"]
+            self.state_version = data.get("version")
+            self.handle_game_state(self.state)
+        elif data["type"] == "patch":
+            self.handle_state_patch(data)
+        elif data["type"] == "private":
+            # Nueva ronda (o estado completo): el dibujo actual llega después en "strokes"
+            self.current_word = data.get("current_word")
+            self.stroke_canvas.clear()
+            self.update_ui_state()
+        elif data["type"] == "strokes":
+            for event in data["events"]:
+                self.handle_stroke_event(event)
+        elif data["type"] == "error":
+            messagebox.showerror("Error", data["message"])
+        elif data["type"] == "session":
+            self.resume_token = data["token"]
+        elif data["type"] == "resume_failed":
+            # La sesión ya no existe en el servidor: volver a unirse
+            self.resume_token = None
+            asyncio.run_coroutine_threadsafe(self.send_join(), self.event_loop)
+        elif data["type"] == "resumed":
+            logger.info(f"Sesión reanudada ({data['missed']} parches perdidos)")
+        elif data["type"] == "close_guess":
+            self.game_status_label.config(text=data["message"])
+
+    def handle_stroke_event(self, event: dict):
+        """Dibuja un evento de trazo JSON de otro jugador"""
+        if event.get("type") == "clear":
+            self.stroke_canvas.clear()
+            return
+        stroke = event.get("stroke") or 0
+        if "points" in event:
+            self.stroke_canvas.add_points(stroke, event["points"])
+        elif "x1" in event:
+            self.stroke_canvas.add_points(stroke, (event["x1"], event["y1"], event["x2"], event["y2"]))
+        elif "x" in event:
+            # Cliente web: un punto por mensaje e isStart al empezar cada trazo
+            if event.get("isStart"):
+                self.stroke_canvas.end_stroke(stroke)
+            self.stroke_canvas.add_points(stroke, (event["x"], event["y"]))
 
     def run(self):
         """Inicia la aplicación"""
@@ -0,0 +1,105 @@
+"""
+Dibujo del canvas con un número acotado de items de Tk.
+
+Cada trazo es una sola polilínea que se alarga en su sitio con `coords`, en
+lugar de un item por segmento. Cuando los trazos vivos suman demasiados
+puntos se aplanan: se rasterizan en una imagen RGB en memoria, la imagen del
+fondo se sustituye de una vez (PPM) y sus polilíneas se borran. Así el canvas
+tiene siempre una imagen más unas pocas polilíneas, aunque la ronda lleve
+decenas de miles de puntos.
+"""
+import tkinter as tk
+from typing import Dict, Hashable, List, Optional, Sequence
+
+# Puntos en polilíneas antes de aplanarlas en la imagen del fondo
+FLATTEN_POINTS = 3000
+
+LINE_COLOR = "black"
+LINE_WIDTH = 2
+
+_WHITE = b"\xff\xff\xff"
+_BLACK = b"\x00\x00\x00"
+
+class StrokeCanvas:
+    """Trazos de un tk.Canvas: una polilínea por trazo y una imagen con lo ya aplanado"""
+    def __init__(self, canvas: tk.Canvas, width: int, height: int):
+        self.canvas = canvas
+        self.width = width
+        self.height = height
+        # trazo -> [item de la polilínea o None, coordenadas planas x0, y0, x1, y1, ...]
+        self.strokes: Dict[Hashable, list] = {}
+        self.live_points = 0
+        self.raster = bytearray(_WHITE * (width * height))
+        self.image = tk.PhotoImage(width=width, height=height)
+        self.image_item: Optional[int] = None
+
+    def add_points(self, stroke: Hashable, points: Sequence[float]):
+        """Alarga el trazo con puntos planos [x0, y0, x1, y1, ...]"""
+        if len(points) < 2:
+            return
+        entry = self.strokes.get(stroke)
+        if entry is None:
+            entry = self.strokes[stroke] = [None, []]
+        coords: List[float] = entry[1]
+        coords.extend(points[:len(points) - len(points) % 2])
+        self.live_points += len(points) // 2
+        if len(coords) < 4:
+            return
+        if entry[0] is None:
+            entry[0] = self.canvas.create_line(
+                *coords,
+                fill=LINE_COLOR, width=LINE_WIDTH, capstyle=tk.ROUND, joinstyle=tk.ROUND, smooth=tk.TRUE
+            )
+        else:
+            self.canvas.coords(entry[0], *coords)
+        if self.live_points > FLATTEN_POINTS:
+            self.flatten()
+
+    def end_stroke(self, stroke: Hashable):
+        """El trazo terminó: los puntos siguientes con la misma clave empiezan otra línea"""
+        self.strokes.pop(stroke, None)
+
+    def clear(self):
+        """Borra todo el dibujo"""
+        self.canvas.delete("all")
+        self.strokes = {}
+        self.live_points = 0
+        self.raster = bytearray(_WHITE * (self.width * self.height))
+        self.image.blank()
+        self.image_item = None
+
+    def flatten(self):
+        """Rasteriza las polilíneas en la imagen del fondo y las borra del canvas"""
+        for stroke, (item, coords) in self.strokes.items():
+            for i in range(0, len(coords) - 3, 2):
+                self._raster_line(coords[i], coords[i + 1], coords[i + 2], coords[i + 3])
+            if item is not None:
+                self.canvas.delete(item)
+            # Se conserva el último punto para que el trazo continúe sin hueco
+            self.strokes[stroke] = [None, coords[-2:]]
+        self.live_points = 0
+        header = f"P6 {self.width} {self.height} 255\n".encode("ascii")
+        self.image.configure(data=header + bytes(self.raster), format="ppm")
+        if self.image_item is None:
+            self.image_item = self.canvas.create_image(0, 0, image=self.image, anchor=tk.NW)
+        self.canvas.tag_lower(self.image_item)
+
+    def _raster_line(self, x0: float, y0: float, x1: float, y1: float):
+        """Segmento de LINE_WIDTH píxeles en el raster (DDA con sellos cuadrados)"""
+        x0, y0, x1, y1 = int(x0), int(y0), int(x1), int(y1)
+        dx = x1 - x0
+        dy = y1 - y0
+        steps = max(abs(dx), abs(dy), 1)
+        width = self.width
+        height = self.height
+        raster = self.raster
+        offset = LINE_WIDTH // 2
+        stamp = _BLACK * LINE_WIDTH
+        for i in range(steps + 1):
+            x = x0 + dx * i // steps - offset
+            y = y0 + dy * i // steps - offset
+            if x < 0 or x > width - LINE_WIDTH:
+                continue
+            for row in range(max(y, 0), min(y + LINE_WIDTH, height)):
+                start = (row * width + x) * 3
+                raster[start:start + len(stamp)] = stamp
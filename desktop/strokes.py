@@ -0,0 +1,80 @@
+"""
+Códec del subprotocolo binario de trazos (igual que backend/api/v1/strokes.py)
+"""
+from array import array
+from typing import Iterator, Sequence, Tuple
+
+# Subprotocolo WebSocket opcional para trazos binarios
+STROKE_SUBPROTOCOL = "pictionary.strokes.v1"
+
+# Códigos de operación de cada frame binario
+OP_POINTS = 0x01  # [op][varint stroke_id][varint n][zigzag-varint dx, dy] * n
+OP_CLEAR = 0x02   # [op]
+
+KNOWN_OPS = (OP_POINTS, OP_CLEAR)
+
+class StrokeFormatError(ValueError):
+    """Frame binario de trazos mal formado"""
+
+def _write_varint(buf: bytearray, value: int):
+    while value > 0x7F:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise StrokeFormatError("Varint truncado")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift > 35:
+            raise StrokeFormatError("Varint demasiado largo")
+
+def encode_points(stroke_id: int, points: Sequence[int]) -> bytes:
+    """Codifica puntos planos [x0, y0, x1, y1, ...] como deltas zigzag/varint"""
+    buf = bytearray((OP_POINTS,))
+    _write_varint(buf, stroke_id)
+    _write_varint(buf, len(points) // 2)
+    last_x = last_y = 0
+    for i in range(0, len(points) - 1, 2):
+        x, y = points[i], points[i + 1]
+        dx, dy = x - last_x, y - last_y
+        _write_varint(buf, dx << 1 if dx >= 0 else (-dx << 1) - 1)
+        _write_varint(buf, dy << 1 if dy >= 0 else (-dy << 1) - 1)
+        last_x, last_y = x, y
+    return bytes(buf)
+
+def encode_clear() -> bytes:
+    """Codifica la orden de limpiar el canvas"""
+    return bytes((OP_CLEAR,))
+
+def decode_frames(data: bytes) -> Iterator[Tuple[int, int, array]]:
+    """Decodifica uno o varios frames concatenados en (op, stroke_id, puntos)"""
+    pos = 0
+    while pos < len(data):
+        op = data[pos]
+        pos += 1
+        if op == OP_CLEAR:
+            yield op, 0, array("i")
+        elif op == OP_POINTS:
+            stroke_id, pos = _read_varint(data, pos)
+            count, pos = _read_varint(data, pos)
+            points = array("i")
+            x = y = 0
+            for _ in range(count):
+                zx, pos = _read_varint(data, pos)
+                zy, pos = _read_varint(data, pos)
+                x += (zx >> 1) ^ -(zx & 1)
+                y += (zy >> 1) ^ -(zy & 1)
+                points.append(x)
+                points.append(y)
+            yield op, stroke_id, points
+        else:
+            raise StrokeFormatError(f"Operación desconocida: {op}")
@@ -17,7 +17,6 @@ interface Player {
 
 interface GameState {
   players: { [key: string]: Player };
-  current_word: string | null;
   game_started: boolean;
   game_paused: boolean;
   current_drawer: string | null;
@@ -36,9 +35,42 @@ interface GameContextType {
   lastError: string | null;
 }
 
+interface StatePatch {
+  version: number;
+  base_version: number;
+  changes: Record<string, unknown>;
+}
+
 const GameContext = createContext<GameContextType | undefined>(undefined);
 
+// Aplica un JSON merge patch (null elimina la clave) sin mutar el original
+function applyMergePatch<T>(target: T, patch: Record<string, unknown>): T {
+  const result: Record<string, unknown> = {
+    ...(target as unknown as Record<string, unknown>),
+  };
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) {
+      delete result[key];
+    } else if (
+      typeof value === "object" &&
+      !Array.isArray(value) &&
+      typeof result[key] === "object" &&
+      result[key] !== null
+    ) {
+      result[key] = applyMergePatch(
+        result[key],
+        value as Record<string, unknown>
+      );
+    } else {
+      result[key] = value;
+    }
+  }
+  return result as T;
+}
+
 const WS_URL = import.meta.env.VITE_WS_URL || "ws://localhost:8000/api/v1/ws";
+// Latido de la aplicación: el servidor cierra las conexiones sin mensajes durante 30 s
+const HEARTBEAT_INTERVAL_MS = 10000;
 const MAX_RECONNECT_ATTEMPTS = 5;
 const RECONNECT_DELAY = 3000; // 3 segundos
 const INITIAL_CONNECTION_DELAY = 1000; // 1 segundo de espera antes del primer intento
@@ -50,7 +82,6 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
   >("disconnected");
   const [gameState, setGameState] = useState<GameState>({
     players: {},
-    current_word: null,
     game_started: false,
     game_paused: false,
     current_drawer: null,
@@ -59,10 +90,16 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
   const [reconnectAttempts, setReconnectAttempts] = useState(0);
   const [reconnectTimeout, setReconnectTimeout] = useState<number | null>(null);
   const [lastError, setLastError] = useState<string | null>(null);
+  // La palabra sólo llega al dibujante en un mensaje privado
+  const [privateWord, setPrivateWord] = useState<string | null>(null);
   const isConnectingRef = useRef(false);
   const wsRef = useRef<WebSocket | null>(null);
   const connectionTimeoutRef = useRef<number | null>(null);
+  const heartbeatRef = useRef<number | null>(null);
   const isMountedRef = useRef(true);
+  const stateVersionRef = useRef<number | null>(null);
+  // Token de reanudación recibido al unirse: al reconectar sólo llega lo perdido
+  const resumeTokenRef = useRef<string | null>(null);
 
   const cleanupWebSocket = useCallback(() => {
     if (wsRef.current) {
@@ -85,8 +122,27 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
       window.clearTimeout(connectionTimeoutRef.current);
       connectionTimeoutRef.current = null;
     }
+    if (heartbeatRef.current) {
+      window.clearInterval(heartbeatRef.current);
+      heartbeatRef.current = null;
+    }
   }, []);
 
+  const sendJoin = useCallback(
+    (ws: WebSocket) => {
+      if (ws.readyState === WebSocket.OPEN && isMountedRef.current) {
+        ws.send(
+          JSON.stringify({
+            type: "join",
+            name: playerName,
+            client_type: "web",
+          })
+        );
+      }
+    },
+    [playerName]
+  );
+
   const connectWebSocket = useCallback(() => {
     if (!isMountedRef.current) {
       console.log("Componente desmontado, no se intentará conectar");
@@ -107,7 +163,12 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
     cleanupWebSocket();
 
     try {
-      const ws = new WebSocket(WS_URL);
+      const url = new URL(WS_URL);
+      if (resumeTokenRef.current) {
+        url.searchParams.set("resume", resumeTokenRef.current);
+        url.searchParams.set("version", String(stateVersionRef.current ?? -1));
+      }
+      const ws = new WebSocket(url.toString());
       wsRef.current = ws;
 
       // Establecer un timeout para la conexión inicial
@@ -138,18 +199,19 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
         isConnectingRef.current = false;
         setSocket(ws);
 
-        // Pequeño delay antes de enviar el mensaje de unión
-        setTimeout(() => {
-          if (ws.readyState === WebSocket.OPEN && isMountedRef.current) {
-            ws.send(
-              JSON.stringify({
-                type: "join",
-                name: playerName,
-                client_type: "web",
-              })
-            );
+        heartbeatRef.current = window.setInterval(() => {
+          if (ws.readyState === WebSocket.OPEN) {
+            ws.send(JSON.stringify({ type: "ping" }));
           }
-        }, 100);
+        }, HEARTBEAT_INTERVAL_MS);
+
+        // Con token la sesión se reanuda sin join; si falla llega resume_failed
+        if (resumeTokenRef.current) {
+          return;
+        }
+
+        // Pequeño delay antes de enviar el mensaje de unión
+        setTimeout(() => sendJoin(ws), 100);
       };
 
       ws.onmessage = (event) => {
@@ -161,7 +223,31 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
 
           if (data.type === "state") {
             console.log("Estado del juego actualizado:", data.state);
+            stateVersionRef.current = data.version ?? null;
             setGameState(data.state);
+          } else if (data.type === "patch") {
+            const patch = data as StatePatch;
+            const currentVersion = stateVersionRef.current;
+            if (currentVersion !== null && patch.version <= currentVersion) {
+              return;
+            }
+            if (patch.base_version !== currentVersion) {
+              // Falta una versión intermedia: pedir el estado completo
+              console.warn("Hueco de versiones, pidiendo estado completo");
+              ws.send(JSON.stringify({ type: "sync" }));
+              return;
+            }
+            stateVersionRef.current = patch.version;
+            setGameState((prev) => applyMergePatch(prev, patch.changes));
+          } else if (data.type === "private") {
+            setPrivateWord(data.current_word ?? null);
+          } else if (data.type === "session") {
+            resumeTokenRef.current = data.token;
+          } else if (data.type === "resume_failed") {
+            resumeTokenRef.current = null;
+            sendJoin(ws);
+          } else if (data.type === "resumed") {
+            console.log(`Sesión reanudada (${data.missed} parches perdidos)`);
           } else if (data.type === "error") {
             console.error("Error del servidor:", data.message);
             setLastError(data.message);
@@ -240,7 +326,7 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
       setLastError("Error al crear conexión WebSocket");
       isConnectingRef.current = false;
     }
-  }, [playerName, reconnectAttempts, cleanupWebSocket]);
+  }, [reconnectAttempts, cleanupWebSocket, sendJoin]);
 
   // Efecto para la conexión inicial
   useEffect(() => {
@@ -322,7 +408,7 @@ export function GameProvider({ children }: { children: React.ReactNode }) {
       value={{
         gameState,
         isDrawer,
-        word: isDrawer ? gameState.current_word : null,
+        word: isDrawer ? privateWord : null,
         playerName,
         socket,
         sendGuess,